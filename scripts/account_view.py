@@ -0,0 +1,188 @@
+import os
+import pandas as pd
+from table_io import read_table
+
+# One decoded, account-keyed copy of the source tables, built once per build by
+# build_account_view.py and read by every domain builder.
+#
+# The view folder holds the decoded fact tables (parties, logins, payments, statements,
+# account details, transactions) plus "accounts": one row per ACCNT_ID with the header,
+# its decoded codes and per-domain rollups, so cross-domain questions need no joins.
+# build_faiss_index.py reads its header columns; update_faiss_with_account_profiles.py
+# indexes the rollups as cross-domain and per-account summaries.
+
+VIEW_DIR = os.path.join("faiss_index", "account_view")
+
+MAIN = os.path.join("data", "Main_Tables")
+SUPPORT = os.path.join("data", "Supporting_Tables")
+
+SOURCES = {
+    "account_hdr": os.path.join(MAIN, "account", "account_hdr.csv"),
+    "accnt_party": os.path.join(MAIN, "account", "accnt_party.csv"),
+    "customer_login": os.path.join(MAIN, "customer-login", "customer_login.csv"),
+    "payments": os.path.join(MAIN, "payment", "Internal-payment", "payment_movement_5000_full_records.xlsx"),
+    "statements": os.path.join(MAIN, "payment", "stmt_dtl_updated_consistent_dates.xlsx"),
+    "accnt_dtl": os.path.join(MAIN, "payment", "accnt_dtl_mapped_from_stmt_fixed.xlsx"),
+    "transactions": os.path.join(MAIN, "transaction", "transactions_updated_dates.xlsx"),
+}
+
+# name -> (file, code column in the code table, description column)
+CODE_TABLES = {
+    "accnt_status": (os.path.join(SUPPORT, "account", "accnt_status_cd.csv"), "ACCNT_STATUS_CD_ID", "ACCNT_STATUS_DESC"),
+    "open_reason": (os.path.join(SUPPORT, "account", "account_open_reason_data.csv"), "ACCNT_OPEN_REASON_CD_ID", "ACCNT_OPEN_REASON_DESC"),
+    "close_reason": (os.path.join(SUPPORT, "account", "account_close_reasons_with_mod_user.csv"), "ACCNT_CLOSE_REASON_CD_ID", "ACCNT_CLOSE_REASON_DESC"),
+    "partner": (os.path.join(SUPPORT, "account", "prtnr_cd.csv"), "PRTNR_CD_ID", "PRTNR_NAME"),
+    "role": (os.path.join(SUPPORT, "account", "accnt_role_type_cd.csv"), "ACCNT_ROLE_TYPE_CD_ID", "ACCNT_ROLE_TYPE_DESC"),
+    "mvmnt_status": (os.path.join(SUPPORT, "payment", "Internal-payment", "money_mvmnt_status_cd.xlsx"), "MONEY_MVMNT_STATUS_CD_ID", "MONEY_MVMNT_STATUS_DESC"),
+    "mvmnt_reason": (os.path.join(SUPPORT, "payment", "Internal-payment", "money_mvmnt_status_reason_full.csv"), "MNY_MVMNT_STATUS_REASON_CD_ID", "MNY_MVMNT_STATUS_REASON_DESC"),
+    "mvmnt_subsc": (os.path.join(SUPPORT, "payment", "Internal-payment", "money_mvmnt_subsc_optn_cd.xlsx"), "MONEY_MVMNT_SUBSC_OPTN_CD_ID", "MONEY_MVMNT_SUBSC_OPTN_DESC"),
+    "mvmnt_type": (os.path.join(SUPPORT, "payment", "Internal-payment", "money_mvmnt_type.xlsx"), "MONEY_MVMNT_TYPE_ID", "MONEY_MVMNT_TYPE_DESC"),
+    "tran_cat": (os.path.join(SUPPORT, "transaction", "tran_cat_cd.csv"), "TRAN_CAT_CD", "Description"),
+    "tran_cd": (os.path.join(SUPPORT, "transaction", "Tran_cd.csv"), "TRAN_CD", "Description"),
+}
+
+# fact table -> [(code column on the fact, code table, decoded column)]
+DECODES = {
+    "account_hdr": [
+        ("ACCNT_OPEN_REASON_CD_ID", "open_reason", "ACCNT_OPEN_REASON_DESC"),
+        ("ACCNT_CLOSE_REASON_CD_ID", "close_reason", "ACCNT_CLOSE_REASON_DESC"),
+        ("ACCNT_STATUS_CD_ID", "accnt_status", "ACCNT_STATUS_DESC"),
+        ("PRTNR_CD_ID", "partner", "PRTNR_NAME"),
+    ],
+    "accnt_party": [("ACCNT_ROLE_TYPE_CD_ID", "role", "ACCNT_ROLE_TYPE_DESC")],
+    "payments": [
+        ("MONEY_MVMNT_STATUS_CD_ID", "mvmnt_status", "STATUS_DESC"),
+        ("MNY_MVMNT_STATUS_REASON_CD_ID", "mvmnt_reason", "REASON_DESC"),
+        ("MONEY_MVMNT_SUBSC_OPTN_CD_ID", "mvmnt_subsc", "SUBSC_OPTN_DESC"),
+        ("MVMNT_TYPE_CD_ID", "mvmnt_type", "TYPE_DESC"),
+    ],
+    "transactions": [
+        ("TRAN_CAT_CD", "tran_cat", "TRAN_CAT_DESC"),
+        ("TRAN_CD", "tran_cd", "TRAN_TYPE_DESC"),
+    ],
+}
+
+LOGIN_FAILURE_CODES = [3, 4]   # Same failures update_faiss_with_customer_login.py counts
+PAYMENT_FAILURE_PATTERN = "fail|unsuccess|decline"
+
+
+# === BUILD ===
+def load_code_maps(base):
+    maps = {}
+    for name, (path, key_col, desc_col) in CODE_TABLES.items():
+        table = read_table(os.path.join(base, path))[[key_col, desc_col]].dropna()
+        maps[name] = dict(zip(table[key_col], table[desc_col]))
+    return maps
+
+
+def decode(df, fact, code_maps):
+    for code_col, table, out_col in DECODES.get(fact, []):
+        if code_col in df.columns:
+            df[out_col] = df[code_col].map(code_maps[table])
+    return df
+
+
+def _latest(df, key, date_col, columns):
+    """Last row per key by date, restricted to `columns`."""
+    ordered = df.dropna(subset=[date_col]).sort_values(date_col, kind="stable")
+    return ordered.groupby(key)[columns].last()
+
+
+def build_view(base):
+    """{name: DataFrame} for every view table; facts are decoded, dates parsed."""
+    code_maps = load_code_maps(base)
+    facts = {name: read_table(os.path.join(base, path)) for name, path in SOURCES.items()}
+    for name, df in facts.items():
+        decode(df, name, code_maps)
+
+    hdr = facts["account_hdr"]
+    for col in ("ACCNT_OPEN_DT", "ACCNT_CLOSE_DT", "LAST_LOGIN_DT"):
+        hdr[col] = pd.to_datetime(hdr[col], errors="coerce")
+    logins = facts["customer_login"]
+    logins["LAST_LOGIN_TS"] = pd.to_datetime(logins["LAST_LOGIN_TS"], errors="coerce")
+    payments = facts["payments"]
+    payments["DATE"] = pd.to_datetime(payments["TRANS_TS"], dayfirst=True, errors="coerce")
+    statements = facts["statements"]
+    # dd/mm/yy strings; parsed per value (as the statement builder did) so a mixed column still parses
+    statements["STMT_CLOS_DT"] = pd.to_datetime(statements["STMT_CLOS_DT"], format="mixed", dayfirst=True, errors="coerce")
+    accnt_dtl = facts["accnt_dtl"]
+    accnt_dtl["EFF_DT"] = pd.to_datetime(accnt_dtl["EFF_DT"], errors="coerce")
+    transactions = facts["transactions"]
+    transactions["TRAN_DATE"] = pd.to_datetime(transactions["TRAN_DATE"], errors="coerce")
+    txn_account = next(c for c in ("ACCNT_ID", "CIFDB_ACCNT_ID") if c in transactions.columns)
+
+    # Party: primary holder first, then the rest in file order
+    parties = facts["accnt_party"]
+    primary_first = parties.sort_values("ACCNT_ROLE_TYPE_DESC", key=lambda s: s.ne("PRIMARY"), kind="stable")
+    party_rollup = primary_first.groupby("ACCNT_ID").agg(PRIMARY_PARTY_ID=("PARTY_ID", "first"), PARTY_COUNT=("PARTY_ID", "nunique"))
+
+    login_rollup = logins.groupby("PARTY_ID").agg(
+        LOGIN_COUNT=("LOGIN_ID", "size"),
+        LOGIN_FAILURES=("LOGIN_STATUS_CD_ID", lambda s: s.isin(LOGIN_FAILURE_CODES).sum()),
+        LAST_LOGIN_TS=("LAST_LOGIN_TS", "max"),
+    )
+    failed_payment = payments["STATUS_DESC"].str.contains(PAYMENT_FAILURE_PATTERN, case=False, na=False)
+    payment_rollup = payments.assign(_failed=failed_payment).groupby("ACCNT_ID").agg(
+        PAYMENT_COUNT=("AMT", "count"),
+        PAYMENT_AMT=("AMT", "sum"),
+        PAYMENT_FAILURES=("_failed", "sum"),
+        LAST_PAYMENT_DATE=("DATE", "max"),
+    )
+    statement_rollup = _latest(statements, "CIFDB_ACCT_ID", "STMT_CLOS_DT",
+                               ["STMT_CLOS_DT", "BAL_CURR_AMT", "PAYMT_MIN_STMT_AMT", "PAYMT_DUE_DT"])
+    statement_rollup = statement_rollup.add_prefix("LAST_").join(statements.groupby("CIFDB_ACCT_ID").size().rename("STMT_COUNT"))
+    detail_cols = [c for c in ("ACCT_BAL_AMT", "PAYMT_MIN_DUE_AMT", "TOT_PAST_DUE_AMT") if c in accnt_dtl.columns]
+    detail_rollup = _latest(accnt_dtl, "CIFDB_ACCT_ID", "EFF_DT", detail_cols)
+    is_fraud = transactions["TRANS_FRAUD_FLAG"].astype(str).str.upper().isin(["Y", "1"]) if "TRANS_FRAUD_FLAG" in transactions else False
+    txn_rollup = transactions.assign(_fraud=is_fraud).groupby(txn_account).agg(
+        TXN_COUNT=("TRAN_AMT", "count"),
+        TXN_AMT=("TRAN_AMT", "sum"),
+        TXN_FRAUD_COUNT=("_fraud", "sum"),
+        LAST_TXN_DATE=("TRAN_DATE", "max"),
+    )
+    top_category = (transactions.groupby([txn_account, "TRAN_CAT_DESC"]).size()
+                    .sort_values(ascending=False, kind="stable").reset_index(level=1)
+                    .groupby(level=0)["TRAN_CAT_DESC"].first().rename("TOP_TXN_CATEGORY"))
+
+    accounts = (
+        hdr.set_index("ACCNT_ID")
+        .join(party_rollup)
+        .join(login_rollup, on="PRIMARY_PARTY_ID")
+        .join(payment_rollup)
+        .join(statement_rollup)
+        .join(detail_rollup)
+        .join(txn_rollup)
+        .join(top_category)
+        .reset_index()
+    )
+    count_cols = ["PARTY_COUNT", "LOGIN_COUNT", "LOGIN_FAILURES", "PAYMENT_COUNT", "PAYMENT_FAILURES",
+                  "STMT_COUNT", "TXN_COUNT", "TXN_FRAUD_COUNT"]
+    accounts[count_cols] = accounts[count_cols].fillna(0).astype("int64")
+
+    return {
+        "accounts": accounts,
+        "parties": parties,
+        "logins": logins,
+        "payments": payments,
+        "statements": statements,
+        "accnt_dtl": accnt_dtl,
+        "transactions": transactions,
+    }
+
+
+def write_view(view, base):
+    out_dir = os.path.join(base, VIEW_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, df in view.items():
+        path = os.path.join(out_dir, f"{name}.parquet")
+        df.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+
+
+# === READ ===
+def read_view(base, name, **kwargs):
+    """One view table; run build_account_view.py first if it is missing."""
+    path = os.path.join(base, VIEW_DIR, f"{name}.parquet")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} is missing — run build_account_view.py before the domain builders")
+    return read_table(path, **kwargs)
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import pickle
+from threading import Lock
+import pandas as pd
+
+# Aggregate tables computed by the index builders, keyed by domain and table name.
+#
+# Monthly tables are indexed by a monthly pd.PeriodIndex named "month" with one column
+# per category (status, channel, type, ...). Cross-sectional tables have a single row
+# labelled "all". The store carries a content version so rendered charts can be
+# cached against it.
+
+_cache_lock = Lock()
+_cache = {}
+
+
+def _version(tables):
+    digest = hashlib.sha256()
+    for domain in sorted(tables):
+        for name in sorted(tables[domain]):
+            digest.update(f"{domain}/{name}".encode())
+            digest.update(pd.util.hash_pandas_object(tables[domain][name], index=True).values.tobytes())
+    return digest.hexdigest()[:12]
+
+
+def load_aggregates(path):
+    """{"version": str, "tables": {domain: {name: DataFrame}}}; empty when nothing was published yet."""
+    if not os.path.exists(path):
+        return {"version": "empty", "tables": {}}
+    mtime = os.path.getmtime(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path, "rb") as f:
+        store = pickle.load(f)
+    with _cache_lock:
+        _cache[path] = (mtime, store)
+    return store
+
+
+def publish_aggregates(path, domain, tables):
+    """Replace the named tables for `domain`, keeping every other table as it is."""
+    store = load_aggregates(path)
+    merged = {d: dict(t) for d, t in store["tables"].items()}
+    merged.setdefault(domain, {}).update(tables)
+    store = {"version": _version(merged), "tables": merged}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(store, f)
+    os.replace(tmp_path, path)
+    return store["version"]
+
+
+def monthly_table(df, date_col, category_col=None, value_col=None, agg="size"):
+    """Pivot rows into a month × category table (counts by default, or `agg` of `value_col`)."""
+    months = pd.to_datetime(df[date_col], errors="coerce").dt.to_period("M").rename("month")
+    keys = [months] if category_col is None else [months, df[category_col].fillna("Unknown")]
+    if value_col is None:
+        table = df.groupby(keys).size()
+    else:
+        table = df.groupby(keys)[value_col].agg(agg)
+    if category_col is None:
+        return table.to_frame(value_col or "count").sort_index()
+    return table.unstack(fill_value=0).sort_index()
+
+
+def distribution_table(series):
+    """Single-row table of category counts for a cross-sectional breakdown."""
+    counts = series.fillna("Unknown").value_counts()
+    return pd.DataFrame([counts.values], columns=counts.index, index=["all"])
@@ -0,0 +1,110 @@
+import re
+import time
+from contextlib import contextmanager
+from threading import Lock
+from metrics import counter
+
+# Answer tiers, cheapest first, and the selector that picks one per request.
+#
+#   raw       the retrieved summary as indexed
+#   template  deterministic cleanup of the summary (no model)
+#   small     rephrase with flan-t5-small
+#   full      rephrase with flan-t5-base
+#
+# Each model tier keeps an EWMA of its unloaded generation time. A request gets the
+# highest tier it asked for whose estimate, scaled by the generations already running,
+# fits what is left of its latency budget; when the generation queue is full it drops
+# to the template tier instead of waiting behind it.
+
+# === CONFIG ===
+TIERS = ["raw", "template", "small", "full"]
+MODEL_TIERS = {"small": "google/flan-t5-small", "full": "google/flan-t5-base"}
+ANSWER_BUDGET_MS = 2000      # Dashboard SLO for a whole answer, retrieval included
+EWMA_ALPHA = 0.2             # Weight of the newest generation in the running estimate
+GENERATION_SLOTS = 4         # Generations that run side by side before each one slows down
+MAX_GENERATIONS = 8          # Beyond this many in flight, new requests skip the models
+
+# Starting estimates (ms, unloaded, CPU) until real generations have been timed
+PRIOR_MS = {"small": 250.0, "full": 900.0}
+
+TIER_ANSWERS = counter("qa_answer_tier_total", "Answers by the tier that produced them")
+TIER_DOWNGRADES = counter("qa_tier_downgrades_total", "Answers served below the tier requested, by requested and served tier")
+
+# Synonym lists in parentheses are written into summaries for retrieval, not for reading;
+# parentheses holding numbers (amounts, percentages, intervals) are kept
+_SYNONYMS_RE = re.compile(r"\s*\((?=[^()]*,)[^()\d₹%]*\)")
+_SPACES_RE = re.compile(r"\s+([,.;:])|\s{2,}")
+
+
+def template_polish(summary):
+    """Cheap, deterministic clean-up used when there is no time for a model."""
+    text = _SYNONYMS_RE.sub("", summary)
+    text = _SPACES_RE.sub(lambda m: m.group(1) or " ", text).strip()
+    if not text:
+        return summary
+    text = text[0].upper() + text[1:]
+    return text if text[-1] in ".!?" else text + "."
+
+
+class TierSelector:
+    """Picks a tier per request from latency estimates and the generations in flight."""
+
+    def __init__(self, available):
+        self.available = [t for t in TIERS if t not in MODEL_TIERS or t in available]
+        self.estimate_ms = dict(PRIOR_MS)
+        self.in_flight = 0
+        self.lock = Lock()
+
+    def load_factor(self, in_flight):
+        return max(1.0, (in_flight + 1) / GENERATION_SLOTS)
+
+    def choose(self, requested, remaining_ms):
+        """Highest available tier up to `requested` expected to finish within `remaining_ms`."""
+        with self.lock:
+            in_flight = self.in_flight
+            estimates = dict(self.estimate_ms)
+        # Asking for a model that is not loaded is not a downgrade
+        requested = min(requested, self.available[-1], key=TIERS.index)
+        ceiling = TIERS.index(requested)
+        chosen = "raw"
+        for tier in self.available:
+            if TIERS.index(tier) > ceiling:
+                break
+            if tier in MODEL_TIERS:
+                if in_flight >= MAX_GENERATIONS:
+                    continue
+                if estimates[tier] * self.load_factor(in_flight) > remaining_ms:
+                    continue
+            chosen = tier
+        TIER_ANSWERS.inc(tier=chosen)
+        if chosen != requested:
+            TIER_DOWNGRADES.inc(requested=requested, served=chosen)
+        return chosen
+
+    def begin(self):
+        """Count a generation as in flight; hand the result to end() once it has stopped."""
+        with self.lock:
+            factor = self.load_factor(self.in_flight)
+            self.in_flight += 1
+        return factor, time.perf_counter()
+
+    def end(self, tier, started, finished):
+        """Take a generation out of flight; only one that finished updates the tier's estimate."""
+        factor, start = started
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.in_flight -= 1
+            if finished:
+                unloaded = elapsed_ms / factor
+                self.estimate_ms[tier] += EWMA_ALPHA * (unloaded - self.estimate_ms[tier])
+
+    @contextmanager
+    def generating(self, tier):
+        """Count the body as an in-flight generation that runs to completion on this thread."""
+        started = self.begin()
+        finished = False
+        try:
+            yield
+            finished = True
+        finally:
+            self.end(tier, started, finished)
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+import query_with_model as qa
+
+# === CONFIG ===
+ENCODE_BATCH_SIZE = 256   # Questions per encode + multi-query search round
+REPHRASE_BATCH_SIZE = 16  # Prompts per FLAN generate call
+
+
+def read_questions(path):
+    """Read questions from a .jsonl file ({"question": ..., "id": ...} per line) or plain text (one per line)."""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                questions.append({"id": record.get("id", line_no), "question": record["question"]})
+            else:
+                questions.append({"id": line_no, "question": line})
+    return questions
+
+
+def rephrase_batch(texts, batch_size):
+    prompts = [qa.build_rephrase_prompt(t) for t in texts]
+    outputs = qa.flan_pipeline(prompts, max_length=128, do_sample=False, batch_size=batch_size)
+    rephrased = []
+    for out in outputs:
+        out = out[0] if isinstance(out, list) else out
+        rephrased.append(out["generated_text"].strip())
+    return rephrased
+
+
+def answer_batch(records, top_k, rephrase, rephrase_batch_size):
+    questions = [r["question"] for r in records]
+    n = len(questions)
+
+    t0 = time.perf_counter()
+    embeddings = np.asarray(
+        qa.embed_model.encode(questions, batch_size=len(questions), convert_to_numpy=True)
+    ).astype("float32")
+    t1 = time.perf_counter()
+    results, routes = qa.retrieve_matches_batch(questions, embeddings, top_k)
+    t2 = time.perf_counter()
+
+    answers = [
+        (qa.window_override(question, matches[0]["domain"], routed) or matches[0]["summary"]) if matches else ""
+        for question, matches, routed in zip(questions, results, routes)
+    ]
+    if rephrase and qa.USE_FLAN_CLEANING:
+        todo = [i for i, a in enumerate(answers) if a]
+        for i, text in zip(todo, rephrase_batch([answers[i] for i in todo], rephrase_batch_size)):
+            answers[i] = text
+    t3 = time.perf_counter()
+
+    # Stage times are measured per batch and amortized over its questions
+    timings = {
+        "encode_ms": (t1 - t0) * 1000 / n,
+        "search_ms": (t2 - t1) * 1000 / n,
+        "rephrase_ms": (t3 - t2) * 1000 / n,
+    }
+    for record, matches, routed, answer in zip(records, results, routes, answers):
+        yield {
+            "id": record["id"],
+            "question": record["question"],
+            "answer": answer,
+            "domain": matches[0]["domain"] if matches else None,
+            "routed_domains": routed,
+            "top_matches": matches,
+            "timings_ms": timings,
+            "batch_size": n,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions in batches and write JSONL results.")
+    parser.add_argument("input", help="Questions file: .jsonl with a 'question' field, or plain text with one question per line")
+    parser.add_argument("output", help="Where to write JSONL results")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=ENCODE_BATCH_SIZE)
+    parser.add_argument("--rephrase-batch-size", type=int, default=REPHRASE_BATCH_SIZE)
+    parser.add_argument("--no-rephrase", action="store_true", help="Return raw top summaries without FLAN rephrasing")
+    args = parser.parse_args()
+
+    records = read_questions(args.input)
+    print(f"📥 Loaded {len(records)} questions from {args.input}")
+
+    out_dir = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    with open(args.output, "w", encoding="utf-8") as out:
+        for i in range(0, len(records), args.batch_size):
+            batch = records[i:i + args.batch_size]
+            for result in answer_batch(batch, args.top_k, not args.no_rephrase, args.rephrase_batch_size):
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            print(f"  ✔ {min(i + args.batch_size, len(records))}/{len(records)} answered")
+    elapsed = time.perf_counter() - start
+
+    rate = len(records) / elapsed if elapsed else 0.0
+    print(f"✅ Wrote {len(records)} results to {args.output} in {elapsed:.1f}s ({rate:.1f} questions/s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+from matplotlib.figure import Figure
+
+import bulk_data_gen
+from build_pipeline import STAGES
+from table_io import BASE_DIR_ENV, STAGE_LOG_ENV
+
+try:
+    import psutil
+except ImportError:  # Peak RSS then comes from os.wait4 (POSIX only)
+    psutil = None
+
+# === CONFIG ===
+DEFAULT_SCALES = [5_000, 50_000, 500_000, 5_000_000]   # Accounts per dataset
+QUERY_REQUESTS = 50           # Fixed query workload per scale (closed loop, one session)
+SUPER_LINEAR_SLOPE = 1.15     # log-log slope above which a stage is flagged
+MIN_FIT_SECONDS = 0.05        # Points faster than this are noise, not signal
+
+# === PATHS ===
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_BASE = "F:/Projects/AIModel/demo"
+WORK_DIR = os.path.join(SOURCE_BASE, "benchmarks", "scaling")
+
+# Run in this order: the account build starts a fresh index, the rest append to it
+BUILD_SCRIPTS = [stage["script"] for stage in STAGES]
+
+
+def run_measured(cmd, env, log_path):
+    """Run a script to completion; (wall seconds, peak RSS MB or None, return code)."""
+    start = time.perf_counter()
+    with open(log_path, "ab") as log:
+        proc = subprocess.Popen(cmd, cwd=SCRIPT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        peak = None
+        if psutil is not None:
+            ps = psutil.Process(proc.pid)
+            peak = 0
+            while proc.poll() is None:
+                try:
+                    peak = max(peak, ps.memory_info().rss)
+                except psutil.Error:
+                    break
+                time.sleep(0.1)
+            code = proc.wait()
+        elif hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = code = os.waitstatus_to_exitcode(status)
+            peak = usage.ru_maxrss * 1024   # KiB on Linux
+        else:
+            code = proc.wait()
+    return time.perf_counter() - start, peak / 2**20 if peak else None, code
+
+
+def prepare_dataset(root, accounts, args):
+    """Generate Main_Tables for one scale (once) and copy the code tables next to them."""
+    marker = os.path.join(root, "data", "Main_Tables", ".complete")
+    support = os.path.join(root, "data", "Supporting_Tables")
+    shutil.copytree(os.path.join(args.source_base, "data", "Supporting_Tables"), support, dirs_exist_ok=True)
+    if os.path.exists(marker):
+        return None
+    start = time.perf_counter()
+    bulk_data_gen.SUPPORT_DIR = support
+    rows = bulk_data_gen.generate(
+        os.path.join(root, "data", "Main_Tables"), accounts, args.format, args.seed, workers=args.workers,
+    )
+    with open(marker, "w") as f:
+        json.dump(rows, f)
+    return {"seconds": time.perf_counter() - start, "rows": rows}
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def run_scale(accounts, args):
+    root = os.path.join(args.work_dir, f"scale_{accounts}")
+    print(f"\n📏 Scale {accounts:,} accounts → {root}")
+    result = {"accounts": accounts, "generate": prepare_dataset(root, accounts, args), "builders": {}, "stages": {}}
+
+    shutil.rmtree(os.path.join(root, "faiss_index"), ignore_errors=True)
+    stage_log = os.path.join(root, "stage_log.jsonl")
+    if os.path.exists(stage_log):
+        os.remove(stage_log)
+    env = dict(os.environ, **{BASE_DIR_ENV: root, STAGE_LOG_ENV: stage_log})
+    build_log = os.path.join(root, "build.log")
+
+    for script in BUILD_SCRIPTS:
+        seconds, peak_mb, code = run_measured([sys.executable, script], env, build_log)
+        result["builders"][script] = {"seconds": seconds, "peak_rss_mb": peak_mb, "exit_code": code}
+        status = "✅" if code == 0 else f"❌ exit {code} (see {build_log})"
+        print(f"  {script:<50} {seconds:8.1f}s  {peak_mb or 0:8.0f} MB  {status}")
+        if code != 0:
+            break
+
+    if os.path.exists(stage_log):
+        with open(stage_log, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                result["stages"][f"{record['script']}:{record['stage']}"] = record["seconds"]
+
+    index_dir = os.path.join(root, "faiss_index")
+    result["index_bytes"] = dir_size(index_dir) if os.path.isdir(index_dir) else 0
+
+    if all(b["exit_code"] == 0 for b in result["builders"].values()) and args.queries:
+        report = os.path.join(root, "load_test.json")
+        cmd = [sys.executable, "load_test.py", "--concurrency", "1", "--requests", str(args.queries),
+               "--no-rephrase", "--report", report]
+        seconds, peak_mb, code = run_measured(cmd, env, build_log)
+        if code == 0:
+            with open(report, encoding="utf-8") as f:
+                load = json.load(f)
+            result["query"] = {
+                "latency_ms": load["latency_ms"], "stage_ms": load["stage_ms"], "peak_rss_mb": peak_mb,
+            }
+            print(f"  query p50={load['latency_ms']['p50']:.1f}ms  p95={load['latency_ms']['p95']:.1f}ms")
+    return result
+
+
+def series(results):
+    """Name -> [(accounts, value)] for every measured quantity that should scale with data volume."""
+    out = defaultdict(list)
+    for r in results:
+        n = r["accounts"]
+        for script, b in r["builders"].items():
+            out[f"build:{script}:seconds"].append((n, b["seconds"]))
+            if b["peak_rss_mb"]:
+                out[f"build:{script}:peak_rss_mb"].append((n, b["peak_rss_mb"]))
+        for stage, seconds in r["stages"].items():
+            out[f"stage:{stage}:seconds"].append((n, seconds))
+        out["index:bytes"].append((n, r["index_bytes"]))
+        if "query" in r:
+            out["query:p50_ms"].append((n, r["query"]["latency_ms"]["p50"]))
+            out["query:p95_ms"].append((n, r["query"]["latency_ms"]["p95"]))
+            for stage, p in r["query"]["stage_ms"].items():
+                out[f"query:{stage}:p50_ms"].append((n, p["p50"]))
+    return out
+
+
+def fit_slope(name, points):
+    """Exponent b of value ≈ a·n^b over the points large enough to measure."""
+    floor = MIN_FIT_SECONDS if name.endswith(":seconds") else 0
+    usable = [(n, v) for n, v in points if v and v > floor]
+    if len(usable) < 2:
+        return None
+    x = np.log([n for n, _ in usable])
+    y = np.log([v for _, v in usable])
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def plot_curves(curves, path):
+    fig = Figure(figsize=(9, 6))
+    ax = fig.subplots()
+    for name, points in curves.items():
+        if name.startswith("build:") and name.endswith(":seconds"):
+            ns, vs = zip(*points)
+            ax.plot(ns, vs, marker="o", label=name.split(":")[1])
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("Accounts")
+    ax.set_ylabel("Build seconds")
+    ax.set_title("Builder time vs data volume")
+    ax.legend(fontsize=7)
+    ax.grid(True, which="both", linestyle="--", alpha=0.4)
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the index at several data volumes and fit scaling curves.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="Accounts per dataset")
+    parser.add_argument("--work-dir", default=WORK_DIR)
+    parser.add_argument("--source-base", default=SOURCE_BASE, help="Project folder holding data/Supporting_Tables")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for data generation")
+    parser.add_argument("--seed", type=int, default=bulk_data_gen.DEFAULT_SEED)
+    parser.add_argument("--queries", type=int, default=QUERY_REQUESTS, help="Query workload size (0 to skip)")
+    args = parser.parse_args()
+
+    results = [run_scale(n, args) for n in sorted(args.scales)]
+    curves = series(results)
+    slopes = {name: fit_slope(name, points) for name, points in curves.items()}
+    flagged = sorted(
+        (name for name, slope in slopes.items()
+         if slope is not None and slope > SUPER_LINEAR_SLOPE and not name.startswith("query:")),
+        key=lambda name: -slopes[name],
+    )
+
+    print("\n📈 Scaling exponents (value ∝ accounts^b):")
+    for name, slope in sorted(slopes.items(), key=lambda kv: -(kv[1] or 0)):
+        if slope is not None:
+            mark = "  ⚠️ super-linear" if name in flagged else ""
+            print(f"  b={slope:5.2f}  {name}{mark}")
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs(args.work_dir, exist_ok=True)
+    report_path = os.path.join(args.work_dir, f"scaling_{stamp}.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "scales": sorted(args.scales),
+            "format": args.format,
+            "seed": args.seed,
+            "results": results,
+            "curves": {name: [[n, v] for n, v in points] for name, points in curves.items()},
+            "slopes": slopes,
+            "super_linear": flagged,
+        }, f, indent=2)
+    plot_curves(curves, os.path.join(args.work_dir, f"scaling_{stamp}.png"))
+    print(f"📝 Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
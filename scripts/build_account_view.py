@@ -0,0 +1,16 @@
+from account_view import VIEW_DIR, build_view, write_view
+from table_io import base_dir, lap
+
+# === PATHS ===
+BASE_DIR = base_dir("F:/Projects/AIModel/demo")
+
+# === BUILD ===
+# Loads, decodes and joins every source table once; the domain builders read the result
+view = build_view(BASE_DIR)
+lap("join")
+write_view(view, BASE_DIR)
+lap("write")
+
+for name, df in view.items():
+    print(f"  {name:<14} {len(df):>10,} rows  {df.shape[1]:>3} columns")
+print(f"✅ Account view written to {VIEW_DIR}")
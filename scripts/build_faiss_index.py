@@ -3,24 +3,27 @@ import pandas as pd
 import faiss
 import pickle
 from datetime import datetime
-from sentence_transformers import SentenceTransformer
+from encoding_pool import encode_summaries
+from lexical_index import build_lexical_index
+from domain_router import build_domain_router, save_domains
+from mmap_store import write_index_atomic
+from table_io import base_dir, lap
+from account_view import read_view
+from aggregate_store import distribution_table, monthly_table, publish_aggregates
+from daily_store import DAILY_FILE, daily_metric, publish_daily
+from time_windows import DORMANT_MONTHS
 import calendar
 
 # === PATHS ===
-BASE_DIR = "F:/Projects/AIModel/demo"
-ACCOUNT_MAIN = os.path.join(BASE_DIR, "data", "Main_Tables", "account")
-ACCOUNT_SUPPORT = os.path.join(BASE_DIR, "data", "Supporting_Tables", "account")
+BASE_DIR = base_dir("F:/Projects/AIModel/demo")
 FAISS_OUT_DIR = os.path.join(BASE_DIR, "faiss_index")
 os.makedirs(FAISS_OUT_DIR, exist_ok=True)
 
-# === LOAD CSVs ===
-accnt_hdr = pd.read_csv(os.path.join(ACCOUNT_MAIN, "account_hdr.csv"))
-accnt_party = pd.read_csv(os.path.join(ACCOUNT_MAIN, "accnt_party.csv"))
-accnt_role = pd.read_csv(os.path.join(ACCOUNT_SUPPORT, "accnt_role_type_cd.csv"))
-accnt_status = pd.read_csv(os.path.join(ACCOUNT_SUPPORT, "accnt_status_cd.csv"))
-open_reason = pd.read_csv(os.path.join(ACCOUNT_SUPPORT, "account_open_reason_data.csv"))
-close_reason = pd.read_csv(os.path.join(ACCOUNT_SUPPORT, "account_close_reasons_with_mod_user.csv"))
-prtnr_cd = pd.read_csv(os.path.join(ACCOUNT_SUPPORT, "prtnr_cd.csv"))
+# === LOAD ACCOUNT VIEW ===
+# Header rows arrive with their status/reason/partner codes decoded and dates parsed
+hdr = read_view(BASE_DIR, "accounts")
+accnt_party = read_view(BASE_DIR, "parties")
+lap("load")
 
 # === Format Helper ===
 def format_month_date(dt_obj):
@@ -28,32 +31,18 @@ def format_month_date(dt_obj):
         return "Unknown date"
     return f"{calendar.month_name[dt_obj.month]} {dt_obj.year}"
 
-# === Clean Merges ===
-open_reason = open_reason[["ACCNT_OPEN_REASON_CD_ID", "ACCNT_OPEN_REASON_DESC"]]
-close_reason = close_reason[["ACCNT_CLOSE_REASON_CD_ID", "ACCNT_CLOSE_REASON_DESC"]]
-accnt_status = accnt_status[["ACCNT_STATUS_CD_ID", "ACCNT_STATUS_DESC"]]
-prtnr_cd = prtnr_cd[["PRTNR_CD_ID", "PRTNR_NAME"]]
-
-hdr = accnt_hdr.merge(open_reason, on="ACCNT_OPEN_REASON_CD_ID", how="left")
-hdr = hdr.merge(close_reason, on="ACCNT_CLOSE_REASON_CD_ID", how="left")
-hdr = hdr.merge(accnt_status, on="ACCNT_STATUS_CD_ID", how="left")
-hdr = hdr.merge(prtnr_cd, on="PRTNR_CD_ID", how="left")
-
-# === Preprocess ===
-hdr["ACCNT_OPEN_DT"] = pd.to_datetime(hdr["ACCNT_OPEN_DT"], errors="coerce")
-hdr["ACCNT_CLOSE_DT"] = pd.to_datetime(hdr["ACCNT_CLOSE_DT"], errors="coerce")
-hdr["LAST_LOGIN_DT"] = pd.to_datetime(hdr["LAST_LOGIN_DT"], errors="coerce")
-
 # === Calculations ===
-current_year = datetime.now().year
-last_year = current_year - 1
-cutoff_login = datetime(current_year - 2, 1, 1)
+# Build-time snapshot, dated explicitly; "last year" / "dormant for N months" questions
+# are answered at query time from the daily arrays published below
+build_date = pd.Timestamp(datetime.now().date())
+build_str = build_date.strftime("%d %B %Y")
+cutoff_login = build_date - pd.DateOffset(months=DORMANT_MONTHS)
 cutoff_str = format_month_date(cutoff_login)
 
 total_accounts = len(hdr)
 active_accounts = hdr[hdr["ACCNT_STATUS_DESC"] == "Valid Operating Account"]
-opened_last_year = hdr[hdr["ACCNT_OPEN_DT"].dt.year == last_year]
-closed_last_year = hdr[hdr["ACCNT_CLOSE_DT"].dt.year == last_year]
+opened_by_year = hdr["ACCNT_OPEN_DT"].dt.year.value_counts().sort_index()
+closed_by_year = hdr["ACCNT_CLOSE_DT"].dt.year.value_counts().sort_index()
 dormant_accounts = hdr[hdr["LAST_LOGIN_DT"] < cutoff_login]
 
 # Grouping logic
@@ -66,8 +55,7 @@ top_open = hdr["ACCNT_OPEN_REASON_DESC"].value_counts(normalize=True).head(3)
 top_partners = hdr["PRTNR_NAME"].value_counts(normalize=True).head(3)
 status_dist = hdr["ACCNT_STATUS_DESC"].value_counts(normalize=True).head(5)
 
-merged_roles = accnt_party.merge(accnt_role, on="ACCNT_ROLE_TYPE_CD_ID", how="left")
-role_dist = merged_roles["ACCNT_ROLE_TYPE_DESC"].value_counts(normalize=True).head(3)
+role_dist = accnt_party["ACCNT_ROLE_TYPE_DESC"].value_counts(normalize=True).head(3)
 
 # === Monthly Open/Close for 2024 ===
 hdr["open_year"] = hdr["ACCNT_OPEN_DT"].dt.year
@@ -85,19 +73,23 @@ monthly_open_summaries = [
     f"In {calendar.month_name[m]} 2024, {count} new accounts were opened (monthly onboarding)." for m, count in monthly_open_summary.items()
 ]
 
+yearly_summaries = [
+    f"In {year:.0f}, a total of {count} new accounts were opened (new customer onboarding, reactivation, first-time applications). This accounts for {count/total_accounts:.2%} of all accounts."
+    for year, count in opened_by_year.items()
+] + [
+    f"During {year:.0f}, {count} accounts were closed (account closures, terminated accounts, deactivated). This represents {count/total_accounts:.2%} of the total account base."
+    for year, count in closed_by_year.items()
+]
+
 monthly_close_summaries = [
     f"In {calendar.month_name[m]} 2024, {count} accounts were closed (monthly attrition)." for m, count in monthly_close_summary.items()
 ]
 
 # === Final Enhanced Summaries ===
 summaries = [
-    f"As of {current_year}, there are {len(active_accounts)} active accounts out of {total_accounts} total accounts in the system. Active accounts (currently in use, not closed, still functioning) are those marked as 'Valid Operating Account'. This represents {len(active_accounts)/total_accounts:.2%} of all accounts.",
-
-    f"In {last_year}, a total of {len(opened_last_year)} new accounts were opened (new customer onboarding, reactivation, first-time applications). This accounts for {len(opened_last_year)/total_accounts:.2%} of all accounts.",
-
-    f"During {last_year}, {len(closed_last_year)} accounts were closed (account closures, terminated accounts, deactivated). This represents {len(closed_last_year)/total_accounts:.2%} of the total account base.",
+    f"As of {build_str}, there are {len(active_accounts)} active accounts out of {total_accounts} total accounts in the system. Active accounts (currently in use, not closed, still functioning) are those marked as 'Valid Operating Account'. This represents {len(active_accounts)/total_accounts:.2%} of all accounts.",
 
-    f"As of {cutoff_str}, {len(dormant_accounts)} accounts are dormant (inactive, unused, no login activity) — no login has been recorded for over two years. This is {len(dormant_accounts)/total_accounts:.2%} of all accounts.",
+    f"As of {build_str}, {len(dormant_accounts)} accounts are dormant (inactive, unused, no login activity) — no login has been recorded since {cutoff_str}. This is {len(dormant_accounts)/total_accounts:.2%} of all accounts.",
 
     "Top 3 reasons for account closure (why users close accounts, offboarding reasons, closure insights): " +
     ", ".join([f"{reason} ({pct:.2%})" for reason, pct in top_close.items()]) + ".",
@@ -115,17 +107,43 @@ summaries = [
 
     "Most common roles for users on accounts (account party roles, user roles, ownership types): " +
     ", ".join([f"{role} ({pct:.2%})" for role, pct in role_dist.items()]) + "."
-] + monthly_open_summaries + monthly_close_summaries
+] + yearly_summaries + monthly_open_summaries + monthly_close_summaries
+
+# === Chart Aggregates ===
+monthly_opens_closes = (
+    monthly_table(hdr, "ACCNT_OPEN_DT").rename(columns={"count": "Opened"})
+    .join(monthly_table(hdr, "ACCNT_CLOSE_DT").rename(columns={"count": "Closed"}), how="outer")
+    .fillna(0)
+)
+publish_aggregates(os.path.join(FAISS_OUT_DIR, "aggregates.pkl"), "account", {
+    "monthly_opens_closes": monthly_opens_closes,
+    "status_distribution": distribution_table(hdr["ACCNT_STATUS_DESC"]),
+    "close_reasons": distribution_table(hdr["ACCNT_CLOSE_REASON_DESC"].dropna()),
+    "open_reasons": distribution_table(hdr["ACCNT_OPEN_REASON_DESC"]),
+    "partners": distribution_table(hdr["PRTNR_NAME"]),
+})
+publish_daily(os.path.join(FAISS_OUT_DIR, DAILY_FILE), "account", {
+    "opened": daily_metric(hdr["ACCNT_OPEN_DT"]),
+    "closed": daily_metric(hdr["ACCNT_CLOSE_DT"]),
+    "last_login": daily_metric(hdr["LAST_LOGIN_DT"]),
+})
+
+lap("summaries")
 
 # === FAISS Index Build ===
-model = SentenceTransformer("all-MiniLM-L6-v2")
-embeddings = model.encode(summaries, convert_to_numpy=True)
+embeddings = encode_summaries(summaries)
+lap("embed")
 
 index = faiss.IndexFlatL2(embeddings.shape[1])
 index.add(embeddings)
 
-faiss.write_index(index, os.path.join(FAISS_OUT_DIR, "account_index.faiss"))
+write_index_atomic(index, os.path.join(FAISS_OUT_DIR, "account_index.faiss"))
 with open(os.path.join(FAISS_OUT_DIR, "account_metadata.pkl"), "wb") as f:
     pickle.dump(summaries, f)
+build_lexical_index(summaries, os.path.join(FAISS_OUT_DIR, "account_bm25.pkl"))
+domains = ["account"] * len(summaries)
+save_domains(domains, os.path.join(FAISS_OUT_DIR, "account_domains.pkl"))
+build_domain_router(index, domains, FAISS_OUT_DIR)
+lap("index")
 
 print("✅ FAISS index for account domain rebuilt with enhanced summaries and month-level stats.")
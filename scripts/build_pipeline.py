@@ -0,0 +1,248 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import subprocess
+import sys
+from datetime import datetime
+import faiss
+
+from account_view import CODE_TABLES, SOURCES
+from domain_router import build_domain_router, load_domains, save_domains
+from mmap_store import read_index_mmap, write_index_atomic
+from table_io import BASE_DIR_ENV, base_dir, resolve_table
+
+# === PATHS ===
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = base_dir("F:/Projects/AIModel/demo")
+MANIFEST_FILE = "build_manifest.json"
+
+MAIN = os.path.join("data", "Main_Tables")
+SUPPORT = os.path.join("data", "Supporting_Tables")
+PAYMENT_MAIN = SOURCES["payments"]
+PAYMENT_CODES = [CODE_TABLES[name][0] for name in ("mvmnt_status", "mvmnt_reason", "mvmnt_subsc", "mvmnt_type")]
+VIEW_INPUTS = list(SOURCES.values()) + [path for path, _, _ in CODE_TABLES.values()]
+VIEW_MODULES = ["account_view.py"]   # Where the view's joins and decodes live
+
+# === STAGES ===
+# In build order. Inputs are relative to BASE_DIR and must match what each script reads;
+# the script file itself is always an input too, and so are any "modules" (files next to
+# it) whose code decides what the stage writes: every local module the script imports
+# thresholds, windows or summary logic from belongs there, or editing it leaves the stage
+# "up to date" with stale vectors. The "fresh" stage starts a new index,
+# so rerunning it means every later stage has to append its vectors again. A stage that
+# reads other stages' outputs lists them under "depends" and reruns whenever they do.
+# The domain builders read the account view, but they also keep their raw source files as
+# inputs rather than depending on the view stage, so a change to one table only reruns
+# the builders that use it; a change to account_view.py reruns the view and all of them.
+# A stage with no domain adds no vectors.
+STAGES = [
+    {"name": "account_view", "script": "build_account_view.py", "domain": None, "inputs": VIEW_INPUTS,
+     "modules": VIEW_MODULES},
+    {"name": "account", "script": "build_faiss_index.py", "domain": "account", "fresh": True,
+     "modules": VIEW_MODULES + ["daily_store.py", "time_windows.py"], "inputs": [
+        os.path.join(MAIN, "account", "account_hdr.csv"),
+        os.path.join(MAIN, "account", "accnt_party.csv"),
+        os.path.join(SUPPORT, "account", "accnt_role_type_cd.csv"),
+        os.path.join(SUPPORT, "account", "accnt_status_cd.csv"),
+        os.path.join(SUPPORT, "account", "account_open_reason_data.csv"),
+        os.path.join(SUPPORT, "account", "account_close_reasons_with_mod_user.csv"),
+        os.path.join(SUPPORT, "account", "prtnr_cd.csv"),
+    ]},
+    {"name": "login", "script": "update_faiss_with_customer_login.py", "domain": "login",
+     "modules": VIEW_MODULES + ["daily_store.py", "login_sessions.py"], "inputs": [
+        os.path.join(MAIN, "customer-login", "customer_login.csv"),
+    ]},
+    {"name": "payments", "script": "update_faiss_with_payments.py", "domain": "payment", "modules": VIEW_MODULES, "inputs": [
+        PAYMENT_MAIN, *PAYMENT_CODES,
+    ]},
+    {"name": "payments_detailed", "script": "update_faiss_with_payments_detailed.py", "domain": "payment",
+     "modules": VIEW_MODULES + ["daily_store.py"], "inputs": [
+        PAYMENT_MAIN, *PAYMENT_CODES,
+    ]},
+    {"name": "payment_statement", "script": "update_faiss_with_payment_statement_insights.py",
+     "domain": "payment_statement", "modules": VIEW_MODULES + ["delinquency.py"], "inputs": [
+        PAYMENT_MAIN,
+        os.path.join(MAIN, "payment", "stmt_dtl_updated_consistent_dates.xlsx"),
+        os.path.join(MAIN, "payment", "accnt_dtl_mapped_from_stmt_fixed.xlsx"),
+    ]},
+    {"name": "transactions", "script": "update_faiss_with_transactions.py", "domain": "transaction",
+     "modules": VIEW_MODULES + ["daily_store.py", "transaction_anomalies.py"], "inputs": [
+        os.path.join(MAIN, "transaction", "transactions_updated_dates.xlsx"),
+        os.path.join(SUPPORT, "transaction", "tran_cat_cd.csv"),
+        os.path.join(SUPPORT, "transaction", "Tran_cd.csv"),
+    ]},
+    # Cross-domain account profiles from the view's per-account rollups
+    {"name": "account_profiles", "script": "update_faiss_with_account_profiles.py", "domain": "account", "inputs": [],
+     "depends": ["account_view"]},
+    # Reads the monthly aggregate tables every stage above publishes
+    {"name": "forecasts", "script": "update_faiss_with_forecasts.py", "domain": "forecast", "inputs": [],
+     "modules": ["forecasting.py"],
+     "depends": ["account", "login", "payments", "payments_detailed", "payment_statement", "transactions"]},
+]
+
+
+# === MANIFEST ===
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def input_hashes(stage, base):
+    """{input: sha256} for a stage; a missing input hashes to None so its arrival counts as a change."""
+    hashes = {}
+    for rel in stage["inputs"]:
+        # Hash whichever copy read_table would actually load (xlsx, or a CSV/Parquet stand-in)
+        path = resolve_table(os.path.join(base, rel))
+        key = os.path.relpath(path, base) if path else rel
+        hashes[key.replace(os.sep, "/")] = file_hash(path) if path else None
+    for script in [stage["script"]] + stage.get("modules", []):
+        hashes[f"scripts/{script}"] = file_hash(os.path.join(SCRIPT_DIR, script))
+    return hashes
+
+
+def load_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"stages": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(index_dir, manifest):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def plan(manifest, base, index_dir, forced=()):
+    """[(stage, reasons, hashes)] for every stage, in build order; empty reasons means up to date."""
+    index_exists = os.path.exists(os.path.join(index_dir, "account_index.faiss"))
+    rebuilt_by = None
+    rerun = set()
+    steps = []
+    for stage in STAGES:
+        hashes = input_hashes(stage, base)
+        record = manifest["stages"].get(stage["name"])
+        reasons = []
+        if stage["name"] in forced:
+            reasons.append("forced")
+        if not index_exists or record is None:
+            reasons.append("not built yet")
+        else:
+            changed = sorted(k for k in hashes.keys() | record["inputs"].keys()
+                             if hashes.get(k) != record["inputs"].get(k))
+            reasons.extend(f"{k} changed" for k in changed)
+        if rebuilt_by and not stage.get("fresh"):
+            reasons.append(f"index rebuilt by {rebuilt_by}")
+        reasons.extend(f"{dep} reran" for dep in stage.get("depends", []) if dep in rerun)
+        if reasons and stage.get("fresh"):
+            rebuilt_by = stage["name"]
+        if reasons:
+            rerun.add(stage["name"])
+        steps.append((stage, reasons, hashes))
+    return steps
+
+
+# === VECTOR REPLACEMENT ===
+def remove_stage_vectors(index_dir, manifest, stage):
+    """Drop the vectors (and summaries, domain tags) a stage appended last time.
+
+    FAISS ids are positions, so every later stage's range shifts down and every domain
+    holding a shifted id gets its shards rewritten.
+    """
+    start, end = manifest["stages"][stage["name"]]["vectors"]
+    index_path = os.path.join(index_dir, "account_index.faiss")
+    meta_path = os.path.join(index_dir, "account_metadata.pkl")
+    domain_path = os.path.join(index_dir, "account_domains.pkl")
+
+    index = faiss.read_index(index_path)
+    index.remove_ids(faiss.IDSelectorRange(start, end))
+    with open(meta_path, "rb") as f:
+        metadata = pickle.load(f)
+    domains = load_domains(domain_path, len(metadata))
+    shifted = set(domains[start:])
+    del metadata[start:end]
+    del domains[start:end]
+
+    write_index_atomic(index, index_path)
+    with open(meta_path + ".tmp", "wb") as f:
+        pickle.dump(metadata, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    save_domains(domains, domain_path)
+    build_domain_router(index, domains, index_dir, rebuild_domains=sorted(shifted))
+
+    del manifest["stages"][stage["name"]]
+    for record in manifest["stages"].values():
+        if record["vectors"] and record["vectors"][0] >= end:
+            record["vectors"] = [record["vectors"][0] - (end - start), record["vectors"][1] - (end - start)]
+    print(f"🧹 Removed {end - start:,} vectors from {stage['name']}")
+
+
+def vector_count(index_dir):
+    path = os.path.join(index_dir, "account_index.faiss")
+    return read_index_mmap(path).ntotal if os.path.exists(path) else 0
+
+
+def run_stage(stage, base, index_dir, manifest, hashes):
+    if stage.get("fresh"):
+        manifest["stages"] = {
+            name: record for name, record in manifest["stages"].items() if record["vectors"] is None
+        }
+    elif stage["domain"] and stage["name"] in manifest["stages"]:
+        remove_stage_vectors(index_dir, manifest, stage)
+    save_manifest(index_dir, manifest)
+
+    before = 0 if stage.get("fresh") else vector_count(index_dir)
+    print(f"🔨 Running {stage['script']}...")
+    env = dict(os.environ, **{BASE_DIR_ENV: base})
+    code = subprocess.call([sys.executable, stage["script"]], cwd=SCRIPT_DIR, env=env)
+    if code != 0:
+        print(f"❌ {stage['script']} exited with {code}; later stages were not run")
+        return False
+
+    after = vector_count(index_dir)
+    manifest["stages"][stage["name"]] = {
+        "inputs": hashes,
+        "vectors": [before, after] if stage["domain"] else None,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    save_manifest(index_dir, manifest)
+    print(f"✅ {stage['name']}: {after - before:,} vectors" if stage["domain"] else f"✅ {stage['name']}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild only the index stages whose inputs changed.")
+    parser.add_argument("--base-dir", default=BASE_DIR, help="Project folder holding data/ and faiss_index/")
+    parser.add_argument("--force", nargs="+", default=[], choices=[s["name"] for s in STAGES],
+                        help="Rerun these stages even if their inputs are unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages are out of date")
+    args = parser.parse_args()
+
+    index_dir = os.path.join(args.base_dir, "faiss_index")
+    os.makedirs(index_dir, exist_ok=True)
+    manifest = load_manifest(index_dir)
+    steps = plan(manifest, args.base_dir, index_dir, set(args.force))
+
+    for stage, reasons, _ in steps:
+        status = "; ".join(reasons) if reasons else "up to date"
+        print(f"{'🔁' if reasons else '✔️ '} {stage['name']:<18} {status}")
+    stale = [(stage, hashes) for stage, reasons, hashes in steps if reasons]
+    if args.dry_run or not stale:
+        return 0
+
+    for stage, hashes in stale:
+        if not run_stage(stage, args.base_dir, index_dir, manifest, hashes):
+            return 1
+    print(f"🎉 Rebuilt {len(stale)} of {len(STAGES)} stages")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,569 @@
+import argparse
+import math
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Column-at-a-time synthetic data for scale tests. Every table is generated in
+# chunks of accounts; a chunk's rows depend only on (seed, chunk number), so chunks
+# can be produced in any order and the output is reproducible for a given seed and
+# chunk size. IDs are an affine permutation of the global row number, which makes
+# them unique without remembering what was drawn.
+
+# === CONFIG ===
+DEFAULT_SEED = 2024
+CHUNK_ACCOUNTS = 250_000   # Accounts generated (and written) per chunk
+TRANSACTIONS_PER_ACCOUNT = 5
+STATEMENT_MONTHS = 12      # Monthly statements (and payment attempts) per account
+WORKERS = 1                # Processes generating shards; 1 writes straight to the output files
+
+# === PATHS ===
+BASE_PATH = "F:/Projects/AIModel/demo"
+SUPPORT_DIR = os.path.join(BASE_PATH, "data", "Supporting_Tables")
+PAYMENT_SUPPORT = os.path.join("payment", "internal-payment")
+
+TODAY = np.datetime64("2025-06-30")
+MERCHANTS = np.array([
+    "Preston-Singleton", "Jones-Allen", "Amazon", "Flipkart", "Myntra", "Uber", "Ola", "IndiGo",
+    "SpiceJet", "BookMyShow", "Walker Group", "Hill and Sons", "Baker LLC", "Nguyen PLC", "Reed Inc",
+])
+CITIES = np.array([
+    "Lake Heather", "Baldwinmouth", "Port Jessica", "East Michael", "New Sarah", "South Brian",
+    "Williamsville", "North Amanda", "Lake Jamesside", "West Christopher",
+])
+STATES = np.array(["MO", "WY", "CA", "TX", "NY", "FL", "WA", "IL", "GA", "NC", "OH", "PA"])
+CHANNELS = np.array(["WEB", "MOB", "API"])
+CENTS = np.array([f"{c:02d}" for c in range(100)], dtype=object)
+PAYMENT_CHANNELS = np.array(["MOB", "WEB", "IVR", "CCD"])
+ACH_RETURN_CODES = np.array(["NB3", "Rt2", "Vd0"])
+STATUS_TEXT = np.array([
+    "Live particular sell black.", "Where beyond concern church.", "Customer requested review.",
+    "Payment plan in place.", "Account under collections review.", "No issues reported.",
+])
+CYCLE_TEXT = np.array(["Land stock card gas everybody even.", "Fine for pick say.", "Cycle reviewed.", "Standard cycle."])
+PAST_DUE_STATUS = np.array(["Mu", "Mc", "Md", "Mx"])
+
+# Payment outcome mixes, by MONEY_MVMNT_STATUS_CD_ID / MONEY_MVMNT_SUBSC_OPTN_CD_ID
+OK_STATUS_MIX = {3: 0.90, 1: 0.05, 6: 0.03, 7: 0.02}          # COMPLETED, PENDING, IN PROCESS, CANCELLED
+FAILED_STATUS_MIX = {2: 0.60, 11: 0.25, 16: 0.15}             # FAILED, RETURNED, REJECTED
+SUBSC_MIX = {1: 0.45, 2: 0.35, 3: 0.10, 5: 0.05, 6: 0.05}     # MINIMUM, FULL, FIXED, CURRENT_BALANCE, PAYOFF
+PAYMENT_GRACE_DAYS = 15    # Statement close to payment due date
+PAST_DUE_BUCKETS = [
+    "PAST_DUE_1_30_AMT", "PAST_DUE_31_60_AMT", "PAST_DUE_61_90_AMT", "PAST_DUE_91_120_AMT",
+    "PAST_DUE_121_150_AMT", "PAST_DUE_151_180_AMT", "PAST_DUE_181_210_AMT", "PAST_DUE_211_240_AMT",
+    "PAST_DUE_241_270_AMT", "PAST_DUE_271_300_AMT", "PAST_DUE_301_330_AMT", "PAST_DUE_331_360_AMT",
+    "PAST_DUE_361_UP_AMT",
+]
+
+
+def load_codes(folder, filename, column=None):
+    """Code values from a supporting table (first column unless `column` is given)."""
+    path = os.path.join(SUPPORT_DIR, folder, filename)
+    df = pd.read_csv(path, encoding="utf-8-sig") if path.endswith(".csv") else pd.read_excel(path)
+    return df[column or df.columns[0]].dropna().to_numpy()
+
+
+def load_code_tables():
+    return {
+        "partner": load_codes("account", "prtnr_cd.csv"),
+        "accnt_status": load_codes("account", "accnt_status_cd.csv"),
+        "open_reason": load_codes("account", "account_open_reason_data.csv"),
+        "close_reason": load_codes("account", "account_close_reasons_with_mod_user.csv"),
+        "role_type": load_codes("account", "accnt_role_type_cd.csv"),
+        "login_status": load_codes("customer-login", "login_status_data.csv"),
+        "tran_cd": load_codes("transaction", "Tran_cd.csv"),
+        "tran_cat": load_codes("transaction", "tran_cat_cd.csv"),
+        "mvmnt_type": load_codes(PAYMENT_SUPPORT, "money_mvmnt_type.xlsx"),
+        "status_reason": load_codes(PAYMENT_SUPPORT, "money_mvmnt_status_reason_full.csv"),
+    }
+
+
+# === VECTORIZED COLUMNS ===
+class IdSpace:
+    """Unique `digits`-digit IDs: row i maps to low + (a*i + b) mod span, a coprime with span."""
+
+    def __init__(self, digits, seed_seq):
+        self.low = 10 ** (digits - 1)
+        self.span = 10 ** digits - self.low
+        rng = np.random.default_rng(seed_seq)
+        while True:
+            a = int(rng.integers(self.span // 3, self.span))
+            if math.gcd(a, self.span) == 1:
+                break
+        self.a = a
+        self.b = int(rng.integers(0, self.span))
+
+    def ids(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) and rows.max() >= self.span:
+            raise ValueError(f"ID space of {self.span} values exhausted")
+        if self.a * self.span + self.b < 2 ** 63:
+            return self.low + (rows * self.a + self.b) % self.span
+        # Python ints avoid int64 overflow in a*i for very wide ID spaces
+        return (self.low + (rows.astype(object) * self.a + self.b) % self.span).astype(np.int64)
+
+
+def id_digits(count, minimum):
+    """Digits needed so `count` unique IDs use at most a tenth of the space."""
+    return max(minimum, len(str(count * 10)))
+
+
+def random_days(rng, n, start, end):
+    """Uniform dates in [start, end] as datetime64[D]; start/end may be arrays."""
+    start = np.asarray(start, dtype="datetime64[D]")
+    end = np.asarray(end, dtype="datetime64[D]")
+    width = (end - start).astype(np.int64) + 1
+    return start + (rng.random(n) * width).astype(np.int64)
+
+
+def random_timestamps(rng, n, start, end):
+    days = random_days(rng, n, start, end).astype("datetime64[us]")
+    return days + rng.integers(0, 86_400_000_000, n).astype("timedelta64[us]")
+
+
+def format_days(days, fmt):
+    """strftime over a date column by formatting each distinct day once."""
+    unique, inverse = np.unique(days, return_inverse=True)
+    return pd.to_datetime(unique).strftime(fmt).to_numpy()[inverse]
+
+
+def format_amounts(amounts):
+    """Two-decimal strings for non-negative amounts without a per-row format call."""
+    cents = np.round(np.asarray(amounts) * 100).astype(np.int64)
+    return pd.Series(cents // 100).astype(str) + "." + pd.Series(CENTS[cents % 100])
+
+
+def choice(rng, values, n, p=None):
+    return values[rng.choice(len(values), size=n, p=p)]
+
+
+def mix_choice(rng, mix, n):
+    return choice(rng, np.array(list(mix)), n, list(mix.values()))
+
+
+HEX = np.frombuffer(b"0123456789abcdef", dtype="S1")
+
+
+def guid_strings(rng, n):
+    """Random UUID-shaped strings, built as a byte matrix rather than one uuid4() per row."""
+    chars = HEX[rng.integers(0, 16, (n, 32))]
+    chars = np.insert(chars, [8, 12, 16, 20], b"-", axis=1)
+    return chars.view("S36").ravel().astype(str)
+
+
+def skewed_weights(k, rng, concentration=0.5):
+    """Fixed, uneven category weights so charts are not flat."""
+    return rng.dirichlet(np.full(k, concentration))
+
+
+def sequence_labels(prefix, rows):
+    return prefix + pd.Series(rows).astype(str)
+
+
+# === TABLES ===
+class Keys:
+    """Cross-table keys for account rows [start, start + n)."""
+
+    def __init__(self, spaces, start, n):
+        self.rows = np.arange(start, start + n, dtype=np.int64)
+        self.accnt_id = spaces["accnt"].ids(self.rows)
+        self.party_id = spaces["party"].ids(self.rows)
+
+
+def accnt_hdr_chunk(keys, codes, rng, weights):
+    n = len(keys.rows)
+    open_dt = random_days(rng, n, np.datetime64("2005-01-01"), TODAY - 30)
+    closed = rng.random(n) < 0.3
+    close_dt = random_days(rng, n, open_dt, TODAY)
+    close_reason = choice(rng, codes["close_reason"], n).astype(float)
+    return pd.DataFrame({
+        "ACCNT_ID": keys.accnt_id,
+        "PRTNR_CD_ID": choice(rng, codes["partner"], n, weights["partner"]),
+        "ACCNT_STATUS_CD_ID": choice(rng, codes["accnt_status"], n, weights["accnt_status"]),
+        "LOGIN_STATUS_CD_ID": choice(rng, codes["login_status"], n, weights["login_status"]),
+        "ACCNT_OPEN_DT": open_dt,
+        "ACCNT_OPEN_REASON_CD_ID": choice(rng, codes["open_reason"], n, weights["open_reason"]),
+        "ACCNT_CLOSE_DT": np.where(closed, close_dt, np.datetime64("NaT")),
+        "ACCNT_CLOSE_REASON_CD_ID": np.where(closed, close_reason, -99.0),
+        "LAST_LOGIN_DT": random_days(rng, n, open_dt, TODAY),
+        "LAST_UPDT_TS": random_timestamps(rng, n, TODAY - 540, TODAY),
+        "LAST_UPDT_USER": sequence_labels("user", keys.rows),
+        "INSRT_TS": random_timestamps(rng, n, np.datetime64("2020-01-01"), TODAY),
+        "INSRT_USER": sequence_labels("insrt_user", keys.rows),
+        "MOD_TS": random_timestamps(rng, n, TODAY - 540, TODAY),
+        "MOD_USER": sequence_labels("mod_user", keys.rows),
+    })
+
+
+def accnt_party_chunk(keys, spaces, codes, rng, weights):
+    n = len(keys.rows)
+    insrt_ts = random_timestamps(rng, n, np.datetime64("2020-01-01"), TODAY - 365)
+    return pd.DataFrame({
+        "ACCNT_PARTY_ID": spaces["accnt_party"].ids(keys.rows),
+        "ACCNT_ID": keys.accnt_id,
+        "PARTY_ID": keys.party_id,
+        "ACCNT_ROLE_TYPE_CD_ID": choice(rng, codes["role_type"], n, weights["role_type"]),
+        "ACCNT_NICK_NM": sequence_labels("Nick_", keys.rows),
+        "INSRT_USER": sequence_labels("insrt_user", keys.rows),
+        "INSRT_TS": insrt_ts,
+        "UPDT_USER": sequence_labels("updt_user", keys.rows),
+        "UPDT_TS": insrt_ts + rng.integers(1, 730, n).astype("timedelta64[D]"),
+    })
+
+
+def customer_login_chunk(keys, spaces, codes, rng, weights):
+    n = len(keys.rows)
+    rgstr = random_days(rng, n, np.datetime64("2019-01-01"), TODAY - 365)
+    alphabet = np.frombuffer(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", dtype="S1")
+    pswd = alphabet[rng.integers(0, len(alphabet), (n, 16))].view("S16").ravel().astype(str)
+    return pd.DataFrame({
+        "LOGIN_ID": spaces["login"].ids(keys.rows),
+        "PARTY_ID": keys.party_id,
+        "USER_ID_TX": sequence_labels("user", keys.rows + 1),
+        "LAST_LOGIN_TS": random_days(rng, n, rgstr, TODAY),
+        "LOGIN_STATUS_CD_ID": choice(rng, codes["login_status"], n, weights["login_status"]),
+        "RGSTR_TS": rgstr,
+        "INSRT_TS": random_days(rng, n, rgstr, TODAY),
+        "INSRT_USER": "SYSUSER",
+        "MOD_TS": random_days(rng, n, rgstr, TODAY),
+        "MOD_USER": "SYSADMIN",
+        "PSWD": pswd,
+        "SRVCG_CHNL_CD": choice(rng, CHANNELS, n, [0.45, 0.45, 0.10]),
+    })
+
+
+def transactions_chunk(keys, codes, rng, weights, per_account):
+    n = len(keys.rows) * per_account
+    accnt_id = np.repeat(keys.accnt_id, per_account)
+    tran_date = random_days(rng, n, TODAY - 365, TODAY - 90)
+    amount = np.round(rng.lognormal(6.0, 1.4, n).clip(1.0, 10_000.0), 2)
+    merchant = choice(rng, MERCHANTS, n)
+    successful = rng.random(n) < 0.85
+    status = np.where(successful, "Successful", "Returned")
+    description = (
+        pd.Series(merchant) + " transaction of $" + format_amounts(amount)
+        + np.where(successful, " was successful.", " was returned.")
+    )
+    return pd.DataFrame({
+        "ACCNT_ID": accnt_id,
+        "MRCHNT_DBA_NM": merchant,
+        "TRAN_DATE": format_days(tran_date, "%m/%d/%Y"),
+        "TRAN_POST_DATE": format_days(tran_date + rng.integers(0, 5, n), "%m/%d/%Y"),
+        "TRAN_CD": choice(rng, codes["tran_cd"], n, weights["tran_cd"]),
+        "TRAN_CAT_CD": choice(rng, codes["tran_cat"], n, weights["tran_cat"]),
+        "TRANS_FRAUD_FLAG": np.where(rng.random(n) < 0.02, "Y", "N"),
+        "TRAN_AMT": amount,
+        "INCHG_FEE": np.round(amount * rng.uniform(0.005, 0.03, n), 2),
+        "DBR_CD_ID": choice(rng, np.array(["D", "C"]), n, [0.8, 0.2]),
+        "MRCHNT_CITY_NM": choice(rng, CITIES, n),
+        "MRCHNT_STATE_CD": choice(rng, STATES, n),
+        "Status": status,
+        "Description": description,
+        "CIFDB_ACCNT_ID": accnt_id,
+        "ELCTRNC_PYMT_VALUE": np.where(rng.random(n) < 0.3, "Y", "N"),
+    })
+
+
+class StatementCycles:
+    """Monthly statements for each account: (accounts × months) arrays, oldest month first.
+
+    Each account closes on its own cycle day; balances move with utilisation against a
+    fixed limit, and riskier accounts pay late or miss more often.
+    """
+
+    def __init__(self, rng, n, months):
+        last_month = TODAY.astype("datetime64[M]") - 1
+        month = last_month - np.arange(months - 1, -1, -1)
+        cycle_day = rng.integers(1, 29, n)[:, None]
+        self.close = month.astype("datetime64[D]")[None, :] + (cycle_day - 1)
+        self.start = (month - 1).astype("datetime64[D]")[None, :] + cycle_day
+        self.due = self.close + PAYMENT_GRACE_DAYS
+        self.limit = np.round(rng.lognormal(9.0, 0.7, n), -2).clip(500)
+        self.balance = np.round(self.limit[:, None] * rng.beta(2, 5, (n, months)), 2)
+        self.min_due = np.round(np.minimum(self.balance, np.maximum(25.0, self.balance * 0.03)), 2)
+        self.risk = rng.beta(1.2, 10, n)[:, None]
+        self.autopay = rng.random(n) < 0.4
+
+        # One payment attempt per cycle unless skipped; failed or skipped cycles are missed
+        self.attempted = rng.random((n, months)) > self.risk * 0.5
+        self.failed = self.attempted & (rng.random((n, months)) < 0.05 + 0.5 * self.risk)
+        self.late = rng.random((n, months)) < self.risk
+        self.missed = ~self.attempted | self.failed
+
+
+def stmt_dtl_chunk(keys, cycles, rng):
+    n, months = cycles.close.shape
+    total = n * months
+    return pd.DataFrame({
+        "ACCT_GUID": guid_strings(rng, total),
+        "STMT_CLOS_DT": format_days(cycles.close.ravel(), "%d-%m-%Y"),
+        "CIFDB_ACCT_ID": np.repeat(keys.accnt_id, months),
+        "STMT_START_DT": format_days(cycles.start.ravel(), "%d-%m-%Y"),
+        "PAYMT_DUE_DT": format_days(cycles.due.ravel(), "%d-%m-%Y"),
+        "CYCL_DAY_CNT": ((cycles.close - cycles.start).astype(np.int64) + 1).ravel(),
+        "PAYMT_MIN_STMT_AMT": cycles.min_due.ravel(),
+        "BAL_CURR_AMT": cycles.balance.ravel(),
+        "EFE_DT": format_days((cycles.close + rng.integers(1, 21, (n, months))).ravel(), "%d-%m-%Y"),
+        "PAYMT_SCHD_PROCESS_FLAG": np.repeat(np.where(cycles.autopay, "Y", "N"), months),
+    })
+
+
+def payment_movement_chunk(keys, cycles, codes, rng):
+    n, months = cycles.close.shape
+    # Flattened (account, month) slots that have a payment attempt, in account order
+    slots = np.flatnonzero(cycles.attempted.ravel())
+    row = slots // months
+    failed = cycles.failed.ravel()[slots]
+    late = cycles.late.ravel()[slots]
+    k = len(slots)
+
+    offset = np.where(late, rng.integers(1, 31, k), -rng.integers(0, 15, k))
+    trans_date = cycles.due.ravel()[slots] + offset
+    option = mix_choice(rng, SUBSC_MIX, k)
+    balance = cycles.balance.ravel()[slots]
+    min_due = cycles.min_due.ravel()[slots]
+    amount = np.select(
+        [option == 1, option == 3],
+        [min_due, np.round(rng.uniform(min_due, np.maximum(balance, min_due)), 2)],
+        balance,
+    )
+    status = np.where(failed, mix_choice(rng, FAILED_STATUS_MIX, k), mix_choice(rng, OK_STATUS_MIX, k))
+    reason = np.where(failed, choice(rng, codes["status_reason"], k).astype(float), np.nan)
+    ach = np.where(status == 11, choice(rng, ACH_RETURN_CODES, k), "")
+    subsc_id = np.where(cycles.autopay[row], (keys.rows[row] + 1).astype(float), np.nan)
+    return pd.DataFrame({
+        "MONEY_MVMNT_ID": keys.rows[row] * months + slots % months + 1,
+        "PARTY_ID": keys.party_id[row],
+        "ACCNT_ID": keys.accnt_id[row],
+        "MVMNT_TYPE_CD_ID": choice(rng, codes["mvmnt_type"], k),
+        "MONEY_MVMNT_STATUS_CD_ID": status,
+        "MNY_MVMNT_STATUS_REASON_CD_ID": reason,
+        "MONEY_MVMNT_SUBSC_ID": subsc_id,
+        "MONEY_MVMNT_SUBSC_OPTN_CD_ID": option,
+        "AMT": amount,
+        "TRANS_NBR": rng.integers(100_000, 1_000_000, k),
+        "TRANS_TS": format_days(trans_date, "%d-%m-%Y"),
+        "ACH_RETURN_CD_ID": ach,
+        "MONEY_MVMNT_CHNL_TYPE_CD_ID": choice(rng, PAYMENT_CHANNELS, k, [0.4, 0.3, 0.2, 0.1]),
+        "CHECK_NBR": np.nan,
+    })
+
+
+def accnt_dtl_chunk(keys, cycles, rng):
+    """Account detail as of the latest statement; past-due buckets come from the run of missed cycles."""
+    n, months = cycles.close.shape
+    reversed_missed = cycles.missed[:, ::-1]
+    trailing = np.where(reversed_missed.all(axis=1), months, reversed_missed.argmin(axis=1))
+    buckets = {}
+    for j, name in enumerate(PAST_DUE_BUCKETS):
+        amount = np.where(trailing > j, cycles.min_due[:, max(months - 1 - j, 0)], 0.0) if j < months else 0.0
+        buckets[name] = np.zeros(n) + amount
+    if months > len(PAST_DUE_BUCKETS):
+        # Cycles older than the last bucket roll into 361+
+        older = np.arange(months)[None, :] < (months - len(PAST_DUE_BUCKETS))
+        in_run = np.arange(months)[None, :] >= (months - trailing)[:, None]
+        buckets["PAST_DUE_361_UP_AMT"] += (cycles.min_due * (older & in_run)).sum(axis=1)
+    total_past_due = np.round(sum(buckets.values()), 2)
+
+    days_past_due = np.where(trailing > 0, trailing * 30 - rng.integers(0, 30, n), 0)
+    ever_missed = cycles.missed.any(axis=1)
+    last_missed = months - 1 - cycles.missed[:, ::-1].argmax(axis=1)
+    last_missed_due = cycles.due[np.arange(n), last_missed].astype("datetime64[us]")
+    last_close = cycles.close[:, -1]
+    balance = cycles.balance[:, -1]
+    return pd.DataFrame({
+        "ACCT_GUID": guid_strings(rng, n),
+        "EFF_DT": last_close + rng.integers(1, 15, n),
+        "CIFDB_ACCT_ID": keys.accnt_id,
+        "ACCT_BAL_AMT": balance,
+        "ACCT_STATUS_RSN_TXT": choice(rng, STATUS_TEXT, n),
+        "PAYMT_MIN_DUE_AMT": cycles.min_due[:, -1],
+        **{name: np.round(values, 2) for name, values in buckets.items()},
+        "CHARGEOFF_DT": np.where(trailing >= 6, last_close, np.datetime64("NaT")),
+        "CR_LMT_AMT": cycles.limit,
+        "CR_LMT_AVLB_AMT": np.round(cycles.limit - balance, 2),
+        "TOT_PAST_DUE_AMT": total_past_due,
+        "LAST_PAST_DUE_CYCL_AMT": buckets["PAST_DUE_1_30_AMT"],
+        "PAST_DUE_CYCL_LTD_CNT": cycles.missed.sum(axis=1),
+        "ACTL_DAYS_PAST_DUE_CNT": days_past_due,
+        "CNSCTV_DAYS_PAST_DUE_CNT": days_past_due,
+        "MOST_RCNT_PAST_DUE_DT": np.where(
+            ever_missed, last_missed_due + rng.integers(0, 86_400_000_000, n).astype("timedelta64[us]"),
+            np.datetime64("NaT"),
+        ),
+        "PAST_DUE_ACCT_STATUS_CD": choice(rng, PAST_DUE_STATUS, n),
+        "COLL_ENRLM_STATUS_CD": "CENRL" + pd.Series(rng.integers(0, 1000, n)).astype(str).str.zfill(3),
+        "PAST_DUE_CYCL_TXT": choice(rng, CYCLE_TEXT, n),
+        "CLNT_PRDCT_CD": "PRDCT" + pd.Series(rng.integers(1, 100, n)).astype(str),
+    })
+
+
+# Output file per table, mirroring data/Main_Tables; stems match the files the builders read
+TABLE_FILES = {
+    "accnt_hdr": os.path.join("account", "account_hdr"),
+    "accnt_party": os.path.join("account", "accnt_party"),
+    "customer_login": os.path.join("customer-login", "customer_login"),
+    "transactions": os.path.join("transaction", "transactions_updated_dates"),
+    "stmt_dtl": os.path.join("payment", "stmt_dtl_updated_consistent_dates"),
+    "accnt_dtl_c": os.path.join("payment", "accnt_dtl_mapped_from_stmt_fixed"),
+    "payment_movement": os.path.join("payment", "Internal-payment", "payment_movement_5000_full_records"),
+}
+
+
+# === WRITERS ===
+class ChunkWriter:
+    """Appends DataFrame chunks to one CSV (header once) or one Parquet file (a row group per chunk)."""
+
+    def __init__(self, path, fmt):
+        self.path = f"{path}.{fmt}"
+        self.fmt = fmt
+        self.parquet = None
+        self.rows = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if fmt == "parquet":
+            import pyarrow  # noqa: F401  (fail before generating anything if Parquet is unavailable)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def append_part(self, part_path, rows):
+        """Append a shard written by a worker process, in shard order."""
+        if self.fmt == "csv":
+            with open(part_path, "rb") as src, open(self.path, "ab") as dst:
+                header = src.readline()
+                if self.rows == 0:
+                    dst.write(header)
+                shutil.copyfileobj(src, dst, 16 * 2**20)
+        else:
+            import pyarrow.parquet as pq
+            table = pq.read_table(part_path)
+            if self.parquet is None:
+                self.parquet = pq.ParquetWriter(self.path, table.schema)
+            self.parquet.write_table(table)
+        self.rows += rows
+        os.remove(part_path)
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="a", header=self.rows == 0, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.parquet is None:
+                self.parquet = pq.ParquetWriter(self.path, table.schema)
+            self.parquet.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self.parquet is not None:
+            self.parquet.close()
+
+
+# === DRIVER ===
+def id_spaces(seed, accounts):
+    seqs = np.random.SeedSequence([seed, 0]).spawn(4)
+    return {
+        "accnt": IdSpace(id_digits(accounts, 7), seqs[0]),
+        "party": IdSpace(id_digits(accounts, 8), seqs[1]),
+        "accnt_party": IdSpace(id_digits(accounts, 8), seqs[2]),
+        "login": IdSpace(id_digits(accounts, 9), seqs[3]),
+    }
+
+
+def category_weights(seed, codes):
+    rng = np.random.default_rng(np.random.SeedSequence([seed, 1]))
+    return {name: skewed_weights(len(values), rng) for name, values in sorted(codes.items())}
+
+
+def generate_chunk(seed, chunk, start, n, spaces, codes, weights, volumes):
+    """All tables for account rows [start, start + n); chunk number `chunk` fixes the random stream."""
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence([seed, 2, chunk]).spawn(8)]
+    keys = Keys(spaces, start, n)
+    cycles = StatementCycles(rngs[4], n, volumes["statement_months"])
+    return {
+        "accnt_hdr": accnt_hdr_chunk(keys, codes, rngs[0], weights),
+        "accnt_party": accnt_party_chunk(keys, spaces, codes, rngs[1], weights),
+        "customer_login": customer_login_chunk(keys, spaces, codes, rngs[2], weights),
+        "transactions": transactions_chunk(keys, codes, rngs[3], weights, volumes["transactions_per_account"]),
+        "stmt_dtl": stmt_dtl_chunk(keys, cycles, rngs[5]),
+        "accnt_dtl_c": accnt_dtl_chunk(keys, cycles, rngs[6]),
+        "payment_movement": payment_movement_chunk(keys, cycles, codes, rngs[7]),
+    }
+
+
+def write_shard(parts_dir, fmt, seed, chunk, start, n, spaces, codes, weights, volumes):
+    """Worker-process entry point: generate one chunk and write each table to its own part file."""
+    parts = {}
+    for name, df in generate_chunk(seed, chunk, start, n, spaces, codes, weights, volumes).items():
+        writer = ChunkWriter(os.path.join(parts_dir, name, f"{chunk:06d}"), fmt)
+        writer.write(df)
+        writer.close()
+        parts[name] = (writer.path, writer.rows)
+    return parts
+
+
+def generate(out_dir, accounts, fmt="csv", seed=DEFAULT_SEED, per_account=TRANSACTIONS_PER_ACCOUNT,
+             chunk_accounts=CHUNK_ACCOUNTS, codes=None, statement_months=STATEMENT_MONTHS, workers=WORKERS):
+    """Write every table for `accounts` accounts under `out_dir`; returns rows written per table.
+
+    With workers > 1, chunks are generated in parallel processes and stitched into
+    the output files in chunk order, so the result matches a single-process run.
+    """
+    codes = codes or load_code_tables()
+    spaces = id_spaces(seed, accounts)
+    weights = category_weights(seed, codes)
+    volumes = {"transactions_per_account": per_account, "statement_months": statement_months}
+    chunks = [(chunk, start, min(chunk_accounts, accounts - start))
+              for chunk, start in enumerate(range(0, accounts, chunk_accounts))]
+    writers = {name: ChunkWriter(os.path.join(out_dir, rel), fmt) for name, rel in TABLE_FILES.items()}
+    try:
+        if workers <= 1:
+            for chunk, start, n in chunks:
+                for name, df in generate_chunk(seed, chunk, start, n, spaces, codes, weights, volumes).items():
+                    writers[name].write(df)
+                print(f"  ⏳ {start + n:,}/{accounts:,} accounts")
+        else:
+            parts_dir = os.path.join(out_dir, ".parts")
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(write_shard, parts_dir, fmt, seed, chunk, start, n, spaces, codes, weights, volumes)
+                    for chunk, start, n in chunks
+                ]
+                for (chunk, start, n), future in zip(chunks, futures):
+                    for name, (part_path, rows) in future.result().items():
+                        writers[name].append_part(part_path, rows)
+                    print(f"  ⏳ {start + n:,}/{accounts:,} accounts")
+            shutil.rmtree(parts_dir, ignore_errors=True)
+    finally:
+        for w in writers.values():
+            w.close()
+    return {name: w.rows for name, w in writers.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate large synthetic banking tables with NumPy.")
+    parser.add_argument("--accounts", type=int, default=1_000_000)
+    parser.add_argument("--out-dir", default=os.path.join(BASE_PATH, "data", "Synthetic_Tables"))
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--transactions-per-account", type=int, default=TRANSACTIONS_PER_ACCOUNT)
+    parser.add_argument("--statement-months", type=int, default=STATEMENT_MONTHS)
+    parser.add_argument("--chunk-accounts", type=int, default=CHUNK_ACCOUNTS)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Processes generating shards in parallel")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = generate(args.out_dir, args.accounts, args.format, args.seed, args.transactions_per_account,
+                    args.chunk_accounts, statement_months=args.statement_months, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    total = sum(rows.values())
+    print(f"✅ {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s) → {args.out_dir}")
+    for name, n in rows.items():
+        print(f"  {name}: {n:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import re
+import calendar
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+from metrics import counter
+
+# === CONFIG ===
+FIGURE_CACHE_SIZE = 64   # Rendered figures kept per process
+TREND_MONTHS = 12        # Months shown on trend (line) charts
+TREND_SERIES = 4         # Largest categories drawn on a multi-series trend
+
+MONTH_YEAR_RE = re.compile(
+    r"\b(" + "|".join(calendar.month_name[1:]) + r")\s+(\d{4})\b", re.IGNORECASE
+)
+
+# Per domain, the first spec whose keywords all appear in the question/answer wins;
+# the last spec is the domain default.
+CHART_SPECS = {
+    "account": [
+        (("reason", "clos"), "close_reasons", "horizontalBar", "Top Reasons for Account Closure"),
+        (("reason", "open"), "open_reasons", "horizontalBar", "Top Reasons for Account Opening"),
+        (("partner",), "partners", "horizontalBar", "Accounts by Partner"),
+        (("status",), "status_distribution", "doughnut", "Account Status Breakdown"),
+        ((), "monthly_opens_closes", "bar", "Accounts Opened vs Closed"),
+    ],
+    "login": [
+        (("burst",), "monthly_bursts", "bar", "Invalid Password Bursts by Channel"),
+        (("fail", "channel"), "monthly_channel_failure_rate", "line", "Login Failure Rate by Channel (%)"),
+        (("channel",), "channel_distribution", "pie", "Logins by Channel"),
+        ((), "monthly_status", "bar", "Login Status Distribution"),
+    ],
+    "payment": [
+        (("reason",), "monthly_failure_reasons", "horizontalBar", "Top Payment Failure Reasons"),
+        (("channel",), "monthly_channel", "bar", "Payments by Channel"),
+        (("subscription",), "monthly_subscription", "bar", "Payments by Subscription Option"),
+        (("type",), "monthly_type", "bar", "Payments by Type"),
+        (("total",), "monthly_amount", "line", "Total Payment Amount"),
+        ((), "monthly_status", "doughnut", "Payment Outcomes"),
+    ],
+    "payment_statement": [
+        (("minimum",), "monthly_min_due", "pie", "Minimum Due Coverage"),
+        (("recover",), "monthly_transitions", "bar", "Delinquency State Changes"),
+        (("delinquen",), "monthly_states", "bar", "Accounts by Delinquency State"),
+        ((), "monthly_overdue", "bar", "Overdue Accounts"),
+    ],
+    "transaction": [
+        (("categor",), "monthly_category", "bar", "Transactions by Category"),
+        (("type",), "monthly_type", "bar", "Transactions by Type"),
+        (("amount",), "monthly_amount", "line", "Transaction Amount"),
+        ((), "monthly_volume", "line", "Transaction Volume"),
+    ],
+}
+
+
+@dataclass(frozen=True)
+class ChartSpec:
+    domain: str
+    table: str
+    chart_type: str
+    title: str
+    period: str = None   # "2024-06" for one month, None for a trend / cross-section
+
+
+def find_period(*texts):
+    for text in texts:
+        m = MONTH_YEAR_RE.search(text or "")
+        if m:
+            return str(pd.Period(f"{m.group(1).title()} {m.group(2)}", freq="M"))
+    return None
+
+
+def chart_spec_for(domain, question, summary, aggregates):
+    """Pick a chart for an answer from the domain of its top match and the period it mentions."""
+    tables = aggregates["tables"].get(domain, {})
+    text = f"{question} {summary}".lower()
+    for keywords, table, chart_type, title in CHART_SPECS.get(domain, []):
+        if table in tables and all(k in text for k in keywords):
+            break
+    else:
+        return None
+
+    frame = tables[table]
+    period = None
+    if isinstance(frame.index, pd.PeriodIndex) and len(frame):
+        period = find_period(summary, question)
+        wants_trend = any(w in text for w in ("trend", "over ", "month over month", "increase", "decrease"))
+        if wants_trend or chart_type == "line":
+            period = None
+        elif period is None or pd.Period(period, freq="M") not in frame.index:
+            period = str(frame.index.max())
+        if period is None:
+            chart_type = "line"
+    return ChartSpec(domain, table, chart_type, title, period)
+
+
+def chart_data(spec, aggregates):
+    """(labels, values, title) for a spec; values is a dict of series for trend lines."""
+    frame = aggregates["tables"][spec.domain][spec.table]
+    if spec.period is not None:
+        row = frame.loc[pd.Period(spec.period, freq="M")]
+        row = row[row > 0].sort_values(ascending=False).head(8)
+        month = pd.Period(spec.period, freq="M").strftime("%B %Y")
+        return list(row.index.astype(str)), [float(v) for v in row.values], f"{spec.title} - {month}"
+    if isinstance(frame.index, pd.PeriodIndex):
+        recent = frame.sort_index().tail(TREND_MONTHS)
+        top_cols = recent.sum().sort_values(ascending=False).head(TREND_SERIES).index
+        labels = [p.strftime("%b %Y") for p in recent.index]
+        series = {str(col): [float(v) for v in recent[col].values] for col in top_cols}
+        return labels, series, f"{spec.title} - Last {len(recent)} Months"
+    row = frame.iloc[0]
+    row = row[row > 0].sort_values(ascending=False).head(8)
+    return list(row.index.astype(str)), [float(v) for v in row.values], spec.title
+
+
+def draw_chart(labels, values, title, chart_type):
+    """Render a chart on a standalone Figure (not registered with pyplot, so safe to cache)."""
+    fig = Figure(figsize=(6, 3.7))
+    ax = fig.subplots()
+    if chart_type == "bar":
+        ax.bar(labels, values, color='orange')
+        ax.set_title(title, fontsize=6)
+        ax.tick_params(axis='x', labelsize=7, labelrotation=45)
+        ax.tick_params(axis='y', labelsize=7)
+        for tick in ax.get_xticklabels():
+            tick.set_horizontalalignment('right')
+
+    elif chart_type == "horizontalBar":
+        bars = ax.barh(labels, values, color='#4682B4', edgecolor='black')
+        for bar in bars:
+            width = bar.get_width()
+            ax.text(width + 0.5, bar.get_y() + bar.get_height() / 2,
+                    f'{width:g}', va='center', fontsize=6, weight='bold', color='black')
+        ax.set_title(title, fontsize=6, weight='bold')
+        ax.tick_params(axis='y', labelsize=6)
+        ax.tick_params(axis='x', labelsize=6)
+        ax.xaxis.grid(True, linestyle='--', alpha=0.5)
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+
+    elif chart_type == "pie":
+        ax.pie(values, labels=labels, autopct='%1.1f%%', startangle=75, textprops={'fontsize': 7})
+        ax.set_title(title, fontsize=6)
+        ax.axis('equal')
+
+    elif chart_type == "doughnut":
+        ax.pie(
+            values,
+            labels=labels,
+            autopct='%1.1f%%',
+            startangle=140,
+            colors=['#4CAF50', '#FF5722'] if len(values) == 2 else None,  # Success: green, Fail: orange
+            textprops={'fontsize': 7, 'weight': 'bold'}
+        )
+        ax.add_artist(Circle((0, 0), 0.70, fc='white'))
+        ax.set_title(title, fontsize=6, weight='bold')
+        ax.axis('equal')
+
+    elif chart_type == "line":
+        series = values if isinstance(values, dict) else {"Value": values}
+        for name, points in series.items():
+            ax.plot(labels, points, marker='o', linestyle='-', label=name)
+        if len(series) > 1:
+            ax.legend(fontsize=6)
+        ax.set_title(title)
+        ax.set_ylabel("Value")
+        ax.tick_params(axis='x', labelrotation=45)
+        for tick in ax.get_xticklabels():
+            tick.set_horizontalalignment('right')
+
+    else:
+        return None
+
+    fig.tight_layout()
+    return fig
+
+
+# === FIGURE CACHE ===
+_figure_cache = OrderedDict()
+_figure_lock = Lock()
+FIGURE_CACHE = counter("chart_figure_cache_total", "Chart figure cache lookups by result")
+
+
+def get_figure(spec, aggregates):
+    """Rendered figure for (aggregate version, spec); only renders on a cache miss."""
+    key = (aggregates["version"], spec)
+    with _figure_lock:
+        fig = _figure_cache.get(key)
+        if fig is not None:
+            _figure_cache.move_to_end(key)
+            FIGURE_CACHE.inc(result="hit")
+            return fig
+        FIGURE_CACHE.inc(result="miss")
+
+    labels, values, title = chart_data(spec, aggregates)
+    fig = draw_chart(labels, values, title, spec.chart_type) if labels else None
+
+    with _figure_lock:
+        _figure_cache[key] = fig
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    return fig
+
+
+def prerender(aggregates, questions):
+    """Warm the cache with the charts for the most-asked questions.
+
+    Each question is paired with the domain it is usually answered from, so no
+    retrieval is needed at startup.
+    """
+    rendered = 0
+    for question, domain in questions:
+        spec = chart_spec_for(domain, question, "", aggregates)
+        if spec is not None and get_figure(spec, aggregates) is not None:
+            rendered += 1
+    return rendered
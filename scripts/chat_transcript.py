@@ -0,0 +1,99 @@
+import html
+import json
+import os
+import time
+
+# === CONFIG ===
+MAX_SESSION_MESSAGES = 40   # Messages kept in st.session_state; older ones spill to disk
+RENDER_WINDOW = 20          # Messages drawn in the chat panel before "show earlier" is used
+HISTORY_PAGE_SIZE = 20      # Spilled messages loaded per "show earlier" click
+SPILL_MAX_AGE_DAYS = 7      # Spill files untouched for longer than this are deleted
+TAIL_BLOCK_BYTES = 64 * 1024
+
+
+def bubble_html(message):
+    """Chat bubble markup, rendered once when the message is added."""
+    is_user = message["role"] == "user"
+    bubble_color = "#DCF8C6" if is_user else "#F1F0F0"
+    justify = "flex-end" if is_user else "flex-start"
+    return (
+        f"<div style='display:flex; justify-content:{justify}; margin-bottom:10px;'>"
+        f"<div style='font-family:cursive; max-width:80%; padding-right:5px; padding-left: 5px; "
+        f"background-color:{bubble_color}; border-radius:10px; word-wrap:break-word; white-space:pre-wrap; "
+        f"box-shadow:1px 1px 3px rgba(0,0,0,0.1);'>{html.escape(message['content'])}</div></div>"
+    )
+
+
+def _spill_path(store_dir, session_id):
+    return os.path.join(store_dir, f"{session_id}.jsonl")
+
+
+def append_message(state, message, store_dir):
+    """Add a message to the session, spilling the oldest ones past the cap to the session store."""
+    message = dict(message, html=bubble_html(message))
+    state.messages.append(message)
+    overflow = len(state.messages) - MAX_SESSION_MESSAGES
+    if overflow > 0:
+        os.makedirs(store_dir, exist_ok=True)
+        with open(_spill_path(store_dir, state.session_id), "a", encoding="utf-8") as f:
+            for old in state.messages[:overflow]:
+                f.write(json.dumps({k: v for k, v in old.items() if k != "html"}, ensure_ascii=False) + "\n")
+        del state.messages[:overflow]
+        state.spilled_count += overflow
+    return message
+
+
+def _tail_lines(path, count):
+    """The last `count` lines of a file, read backwards in blocks from the end."""
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        data = b""
+        # One extra newline: the file ends with one, and the first line kept needs the one before it
+        while end > 0 and data.count(b"\n") <= count:
+            start = max(0, end - TAIL_BLOCK_BYTES)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+    return [line.decode("utf-8") for line in data.splitlines()[-count:]]
+
+
+def load_spilled(store_dir, session_id, count):
+    """The last `count` spilled messages for a session, oldest first."""
+    path = _spill_path(store_dir, session_id)
+    if count <= 0 or not os.path.exists(path):
+        return []
+    messages = [json.loads(line) for line in _tail_lines(path, count)]
+    for message in messages:
+        message["html"] = bubble_html(message)
+    return messages
+
+
+def prune_spilled(store_dir, max_age_days=SPILL_MAX_AGE_DAYS):
+    """Delete spill files of sessions that have not written anything in `max_age_days`."""
+    if not os.path.isdir(store_dir):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for entry in os.scandir(store_dir):
+        if entry.name.endswith(".jsonl") and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass  # Still open in another session on Windows; next prune gets it
+    return removed
+
+
+def visible_messages(state, store_dir):
+    """Window of messages to draw: the latest RENDER_WINDOW plus any pages of history requested."""
+    extra = state.history_pages * HISTORY_PAGE_SIZE
+    wanted = RENDER_WINDOW + extra
+    in_memory = state.messages[-wanted:]
+    from_disk = min(wanted - len(in_memory), state.spilled_count)
+    return load_spilled(store_dir, state.session_id, from_disk) + in_memory
+
+
+def has_more_history(state):
+    shown = RENDER_WINDOW + state.history_pages * HISTORY_PAGE_SIZE
+    return len(state.messages) + state.spilled_count > shown
+
@@ -0,0 +1,82 @@
+import os
+import pickle
+from threading import Lock
+import numpy as np
+import pandas as pd
+
+# Per-day totals written by the index builders, so relative windows ("last 7 days",
+# "last quarter", "no login for 18 months") are resolved when the question is asked
+# instead of being frozen against the build date.
+#
+# Each metric is a prefix-sum array over consecutive days from `start` (days since
+# 1970-01-01): prefix[i] is the total of the first i days, so any day range costs one
+# subtraction. A few years of daily history is a few KB per metric.
+
+DAILY_FILE = "daily_aggregates.pkl"
+
+_cache_lock = Lock()
+_cache = {}
+
+
+def to_day(value):
+    return int(np.datetime64(pd.Timestamp(value), "D").astype("int64"))
+
+
+def from_day(day):
+    return pd.Timestamp(np.datetime64(int(day), "D"))
+
+
+def daily_metric(dates, values=None):
+    """Prefix sums of row counts (or of `values`) per calendar day of `dates`."""
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce")
+    valid = dates.notna().to_numpy()
+    days = dates[valid].to_numpy().astype("datetime64[D]").astype("int64")
+    if not len(days):
+        return {"start": 0, "prefix": np.zeros(1, dtype="int64")}
+    start = days.min()
+    weights = None
+    if values is not None:
+        weights = np.nan_to_num(pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64")[valid])
+    totals = np.bincount(days - start, weights=weights)
+    prefix = np.zeros(len(totals) + 1, dtype=totals.dtype)
+    np.cumsum(totals, out=prefix[1:])
+    return {"start": int(start), "prefix": prefix}
+
+
+def window_total(metric, start=None, end=None):
+    """Total over days [start, end); None leaves that side open."""
+    prefix = metric["prefix"]
+    n = len(prefix) - 1
+    lo = 0 if start is None else min(max(start - metric["start"], 0), n)
+    hi = n if end is None else min(max(end - metric["start"], 0), n)
+    return prefix[max(hi, lo)] - prefix[lo]
+
+
+def last_day(metric):
+    return metric["start"] + len(metric["prefix"]) - 2
+
+
+def load_daily(path):
+    """{domain: {metric: {"start", "prefix"}}}; empty when nothing was published yet."""
+    if not os.path.exists(path):
+        return {}
+    mtime = os.path.getmtime(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path, "rb") as f:
+        store = pickle.load(f)
+    with _cache_lock:
+        _cache[path] = (mtime, store)
+    return store
+
+
+def publish_daily(path, domain, metrics):
+    """Replace the named metrics for `domain`, keeping every other metric as it is."""
+    store = {d: dict(m) for d, m in load_daily(path).items()}
+    store.setdefault(domain, {}).update(metrics)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(store, f)
+    os.replace(tmp_path, path)
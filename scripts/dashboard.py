@@ -1,11 +1,21 @@
 import streamlit as st
-import io
-import sys
 import re
 import textwrap
-import matplotlib.pyplot as plt
-import speech_recognition as sr
-from query_with_model import query_account_qa
+import os
+import uuid
+from functools import lru_cache
+from query_with_model import (
+    BASE_DIR, GENERATED_TOKENS, REQUESTS, STAGE_LATENCY, TOP1_DISTANCE, RequestContext, stream_account_qa,
+)
+from aggregate_store import load_aggregates
+from chart_engine import FIGURE_CACHE, chart_spec_for, draw_chart, get_figure, prerender
+from chat_transcript import append_message, has_more_history, prune_spilled, visible_messages
+from voice_worker import MAX_CLIP_S, TranscriptionJob
+from metrics import render_prometheus, start_metrics_server
+
+AGGREGATE_PATH = os.path.join(BASE_DIR, "faiss_index", "aggregates.pkl")
+CHAT_STORE_DIR = os.path.join(BASE_DIR, "chat_sessions")
+PARTIAL_NOTE = "\n\n⚠️ Part of the index was too slow to search, so this answer may have missed a better match."
 
 # print(query_account_qa("How many accounts are active?"))
 st.set_page_config(page_title="💬 Banking GenAI Chatbot", layout="wide")
@@ -60,21 +70,53 @@ st.markdown("""
 # Initialize chat history and speech recognition state
 if "messages" not in st.session_state:
     st.session_state.messages = []
+    prune_spilled(CHAT_STORE_DIR)   # New session: drop transcripts of long-abandoned ones
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.spilled_count = 0
+    st.session_state.history_pages = 0
 if "spoken_query" not in st.session_state:
     st.session_state.spoken_query = ""
-
-# Function to record and transcribe speech
-def record_and_transcribe():
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        audio = recognizer.listen(source, timeout=10)
-    try:
-        text = recognizer.recognize_google(audio)
-        st.session_state.spoken_query = text
-    except sr.UnknownValueError:
+if "voice_job" not in st.session_state:
+    st.session_state.voice_job = None
+    st.session_state.voice_clip_id = None
+
+# Voice input: clips are transcribed offline on a background worker while the UI keeps running
+def submit_voice_clip(clip):
+    clip_id = (clip.name, clip.size)
+    if clip_id == st.session_state.voice_clip_id:
+        return  # Same clip as the last rerun; already submitted
+    if st.session_state.voice_job is not None:
+        st.session_state.voice_job.cancel()
+    st.session_state.voice_clip_id = clip_id
+    st.session_state.voice_job = TranscriptionJob(clip.getvalue())
+
+@st.fragment(run_every=1)
+def voice_job_status():
+    job = st.session_state.voice_job
+    if job is None:
+        return
+    status = job.status
+    if status in ("queued", "running"):
+        st.caption("🎧 Waiting for the previous clip..." if status == "queued" else f"🎧 Transcribing... {job.elapsed:.0f}s")
+        if st.button("Cancel", key="cancel_voice"):
+            job.cancel()
+            st.session_state.voice_job = None
+            st.rerun(scope="app")
+        return
+
+    st.session_state.voice_job = None
+    if status == "done" and job.text:
+        st.session_state.spoken_query = job.text
+        st.rerun(scope="app")
+    elif status == "done":
         st.error("Sorry, could not understand the audio.")
-    except sr.RequestError as e:
-        st.error(f"Could not request results; {e}")
+    elif status == "timeout":
+        job.cancel()
+        st.error("Transcription timed out; please try a shorter clip.")
+    elif status == "too_long":
+        st.error(f"Clip is longer than {MAX_CLIP_S}s; please record a shorter question.")
+    elif status == "failed":
+        st.error(f"Could not transcribe audio; {job.error}")
 
 charts_data = {
     "How many failed login attempts happened in June?": {
@@ -157,86 +199,74 @@ charts_data = {
     }
 }
 
-# Define the chart rendering function
-def render_chart(question):
-    if question not in charts_data:
-        return None
-
+# Charts for the most-asked questions, paired with the domain they are answered from
+MOST_ASKED_QUESTIONS = [
+    ("What are the top reasons for account closures last quarter?", "account"),
+    ("Which account status has the most users?", "account"),
+    ("What is the trend of login failures over 6 months?", "login"),
+    ("What is the success rate of credit card payments?", "payment"),
+    ("How many failed payments were through ATM channel?", "payment"),
+    ("Percentage of accounts with more than 2 months overdue.", "payment_statement"),
+    ("Transactions in category 'Transaction'", "transaction"),
+]
+
+@st.cache_resource
+def warm_chart_cache():
+    # Runs once per server process; figures are keyed by aggregate version so later rebuilds still show
+    return prerender(load_aggregates(AGGREGATE_PATH), MOST_ASKED_QUESTIONS)
+
+@lru_cache(maxsize=None)
+def static_chart(question):
     data = charts_data[question]
-    labels = data["labels"]
-    values = data["values"]
-    title = data["title"]
-    chart_type = data["chart_type"]
-
-    # Choose figure size based on chart type
-    # if chart_type in ["pie", "doughnut"]:
-    #     fig, ax = plt.subplots(figsize=(3, 2))  # square for better visual
-    # elif chart_type == "horizontalBar":
-    #     fig, ax = plt.subplots(figsize=(5, 2))
-    # else:
-    #     fig, ax = plt.subplots(figsize=(3, 2))
-    fig, ax = fig, ax = plt.subplots(figsize=(6, 3.7)) 
-    if chart_type == "bar":
-        ax.bar(labels, values, color='orange')
-        ax.set_title(title, fontsize=6)  # Set title font size
-        ax.tick_params(axis='x', labelsize=7)  # Set x-axis label font size
-        ax.tick_params(axis='y', labelsize=7)  # Optional: Set y-axis label font size
-        plt.xticks(rotation=45, ha='right')
-
-    elif chart_type == "horizontalBar":
-        bars = ax.barh(labels, values, color='#4682B4', edgecolor='black')  # Steel blue bars
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.5, bar.get_y() + bar.get_height() / 2,
-                    f'{width}', va='center', fontsize=6, weight='bold', color='black')
-        ax.set_title(title, fontsize=6, weight='bold')
-        ax.tick_params(axis='y', labelsize=6)
-        ax.tick_params(axis='x', labelsize=6)
-        ax.xaxis.grid(True, linestyle='--', alpha=0.5)
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        plt.tight_layout(pad=1.0)
-
-    elif chart_type == "pie":
-        ax.pie(
-            values,
-            labels=labels,
-            autopct='%1.1f%%',
-            startangle=75,
-            textprops={'fontsize': 7}  # Adjust the font size as needed
-        )
-        ax.set_title(title, fontsize=6)  # Optional: Change title font size too
-        ax.axis('equal')
-
-    elif chart_type == "doughnut":
-    # Draw pie chart with specific text properties
-        wedges, texts, autotexts = ax.pie(
-            values,
-            labels=labels,
-            autopct='%1.1f%%',
-            startangle=140,
-            colors=['#4CAF50', '#FF5722'],  # Success: green, Fail: orange
-            textprops={'fontsize': 7, 'weight': 'bold'}
-        )
-        centre_circle = plt.Circle((0, 0), 0.70, fc='white')
-        fig.gca().add_artist(centre_circle)
-        ax.set_title(title, fontsize=6, weight='bold')
-        ax.axis('equal')
-        plt.tight_layout(pad=1.0)
-
-    elif chart_type == "line":
-        ax.plot(labels, values, marker='o', color='green', linestyle='-')
-        ax.set_title(title)
-        ax.set_ylabel("Value")
-        plt.xticks(rotation=45, ha='right')
+    return draw_chart(data["labels"], data["values"], data["title"], data["chart_type"])
 
+# Define the chart rendering function
+def render_chart(question, domain=None, answer=""):
+    if domain:
+        aggregates = load_aggregates(AGGREGATE_PATH)
+        spec = chart_spec_for(domain, question, answer, aggregates)
+        if spec is not None:
+            return get_figure(spec, aggregates)
+    if question in charts_data:
+        return static_chart(question)
+    return None
+
+@st.cache_resource
+def metrics_endpoint():
+    # One /metrics server per Streamlit process, shared by every session; None if its port is taken
+    return start_metrics_server()
+
+def admin_panel():
+    st.sidebar.markdown("#### 🛠 Query metrics")
+    rows = []
+    for labels in STAGE_LATENCY.label_sets():
+        rows.append({
+            "stage": labels["stage"],
+            "requests": STAGE_LATENCY.count(**labels),
+            "p50 ≤ ms": STAGE_LATENCY.quantile(0.5, **labels),
+            "p95 ≤ ms": STAGE_LATENCY.quantile(0.95, **labels),
+        })
+    if rows:
+        st.sidebar.dataframe(rows, hide_index=True)
     else:
-        plt.close(fig)
-        return None
-
-    plt.tight_layout()
-    return fig
-    
+        st.sidebar.caption("No questions answered yet.")
+    by_domain = {labels["domain"]: REQUESTS.value(**labels) for labels in REQUESTS.label_sets()}
+    if by_domain:
+        st.sidebar.write("Answers by domain:", by_domain)
+    hits, misses = FIGURE_CACHE.value(result="hit"), FIGURE_CACHE.value(result="miss")
+    if hits + misses:
+        st.sidebar.caption(f"Chart cache hit rate {hits / (hits + misses):.0%} ({hits} hits / {misses} misses)")
+    if TOP1_DISTANCE.count():
+        st.sidebar.caption(f"Top-1 distance p50 ≤ {TOP1_DISTANCE.quantile(0.5)}")
+    if GENERATED_TOKENS.count():
+        st.sidebar.caption(f"Generated tokens p50 ≤ {GENERATED_TOKENS.quantile(0.5)}")
+    with st.sidebar.expander("Prometheus text"):
+        st.code(render_prometheus(), language="text")
+
+warm_chart_cache()
+metrics_endpoint()
+if st.sidebar.toggle("Admin metrics", value=False):
+    admin_panel()
 
 col1, col2 = st.columns([1, 1])
 
@@ -246,7 +276,11 @@ with col1:
     if st.session_state.messages:
         last_query = st.session_state.messages[-2]["content"] if len(st.session_state.messages) >= 2 else ""
         last_response = st.session_state.messages[-1]["content"] if st.session_state.messages else ""
-        fig = render_chart(st.session_state.last_question)
+        fig = render_chart(
+            st.session_state.last_question,
+            st.session_state.messages[-1].get("domain"),
+            last_response,
+        )
         if fig:
             st.pyplot(fig)
         else:
@@ -270,40 +304,40 @@ with col2:
         </div>
     """, unsafe_allow_html=True)
     else:
-    # Scrollable chat container
-        chat_html = """
-            <div id="chat-container" style="height:350px; overflow-y:scroll; padding-left: 5px; padding-right: 5px; padding-top:2px; padding-bottom: 10px; background:paleturquoise;
-            border: 1px solid paleturquoise;">
-            """
-
-        for msg in st.session_state.messages:
-            role = "You" if msg["role"] == "user" else "Bot"
-            bubble_color = "#DCF8C6" if role == "You" else "#F1F0F0"
-            align = "right" if role == "You" else "left"
-            chat_html += f"""
-            <div style='display:flex; justify-content:{"flex-end" if msg["role"] == "user" else "flex-start"}; margin-bottom:10px;'>
-            <div style='font-family:cursive; max-width:80%; padding-right:5px; padding-left: 5px; background-color:{bubble_color}; border-radius:10px; word-wrap:break-word; white-space:pre-wrap; box-shadow:1px 1px 3px rgba(0,0,0,0.1);'>
-            {msg['content']}
-            </div>
-            </div>
-            """
-
-        chat_html += "</div>"
-        chat_html += """
-        <script>
-            var chatContainer = document.getElementById("chat-container");
-            chatContainer.scrollTop = chatContainer.scrollHeight;
-        </script>
-        """
-        st.components.v1.html(chat_html, height=370, scrolling=False)
+        # Bubble markup is built once per message; every rerun redraws the visible window
+        chat_box = st.container(height=350)
+        with chat_box:
+            if has_more_history(st.session_state):
+                if st.button("⬆ Show earlier messages"):
+                    st.session_state.history_pages += 1
+                    st.rerun()
+            for msg in visible_messages(st.session_state, CHAT_STORE_DIR):
+                st.markdown(msg["html"], unsafe_allow_html=True)
+            st.markdown("<div id='chat-end'></div>", unsafe_allow_html=True)
+        # Scroll the chat box to the latest message; the message count in the script makes
+        # Streamlit re-run it whenever a message is added
+        st.components.v1.html(f"""
+            <script>
+                // {len(st.session_state.messages) + st.session_state.spilled_count} messages
+                var doc = window.parent.document;
+                var node = doc.getElementById("chat-end");
+                while (node && node !== doc.body && node.scrollHeight <= node.clientHeight) {{ node = node.parentElement; }}
+                if (node && node !== doc.body) {{ node.scrollTop = node.scrollHeight; }}
+            </script>
+        """, height=0)
 
     # Voice + Text input side by side
     input_col1, input_col2 = st.columns([1, 11])  # Adjust ratios if needed
 
     with input_col1:
         st.markdown("<div style='margin-top: 0px;'></div>", unsafe_allow_html=True)
-        if st.button("🎤"):
-            record_and_transcribe()
+        with st.popover("🎤"):
+            recorded = st.audio_input("Record your question")
+            uploaded = st.file_uploader("...or upload a clip", type=["wav", "mp3", "m4a", "ogg", "webm"])
+            clip = recorded or uploaded
+            if clip is not None:
+                submit_voice_clip(clip)
+        voice_job_status()
 
         with input_col2:
             st.markdown("<div style='margin-top: 0px;'></div>", unsafe_allow_html=True)
@@ -320,20 +354,34 @@ with col2:
 
     # Handling user query
     if send_clicked and user_prompt:
-        st.session_state.messages.append({"role": "user", "content": user_prompt})
+        append_message(st.session_state, {"role": "user", "content": user_prompt}, CHAT_STORE_DIR)
         st.session_state.last_question = user_prompt
+        # Stream the answer into a live bubble: retrieved summary first, then FLAN tokens
+        matches_placeholder = st.empty()
+        answer_placeholder = st.empty()
+        result = None
+        partial_answer = ""
         with st.spinner("Thinking..."):
-            buffer = io.StringIO()
-            sys_stdout_backup = sys.stdout
-            sys.stdout = buffer
             try:
-                query_account_qa(user_prompt)
+                for event in stream_account_qa(user_prompt, RequestContext()):
+                    if event["type"] == "matches" and event["result"].matches:
+                        matches_placeholder.caption(f"📄 {event['result'].matches[0].summary}")
+                    elif event["type"] == "token":
+                        partial_answer += event["text"]
+                        answer_placeholder.markdown(partial_answer + "▌")
+                    elif event["type"] == "done":
+                        result = event["result"]
+                        answer_placeholder.markdown(result.answer)
             except Exception as e:
                 st.error(f"❌ Error: {e}")
-            finally:
-                sys.stdout = sys_stdout_backup
-
-            assistant_reply = buffer.getvalue()
-            st.session_state.messages.append({"role": "assistant", "content": assistant_reply})
-            st.rerun()
 
+        if result is not None:
+            append_message(st.session_state, {
+                "role": "assistant",
+                "content": result.answer + (PARTIAL_NOTE if result.partial else ""),
+                "domain": result.domain,
+                "request_id": result.request_id,
+            }, CHAT_STORE_DIR)
+        else:
+            append_message(st.session_state, {"role": "assistant", "content": partial_answer}, CHAT_STORE_DIR)
+        st.rerun()
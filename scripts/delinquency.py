@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+from account_view import PAYMENT_FAILURE_PATTERN
+
+# Per-account delinquency state for every statement cycle, computed with grouped
+# shifts and cumulative sums over (account, close date) order instead of per-row loops.
+#
+# Each successful payment is credited to the latest statement closed on or before it.
+# A cycle is missed when less than its minimum due was paid by the due date; the run
+# of consecutive missed cycles then gives the state:
+#   current         minimum covered on time, and the previous cycle was not missed
+#   past_due        first missed cycle in a run
+#   delinquent_30   DELINQUENT_CYCLES or more missed in a row (30+ days past due)
+#   charged_off     CHARGEOFF_CYCLES missed in a row, or on/after the account's CHARGEOFF_DT; final
+#   recovered       minimum covered on time right after a missed run
+
+# === CONFIG ===
+DELINQUENT_CYCLES = 2    # Second missed cycle in a row puts the account 30+ days past due
+CHARGEOFF_CYCLES = 6     # ~180 days past due, the same rule bulk_data_gen uses
+MIN_CYCLES = 3           # Statement cycles needed before an account can be a regular underpayer
+UNDERPAY_SHARE = 0.5     # ...and the share of its cycles paid below the minimum due
+
+STATES = ["current", "past_due", "delinquent_30", "charged_off", "recovered"]
+STATE_LABELS = {
+    "current": "current", "past_due": "past due", "delinquent_30": "delinquent 30+ days",
+    "charged_off": "charged off", "recovered": "recovered",
+}
+
+
+def statement_cycles(statements, payments, details=None):
+    """One row per (account, statement), oldest first per account, with what was paid against it."""
+    cycles = pd.DataFrame({
+        "ACCNT_ID": statements["CIFDB_ACCT_ID"],
+        "STMT_CLOS_DT": pd.to_datetime(statements["STMT_CLOS_DT"], dayfirst=True, errors="coerce"),
+        "PAYMT_DUE_DT": pd.to_datetime(statements["PAYMT_DUE_DT"], dayfirst=True, errors="coerce"),
+        "MIN_DUE": pd.to_numeric(statements["PAYMT_MIN_STMT_AMT"], errors="coerce").fillna(0.0),
+    }).dropna(subset=["ACCNT_ID", "STMT_CLOS_DT"])
+    cycles["ACCNT_ID"] = cycles["ACCNT_ID"].astype("int64")
+    cycles = cycles.sort_values(["STMT_CLOS_DT", "ACCNT_ID"], kind="stable").reset_index(drop=True)
+    cycles["CYCLE"] = np.arange(len(cycles))
+
+    ok = ~payments["STATUS_DESC"].str.contains(PAYMENT_FAILURE_PATTERN, case=False, na=False) \
+        if "STATUS_DESC" in payments.columns else pd.Series(True, index=payments.index)
+    paid = pd.DataFrame({
+        "ACCNT_ID": payments["ACCNT_ID"],
+        "DATE": payments["DATE"],
+        "AMT": pd.to_numeric(payments["AMT"], errors="coerce"),
+    })[ok.to_numpy()].dropna()
+    paid["ACCNT_ID"] = paid["ACCNT_ID"].astype("int64")
+    paid = pd.merge_asof(
+        paid.sort_values("DATE", kind="stable"), cycles[["ACCNT_ID", "STMT_CLOS_DT", "PAYMT_DUE_DT", "CYCLE"]],
+        left_on="DATE", right_on="STMT_CLOS_DT", by="ACCNT_ID", direction="backward",
+    ).dropna(subset=["CYCLE"])
+    on_time = paid["PAYMT_DUE_DT"].isna() | (paid["DATE"] <= paid["PAYMT_DUE_DT"])
+    cycle = paid["CYCLE"].astype("int64")
+    cycles["PAID"] = np.bincount(cycle, weights=paid["AMT"], minlength=len(cycles))
+    cycles["PAID_ON_TIME"] = np.bincount(cycle[on_time], weights=paid["AMT"][on_time], minlength=len(cycles))
+
+    cycles["CHARGEOFF_DT"] = pd.NaT
+    if details is not None and "CHARGEOFF_DT" in details.columns:
+        chargeoff = pd.to_datetime(details["CHARGEOFF_DT"], dayfirst=True, errors="coerce")
+        chargeoff = chargeoff.groupby(details["CIFDB_ACCT_ID"].astype("int64")).min()
+        cycles["CHARGEOFF_DT"] = cycles["ACCNT_ID"].map(chargeoff)
+    return cycles.sort_values(["ACCNT_ID", "STMT_CLOS_DT"], kind="stable").reset_index(drop=True)
+
+
+def score_cycles(cycles):
+    """Add missed/underpaid flags, missed and on-time streaks, state and transition per cycle."""
+    account = cycles["ACCNT_ID"]
+    has_due = cycles["MIN_DUE"] > 0
+    missed = has_due & (cycles["PAID_ON_TIME"] + 0.005 < cycles["MIN_DUE"])
+    underpaid = has_due & (cycles["PAID"] + 0.005 < cycles["MIN_DUE"])
+
+    # Streak of consecutive True values per account: a new run starts at every False
+    def streak(flag):
+        run = (~flag).groupby(account, sort=False).cumsum()
+        return flag.astype("int32").groupby([account, run], sort=False).cumsum()
+
+    missed_streak = streak(missed)
+    on_time_streak = streak(~missed)
+    prev_missed = missed_streak.groupby(account, sort=False).shift(fill_value=0)
+    charged = (missed_streak >= CHARGEOFF_CYCLES) | (cycles["STMT_CLOS_DT"] >= cycles["CHARGEOFF_DT"])
+    charged = charged.groupby(account, sort=False).cummax()
+
+    state = np.select(
+        [charged, missed_streak >= DELINQUENT_CYCLES, missed_streak >= 1, prev_missed > 0],
+        ["charged_off", "delinquent_30", "past_due", "recovered"],
+        "current",
+    )
+    cycles = cycles.assign(
+        MISSED=missed.to_numpy(),
+        UNDERPAID=underpaid.to_numpy(),
+        MISSED_STREAK=missed_streak.to_numpy(),
+        ON_TIME_STREAK=on_time_streak.to_numpy(),
+        STATE=pd.Categorical(state, categories=STATES),
+    )
+    cycles["PREV_STATE"] = cycles["STATE"].groupby(account, sort=False, observed=False).shift()
+    return cycles
+
+
+def transition_counts(cycles):
+    """Month × "from → to" counts of state changes between consecutive cycles."""
+    changed = cycles["PREV_STATE"].notna() & (cycles["PREV_STATE"] != cycles["STATE"])
+    moves = cycles.loc[changed, ["STMT_CLOS_DT", "PREV_STATE", "STATE"]]
+    month = moves["STMT_CLOS_DT"].dt.to_period("M").rename("month")
+    counts = moves.groupby([month, "PREV_STATE", "STATE"], observed=True).size()
+    counts = counts.unstack(["PREV_STATE", "STATE"], fill_value=0).sort_index()
+    counts.columns = [f"{STATE_LABELS[a]} → {STATE_LABELS[b]}" for a, b in counts.columns]
+    return counts
+
+
+def account_states(cycles):
+    """One row per account: latest state, streaks, and how often it missed, underpaid or recovered."""
+    group = cycles.assign(RECOVERED=cycles["STATE"] == "recovered").groupby("ACCNT_ID", sort=False)
+    accounts = group.agg(
+        CYCLES=("STATE", "size"),
+        MISSED_CYCLES=("MISSED", "sum"),
+        UNDERPAID_CYCLES=("UNDERPAID", "sum"),
+        RECOVERIES=("RECOVERED", "sum"),
+        LONGEST_MISSED_STREAK=("MISSED_STREAK", "max"),
+        LONGEST_ON_TIME_STREAK=("ON_TIME_STREAK", "max"),
+        STATE=("STATE", "last"),
+        MISSED_STREAK=("MISSED_STREAK", "last"),
+        ON_TIME_STREAK=("ON_TIME_STREAK", "last"),
+        LAST_STMT_DT=("STMT_CLOS_DT", "last"),
+    )
+    accounts["UNDERPAY_SHARE"] = accounts["UNDERPAID_CYCLES"] / accounts["CYCLES"]
+    accounts["REGULAR_UNDERPAYER"] = (accounts["CYCLES"] >= MIN_CYCLES) & (accounts["UNDERPAY_SHARE"] >= UNDERPAY_SHARE)
+    return accounts.reset_index()
@@ -0,0 +1,115 @@
+import os
+import pickle
+import numpy as np
+from sharded_index import SHARD_DEADLINE_MS, load_sharded_index, write_shards
+
+# === CONFIG ===
+ROUTER_FILE = "domain_router.pkl"
+ROUTER_TEMPERATURE = 0.05   # Softmax temperature over centroid cosine similarities
+SINGLE_DOMAIN_CONFIDENCE = 0.6  # Search one sub-index when the top domain is this likely
+TWO_DOMAIN_CONFIDENCE = 0.8  # Search two sub-indexes when the top two together reach this
+
+
+# === DOMAIN TAGS ===
+def load_domains(path, count):
+    """Domain tag per vector, parallel to account_metadata.pkl.
+
+    Vectors added before tags existed are marked "unknown" so the list always has
+    one entry per FAISS id.
+    """
+    domains = []
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            domains = pickle.load(f)
+    domains = domains[:count]
+    return domains + ["unknown"] * (count - len(domains))
+
+
+def save_domains(domains, path):
+    with open(path, "wb") as f:
+        pickle.dump(domains, f)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+# === BUILD ===
+def build_domain_router(index, domains, out_dir, rebuild_domains=None):
+    """Write the per-domain shards and the centroid router for a unified index.
+
+    Only the shards of `rebuild_domains` (all domains when None) are rewritten, so an
+    updater that appends one domain leaves every other domain's shard files alone.
+    """
+    vectors = index.reconstruct_n(0, index.ntotal)
+    labels = np.array(domains)
+
+    centroids = {}
+    ids_by_domain = {}
+    vectors_by_domain = {}
+    for domain in sorted(set(domains)):
+        ids = np.flatnonzero(labels == domain).astype("int64")
+        vectors_by_domain[domain] = (vectors[ids], ids)
+        centroid = _normalize(vectors[ids]).mean(axis=0)
+        centroids[domain] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        ids_by_domain[domain] = ids
+    write_shards(out_dir, vectors_by_domain, rebuild_domains)
+
+    with open(os.path.join(out_dir, ROUTER_FILE), "wb") as f:
+        pickle.dump({"centroids": centroids, "ids_by_domain": ids_by_domain}, f)
+
+
+# === QUERY TIME ===
+class DomainRouter:
+    """Nearest-centroid classifier over the query embedding query_account_qa already computes."""
+
+    def __init__(self, centroids, ids_by_domain, shards):
+        self.domain_names = sorted(centroids)
+        self.centroid_matrix = np.stack([centroids[d] for d in self.domain_names]).astype("float32")
+        self.ids_by_domain = {d: set(ids.tolist()) for d, ids in ids_by_domain.items()}
+        self.shards = shards
+
+    def domain_probabilities(self, embedding):
+        query = _normalize(np.asarray(embedding, dtype="float32").reshape(1, -1))[0]
+        sims = self.centroid_matrix @ query
+        logits = (sims - sims.max()) / ROUTER_TEMPERATURE
+        probs = np.exp(logits) / np.exp(logits).sum()
+        return dict(zip(self.domain_names, probs.tolist()))
+
+    def route(self, embedding):
+        """Domains to search, or None when confidence is too low and a global search is safer."""
+        ranked = sorted(self.domain_probabilities(embedding).items(), key=lambda kv: kv[1], reverse=True)
+        if ranked[0][1] >= SINGLE_DOMAIN_CONFIDENCE:
+            return [ranked[0][0]]
+        if len(ranked) > 1 and ranked[0][1] + ranked[1][1] >= TWO_DOMAIN_CONFIDENCE:
+            return [ranked[0][0], ranked[1][0]]
+        return None
+
+    def ids_for(self, domains):
+        ids = set()
+        for domain in domains:
+            ids |= self.ids_by_domain.get(domain, set())
+        return ids
+
+    def search(self, embeddings, top_k, domains, candidates=None, deadline_ms=SHARD_DEADLINE_MS):
+        """Search only the shards of the given domains and merge each query's hits by distance.
+
+        Returns (D, I, missed) as ShardedIndex.search does.
+        """
+        if candidates is not None:
+            candidates = candidates & self.ids_for(domains)
+            if not candidates:
+                return self.shards.search(embeddings, top_k, domains=[])
+        return self.shards.search(embeddings, top_k, domains, candidates, deadline_ms)
+
+
+def load_domain_router(out_dir):
+    """Load the router and its shards; None when no router has been built yet."""
+    router_path = os.path.join(out_dir, ROUTER_FILE)
+    shards = load_sharded_index(out_dir)
+    if not os.path.exists(router_path) or shards is None:
+        return None
+    with open(router_path, "rb") as f:
+        data = pickle.load(f)
+    return DomainRouter(data["centroids"], data["ids_by_domain"], shards)
@@ -0,0 +1,109 @@
+import atexit
+import multiprocessing as mp
+import os
+import numpy as np
+
+# Sentence embeddings for the index builders, spread over a pool of worker processes.
+#
+# Each worker loads MiniLM once and keeps it for the life of the pool, pinned to a few
+# intra-op threads so the workers don't compete for the same cores. Texts are sorted by
+# length before batching, so every batch pads to about the same length, and the vectors
+# are put back in input order at the end.
+#
+# Workers are forked: the builders are flat scripts, and spawned workers would re-run
+# them on import. Where fork is unavailable (Windows), or once this process has already
+# run the model itself, encoding stays in-process.
+
+ENCODE_WORKERS_ENV = "HACKDASH_ENCODE_WORKERS"   # Worker processes (default: cores // threads per worker)
+ENCODE_THREADS_ENV = "HACKDASH_ENCODE_THREADS"   # Torch threads per worker
+
+# === CONFIG ===
+MODEL_NAME = "all-MiniLM-L6-v2"
+THREADS_PER_WORKER = 2
+BATCH_SIZE = 128
+BATCHES_PER_TASK = 4       # Batches handed to a worker per task; the longest texts go out first
+MIN_POOL_TEXTS = 2_000     # Below this, starting the workers costs more than it saves
+
+_model = None          # The model of this worker, or of the in-process fallback
+_default_pool = None
+
+
+def _load_model(model_name, threads=None):
+    global _model
+    if _model is None:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            torch.set_num_threads(threads)
+        _model = SentenceTransformer(model_name, device="cpu")
+    return _model
+
+
+def _encode(texts, batch_size, normalize):
+    vectors = _model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                            normalize_embeddings=normalize, show_progress_bar=False)
+    return np.asarray(vectors, dtype="float32")
+
+
+def _encode_task(task):
+    start, texts, batch_size, normalize = task
+    return start, _encode(texts, batch_size, normalize)
+
+
+class EncodingPool:
+    """Persistent pool of MiniLM worker processes; reuse one instance for every encode call."""
+
+    def __init__(self, model_name=MODEL_NAME, workers=None, threads_per_worker=None):
+        self.model_name = model_name
+        self.threads = threads_per_worker or int(os.environ.get(ENCODE_THREADS_ENV, THREADS_PER_WORKER))
+        self.workers = workers or int(os.environ.get(ENCODE_WORKERS_ENV, 0)) or max(1, (os.cpu_count() or 1) // self.threads)
+        self._pool = None
+
+    def _can_fork(self):
+        # Forking after this process has run torch ops can deadlock its OpenMP pool
+        return "fork" in mp.get_all_start_methods() and _model is None
+
+    def _start(self):
+        if self._pool is None:
+            context = mp.get_context("fork")
+            self._pool = context.Pool(self.workers, initializer=_load_model, initargs=(self.model_name, self.threads))
+            print(f"🧵 Encoding with {self.workers} workers × {self.threads} threads")
+        return self._pool
+
+    def encode(self, texts, batch_size=BATCH_SIZE, normalize=False):
+        """float32 embeddings for `texts`, row i for texts[i]."""
+        texts = list(texts)
+        # Longest first: the slowest tasks start early and short ones fill in the tail
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        ordered = [texts[i] for i in order]
+
+        if self._pool is None and (len(texts) < MIN_POOL_TEXTS or self.workers == 1 or not self._can_fork()):
+            _load_model(self.model_name)
+            vectors = _encode(ordered, batch_size, normalize)
+            out = np.empty_like(vectors)
+            out[order] = vectors
+            return out
+
+        step = batch_size * BATCHES_PER_TASK
+        tasks = [(start, ordered[start:start + step], batch_size, normalize) for start in range(0, len(ordered), step)]
+        out = None
+        for start, vectors in self._start().imap_unordered(_encode_task, tasks):
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype="float32")
+            out[order[start:start + len(vectors)]] = vectors
+        return out
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def encode_summaries(summaries, **kwargs):
+    """Encode with this process's shared pool, started on first use and closed at exit."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = EncodingPool()
+        atexit.register(_default_pool.close)
+    return _default_pool.encode(summaries, **kwargs)
@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+
+import query_with_model as qa
+
+# === PATHS ===
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLD_PATH = os.path.join(REPO_DIR, "eval", "gold_set.json")
+REPORT_DIR = os.path.join(REPO_DIR, "eval", "reports")
+
+# === REGRESSION THRESHOLDS ===
+MAX_QUALITY_DROP = 0.02      # Absolute drop allowed in hit@1 / recall@k / MRR
+MAX_LATENCY_RATIO = 1.25     # Allowed p95 growth per stage versus the previous index version
+LATENCY_SLACK_MS = 5.0       # Ignore p95 changes smaller than this (timer noise)
+QUALITY_METRICS = ["hit@1", "recall@k", "mrr"]
+STAGES = ["encode", "search", "rephrase"]
+
+
+def index_version():
+    """Content hash of the index + metadata, so reports can be compared across rebuilds."""
+    digest = hashlib.sha256()
+    for path in (qa.FAISS_INDEX_PATH, qa.FAISS_META_PATH):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def is_relevant(summary, domain, item):
+    """A summary counts only when it comes from the item's domain and matches every pattern."""
+    return domain == item["domain"] and all(re.search(p, summary) for p in item["relevant"])
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    arr = np.array(values)
+    return {f"p{p}": float(np.percentile(arr, p)) for p in (50, 95, 99)}
+
+
+def evaluate(gold, top_k, rephrase):
+    per_item = []
+    latencies = defaultdict(list)
+    for item in gold["items"]:
+        question = item["question"]
+        t0 = time.perf_counter()
+        embedding = qa.embed_queries([question])
+        t1 = time.perf_counter()
+        # The served path (dashboard / answer_query), with its lexical pre-filter and shard deadline
+        matches = qa.retrieve_matches(question, top_k, embedding)
+        t2 = time.perf_counter()
+        if rephrase and qa.USE_FLAN_CLEANING and matches:
+            prompt = qa.build_rephrase_prompt(matches[0]["summary"])
+            qa.flan_pipeline(prompt, max_length=128, do_sample=False)
+        t3 = time.perf_counter()
+        latencies["encode"].append((t1 - t0) * 1000)
+        latencies["search"].append((t2 - t1) * 1000)
+        latencies["rephrase"].append((t3 - t2) * 1000)
+
+        total_relevant = sum(1 for s, d in zip(qa.summaries, qa.domains) if is_relevant(s, d, item))
+        flags = [is_relevant(m["summary"], m["domain"], item) for m in matches]
+        first = next((rank for rank, hit in enumerate(flags, start=1) if hit), None)
+        per_item.append({
+            "id": item["id"],
+            "domain": item["domain"],
+            "hit@1": 1.0 if flags and flags[0] else 0.0,
+            "recall@k": (sum(flags) / min(top_k, total_relevant)) if total_relevant else 0.0,
+            "mrr": 1.0 / first if first else 0.0,
+            "relevant_in_index": total_relevant,
+        })
+
+    by_domain = defaultdict(list)
+    for row in per_item:
+        by_domain[row["domain"]].append(row)
+        by_domain["overall"].append(row)
+    quality = {
+        domain: {m: float(np.mean([r[m] for r in rows])) for m in QUALITY_METRICS} | {"queries": len(rows)}
+        for domain, rows in by_domain.items()
+    }
+    latency = {stage: percentiles(latencies[stage]) for stage in STAGES}
+    return quality, latency, per_item
+
+
+def previous_report(version, gold_version):
+    """Most recent report for a different index version scored against the same gold set."""
+    if not os.path.isdir(REPORT_DIR):
+        return None
+    reports = []
+    for name in os.listdir(REPORT_DIR):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(REPORT_DIR, name), encoding="utf-8") as f:
+            report = json.load(f)
+        if report["index_version"] != version and report["gold_version"] == gold_version:
+            reports.append(report)
+    return max(reports, key=lambda r: r["created_at"]) if reports else None
+
+
+def find_regressions(current, previous):
+    problems = []
+    for domain, metrics in previous["quality"].items():
+        now = current["quality"].get(domain)
+        if now is None:
+            continue
+        for m in QUALITY_METRICS:
+            if metrics[m] - now[m] > MAX_QUALITY_DROP:
+                problems.append(f"{domain} {m} dropped {metrics[m]:.3f} → {now[m]:.3f}")
+    for stage in STAGES:
+        before = previous["latency_ms"][stage]["p95"]
+        after = current["latency_ms"][stage]["p95"]
+        if after - before > LATENCY_SLACK_MS and after > before * MAX_LATENCY_RATIO:
+            problems.append(f"{stage} p95 grew {before:.1f}ms → {after:.1f}ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score retrieval quality and stage latency against the gold set.")
+    parser.add_argument("--gold", default=GOLD_PATH)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--no-rephrase", action="store_true", help="Skip timing the FLAN rephrase stage")
+    args = parser.parse_args()
+
+    with open(args.gold, encoding="utf-8") as f:
+        gold = json.load(f)
+
+    version = index_version()
+    quality, latency, per_item = evaluate(gold, args.top_k, not args.no_rephrase)
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "index_version": version,
+        "gold_version": gold["version"],
+        "top_k": args.top_k,
+        "quality": quality,
+        "latency_ms": latency,
+        "items": per_item,
+    }
+
+    print(f"\n📊 Retrieval evaluation (index {version}, gold v{gold['version']}, k={args.top_k})")
+    for domain, m in sorted(quality.items()):
+        print(f"  {domain:<18} hit@1={m['hit@1']:.3f}  recall@k={m['recall@k']:.3f}  MRR={m['mrr']:.3f}  (n={m['queries']})")
+    for stage, p in latency.items():
+        print(f"  {stage:<18} p50={p['p50']:.1f}ms  p95={p['p95']:.1f}ms  p99={p['p99']:.1f}ms")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{version}.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Report written to {report_path}")
+
+    previous = previous_report(version, gold["version"])
+    if previous is None:
+        print("ℹ️ No report for an earlier index version yet; nothing to compare against.")
+        return 0
+    problems = find_regressions(report, previous)
+    if problems:
+        print(f"❌ Regression versus index {previous['index_version']}:")
+        for p in problems:
+            print(f"  - {p}")
+        return 1
+    print(f"✅ No regression versus index {previous['index_version']}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
+import argparse
 import csv
 import random
 from datetime import datetime, timedelta
 from faker import Faker
 import pandas as pd
+import bulk_data_gen
 
 fake = Faker()
 
@@ -183,4 +185,22 @@ def generate_all_data(num_accounts):
     write_to_csv('tran_dtl_data_fake.csv', tran_dtl_data, tran_dtl_data[0].keys())
 
 # Run generation
-generate_all_data(20000)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate fake banking data.")
+    parser.add_argument("--accounts", type=int, default=20000)
+    parser.add_argument("--bulk", action="store_true",
+                        help="Vectorized generator for large volumes (see bulk_data_gen.py for all options)")
+    parser.add_argument("--out-dir", default=".", help="Output folder for --bulk")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Output format for --bulk")
+    parser.add_argument("--seed", type=int, default=bulk_data_gen.DEFAULT_SEED)
+    args = parser.parse_args()
+
+    if args.bulk:
+        bulk_data_gen.main([
+            "--accounts", str(args.accounts), "--out-dir", args.out_dir,
+            "--format", args.format, "--seed", str(args.seed),
+        ])
+    else:
+        random.seed(args.seed)
+        Faker.seed(args.seed)
+        generate_all_data(args.accounts)
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# Next-month forecasts for every monthly aggregate series in one batched fit.
+#
+# All series are laid on a shared month axis as rows of one matrix; months a series did
+# not report carry zero weight. Each row gets a weighted least-squares fit of level +
+# linear trend, plus month-of-year effects when it has enough history to estimate them.
+# The normal equations for every row are built with one einsum and solved together.
+# Each series is forecast for the month after its own last observation, not the shared
+# axis end, so a series that stopped reporting is not extrapolated across the gap; one
+# whose last value is too far behind the newest month of its domain is not forecast.
+
+# === CONFIG ===
+MIN_MONTHS = 4          # Fewer observed months than this and a series is not forecast
+SEASONAL_MONTHS = 24    # Two full years before month-of-year effects are fitted
+INTERVAL_Z = 1.96       # ~95% prediction interval under normal residuals
+RIDGE = 1e-6            # Keeps the normal equations solvable for short or sparse series
+MAX_STALE_MONTHS = 3    # A series whose last value is this far behind its domain's newest month is skipped
+
+
+def monthly_series(tables):
+    """(labels, months, Y) over every monthly table in an aggregate store.
+
+    labels is a list of (domain, table, column); Y is series × months with NaN where
+    a series has no value for that month.
+    """
+    frames, labels = [], []
+    for domain, named in sorted(tables.items()):
+        for name, frame in sorted(named.items()):
+            if not isinstance(frame.index, pd.PeriodIndex) or frame.empty:
+                continue
+            numeric = frame.select_dtypes("number")
+            frames.append(numeric.T)
+            labels.extend((domain, name, str(column)) for column in numeric.columns)
+    if not frames:
+        return [], pd.PeriodIndex([], freq="M"), np.empty((0, 0))
+    start = min(f.columns.min() for f in frames)
+    end = max(f.columns.max() for f in frames)
+    months = pd.period_range(start, end, freq="M")
+    Y = np.vstack([f.reindex(columns=months).to_numpy(dtype="float64") for f in frames])
+    return labels, months, Y
+
+
+def _design(months, seasonal):
+    t = np.arange(len(months), dtype="float64")
+    columns = [np.ones_like(t), t]
+    if seasonal:
+        month_of_year = np.asarray(months.month) - 1
+        # January is the baseline; eleven dummies for the other months
+        columns.extend((month_of_year == m).astype("float64") for m in range(1, 12))
+    return np.column_stack(columns)
+
+
+def _fit(X, Y, W, X_next):
+    """Batched WLS: point forecast, standard error and slope for every row of Y at its own X_next row."""
+    p = X.shape[1]
+    XtWX = np.einsum("tp,st,tq->spq", X, W, X) + RIDGE * np.eye(p)
+    XtWy = np.einsum("tp,st->sp", X, W * Y)
+    beta = np.linalg.solve(XtWX, XtWy[..., None])[..., 0]
+    resid = (Y - beta @ X.T) * W
+    n = W.sum(axis=1)
+    dof = np.maximum(n - p, 1)
+    sigma2 = (resid ** 2).sum(axis=1) / dof
+    leverage = np.einsum("sp,spq,sq->s", X_next, np.linalg.inv(XtWX), X_next)
+    return np.einsum("sp,sp->s", beta, X_next), np.sqrt(sigma2 * (1 + leverage)), beta[:, 1]
+
+
+def forecast_next(labels, months, Y):
+    """One row per forecastable series: the value for the month after its last observation, with a prediction interval."""
+    observed = ~np.isnan(Y)
+    n_obs = observed.sum(axis=1)
+    W = observed.astype("float64")
+    Y = np.where(observed, Y, 0.0)
+    # Position of each series' last observed month on the shared axis (-1 when it has none)
+    last = np.full(len(Y), -1)
+    if len(months):
+        last = np.where(n_obs > 0, len(months) - 1 - np.argmax(observed[:, ::-1], axis=1), -1)
+    newest = pd.Series(last, dtype="int64").groupby([label[0] for label in labels]).transform("max").to_numpy()
+    fresh = last >= newest - MAX_STALE_MONTHS
+
+    point = np.full(len(Y), np.nan)
+    stderr = np.full(len(Y), np.nan)
+    slope = np.full(len(Y), np.nan)
+    model = np.full(len(Y), "", dtype=object)
+    for seasonal, rows in ((True, n_obs >= SEASONAL_MONTHS), (False, (n_obs >= MIN_MONTHS) & (n_obs < SEASONAL_MONTHS))):
+        rows = rows & fresh
+        if not rows.any():
+            continue
+        all_months = months.append(pd.PeriodIndex([months[-1] + 1]))
+        X_all = _design(all_months, seasonal)
+        point[rows], stderr[rows], slope[rows] = _fit(X_all[:-1], Y[rows], W[rows], X_all[last[rows] + 1])
+        model[rows] = "trend+seasonal" if seasonal else "trend"
+
+    keep = ~np.isnan(point)
+    lower = np.maximum(point - INTERVAL_Z * stderr, 0.0)
+    upper = np.maximum(point + INTERVAL_Z * stderr, 0.0)
+    # Values like counts and amounts cannot go negative
+    point = np.maximum(point, 0.0)
+    integral = np.all(np.where(observed, Y == np.round(Y), True), axis=1)
+    return pd.DataFrame({
+        "domain": [labels[i][0] for i in np.flatnonzero(keep)],
+        "table": [labels[i][1] for i in np.flatnonzero(keep)],
+        "series": [labels[i][2] for i in np.flatnonzero(keep)],
+        "month": [str(months[last[i]] + 1) for i in np.flatnonzero(keep)],
+        "forecast": point[keep],
+        "lower": lower[keep],
+        "upper": upper[keep],
+        "trend_per_month": slope[keep],
+        "months_used": n_obs[keep],
+        "model": model[keep],
+        "integral": integral[keep],
+    })
+
+
+def forecast_summary(row):
+    """Indexed sentence for one forecast row."""
+    fmt = "{:,.0f}" if row["integral"] else "{:,.2f}"
+    table = row["table"].replace("_", " ")
+    label = table if row["series"] in ("count", row["table"]) else f"{table} '{row['series']}'"
+    trend = round(row["trend_per_month"], 2)   # Slopes that print as 0.00 are flat
+    direction = f"rising by {trend:,.2f} per month" if trend > 0 else f"falling by {-trend:,.2f} per month" if trend < 0 else "flat"
+    period = pd.Period(row["month"], freq="M").strftime("%B %Y")
+    return (
+        f"Forecast for {period}: {row['domain']} {label} is expected to be about {fmt.format(row['forecast'])} "
+        f"(95% interval {fmt.format(row['lower'])} to {fmt.format(row['upper'])}), "
+        f"{direction}, based on {row['months_used']} months of history."
+    )
@@ -0,0 +1,136 @@
+import math
+import os
+import pickle
+import re
+import calendar
+from collections import Counter, defaultdict
+
+# === CONFIG ===
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "for", "from", "had", "has",
+    "have", "how", "in", "is", "it", "many", "much", "of", "on", "or", "the", "their", "there",
+    "this", "to", "via", "was", "were", "what", "when", "which", "who", "with",
+}
+
+# Month names/abbreviations all map to the full lower-case month name
+MONTH_TOKENS = {}
+for m in range(1, 13):
+    MONTH_TOKENS[calendar.month_name[m].lower()] = calendar.month_name[m].lower()
+    MONTH_TOKENS[calendar.month_abbr[m].lower()] = calendar.month_name[m].lower()
+
+
+def tokenize(text):
+    tokens = []
+    for tok in TOKEN_RE.findall(str(text).lower()):
+        tok = MONTH_TOKENS.get(tok, tok)
+        if tok not in STOPWORDS:
+            tokens.append(tok)
+    return tokens
+
+
+def anchor_tokens(text):
+    """Tokens that pin a summary down exactly: months, years, IDs and upper-case codes.
+
+    These are the tokens MiniLM embeddings blur together ("June 2024" vs "July 2024",
+    channel 'API' vs 'MOB'), so they are matched through posting lists instead.
+    """
+    anchors = []
+    for raw in TOKEN_RE.findall(str(text)):
+        low = raw.lower()
+        if low in MONTH_TOKENS and (len(low) > 3 or raw[0].isupper()):
+            anchors.append(MONTH_TOKENS[low])
+        elif raw.isdigit() and (len(raw) == 4 and raw[:2] in ("19", "20") or len(raw) >= 5):
+            anchors.append(raw)
+        elif raw.isupper() and 2 <= len(raw) <= 5 and raw.isalpha():
+            anchors.append(low)
+    return anchors
+
+
+class LexicalIndex:
+    """BM25 inverted index over the same summaries stored in account_metadata.pkl.
+
+    Document ids are positions in the metadata list, so they line up with FAISS ids.
+    """
+
+    def __init__(self, postings, doc_lengths):
+        self.postings = postings          # term -> list of (doc_id, term_freq), doc_id ascending
+        self.doc_lengths = doc_lengths    # list of token counts per doc
+        self.num_docs = len(doc_lengths)
+        self.avg_doc_length = (sum(doc_lengths) / self.num_docs) if self.num_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (self.num_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in postings.items()
+        }
+
+    @classmethod
+    def build(cls, docs):
+        postings = defaultdict(list)
+        doc_lengths = []
+        for doc_id, doc in enumerate(docs):
+            tokens = tokenize(doc)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc_id, tf))
+        return cls(dict(postings), doc_lengths)
+
+    def candidates(self, query):
+        """Doc ids containing every anchor token of the query that the index knows about.
+
+        Returns None when the query has no usable anchors (no narrowing possible) or
+        when the anchors never co-occur, so callers fall back to a full search.
+        """
+        known = [t for t in dict.fromkeys(anchor_tokens(query)) if t in self.postings]
+        if not known:
+            return None
+        known.sort(key=lambda t: len(self.postings[t]))
+        result = {doc_id for doc_id, _ in self.postings[known[0]]}
+        for term in known[1:]:
+            result &= {doc_id for doc_id, _ in self.postings[term]}
+            if not result:
+                return None
+        return result
+
+    def search(self, query, top_k=50, candidates=None):
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in plist:
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / (self.avg_doc_length or 1.0)
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked[:top_k]
+
+
+def build_lexical_index(docs, path):
+    lexical = LexicalIndex.build(docs)
+    with open(path, "wb") as f:
+        pickle.dump(lexical, f)
+    return lexical
+
+
+def load_lexical_index(path, docs):
+    """Load the BM25 index, rebuilding it if it is missing or out of step with `docs`."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            lexical = pickle.load(f)
+        if lexical.num_docs == len(docs):
+            return lexical
+    return build_lexical_index(docs, path)
+
+
+def reciprocal_rank_fusion(*rankings, k=60):
+    """Fuse ranked lists of doc ids; returns [(doc_id, fused_score)] best first."""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Event, Lock, Thread
+import numpy as np
+
+import query_with_model as qa
+from answer_tiers import ANSWER_BUDGET_MS, TIERS
+from batch_query import read_questions
+
+try:
+    import psutil
+except ImportError:  # CPU/RSS sampling falls back to the resource module (Unix only)
+    psutil = None
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    arr = np.array(values)
+    return {
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "mean": float(arr.mean()),
+    }
+
+
+class ResourceSampler(Thread):
+    """Samples process CPU% and RSS at a fixed interval while the load runs."""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.stop_event = Event()
+        self.process = psutil.Process() if psutil else None
+
+    def sample(self, elapsed, last_cpu):
+        if self.process is not None:
+            return {
+                "t": elapsed,
+                "cpu_percent": self.process.cpu_percent(None),
+                "rss_mb": self.process.memory_info().rss / 2**20,
+            }, None
+        import resource  # Unix only, so imported here rather than at module load
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu = usage.ru_utime + usage.ru_stime
+        cpu_percent = (cpu - last_cpu[1]) / max(elapsed - last_cpu[0], 1e-9) * 100 if last_cpu else 0.0
+        # ru_maxrss is the peak (KiB on Linux), the closest stand-in without psutil
+        return {"t": elapsed, "cpu_percent": cpu_percent, "rss_mb": usage.ru_maxrss / 1024}, (elapsed, cpu)
+
+    def run(self):
+        start = time.perf_counter()
+        last_cpu = None
+        if self.process is not None:
+            self.process.cpu_percent(None)
+        while not self.stop_event.wait(self.interval):
+            point, last_cpu = self.sample(time.perf_counter() - start, last_cpu)
+            self.samples.append(point)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class LoadRun:
+    def __init__(self, questions, rephrase, tier, budget_ms):
+        self.questions = questions
+        self.rephrase = rephrase
+        self.tier = tier
+        self.budget_ms = budget_ms
+        self.lock = Lock()
+        self.latencies = []
+        self.queue_waits = []
+        self.stage_times = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.tiers = defaultdict(int)
+        self.partial = 0
+
+    def one_request(self, question, scheduled_at):
+        started = time.perf_counter()
+        try:
+            context = qa.RequestContext(rephrase=self.rephrase, tier=self.tier, budget_ms=self.budget_ms)
+            result = qa.answer_query(question, context)
+        except Exception as e:
+            with self.lock:
+                self.errors[type(e).__name__] += 1
+            return
+        finished = time.perf_counter()
+        with self.lock:
+            self.latencies.append((finished - scheduled_at) * 1000)
+            self.queue_waits.append((started - scheduled_at) * 1000)
+            self.tiers[result.tier] += 1
+            self.partial += result.partial
+            for stage, ms in result.timings_ms.items():
+                self.stage_times[stage].append(ms)
+
+    def open_loop(self, concurrency, rate, total, rng):
+        """Poisson arrivals at `rate` req/s; latency includes time spent queued for a worker."""
+        futures = []
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            next_at = time.perf_counter()
+            for _ in range(total):
+                next_at += rng.expovariate(rate)
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(self.one_request, rng.choice(self.questions), next_at))
+            wait(futures)
+
+    def closed_loop(self, concurrency, total, rng):
+        """`concurrency` simulated admins, each asking the next question as soon as the last returns."""
+        remaining = [total]
+
+        def worker(seed):
+            local_rng = random.Random(seed)
+            while True:
+                with self.lock:
+                    if remaining[0] == 0:
+                        return
+                    remaining[0] -= 1
+                self.one_request(local_rng.choice(self.questions), time.perf_counter())
+
+        threads = [Thread(target=worker, args=(rng.random(),)) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a question mix against answer_query at configurable concurrency.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Simultaneous sessions / worker threads")
+    parser.add_argument("--rate", type=float, default=0.0, help="Open-loop arrival rate in req/s (0 = closed loop)")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests to send")
+    parser.add_argument("--queries-file", action="append", default=[], help="Recorded question log (.jsonl or .txt); repeatable")
+    parser.add_argument("--no-test-queries", action="store_true", help="Do not mix in the built-in test_queries")
+    parser.add_argument("--no-rephrase", action="store_true")
+    parser.add_argument("--tier", default=qa.DEFAULT_TIER, choices=TIERS, help="Best answer tier each request asks for")
+    parser.add_argument("--budget-ms", type=float, default=ANSWER_BUDGET_MS, help="Per-request latency budget")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="Seconds between CPU/RSS samples")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--report", default="load_test_report.json")
+    args = parser.parse_args()
+
+    questions = [] if args.no_test_queries else list(qa.test_queries)
+    for path in args.queries_file:
+        questions.extend(r["question"] for r in read_questions(path))
+    if not questions:
+        parser.error("no questions to replay")
+
+    rng = random.Random(args.seed)
+    run = LoadRun(questions, rephrase=not args.no_rephrase, tier=args.tier, budget_ms=args.budget_ms)
+    sampler = ResourceSampler(args.sample_interval)
+    mode = f"open loop @ {args.rate:g} req/s" if args.rate > 0 else "closed loop"
+    print(f"🚦 {args.requests} requests, concurrency {args.concurrency}, {mode}, {len(set(questions))} distinct questions")
+
+    sampler.start()
+    start = time.perf_counter()
+    if args.rate > 0:
+        run.open_loop(args.concurrency, args.rate, args.requests, rng)
+    else:
+        run.closed_loop(args.concurrency, args.requests, rng)
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+
+    completed = len(run.latencies)
+    report = {
+        "concurrency": args.concurrency,
+        "arrival_rate": args.rate,
+        "requests": args.requests,
+        "completed": completed,
+        "errors": dict(run.errors),
+        "elapsed_s": elapsed,
+        "throughput_rps": completed / elapsed if elapsed else 0.0,
+        "latency_ms": percentiles(run.latencies),
+        "queue_wait_ms": percentiles(run.queue_waits),
+        "stage_ms": {stage: percentiles(v) for stage, v in run.stage_times.items()},
+        "tiers": dict(run.tiers),
+        "partial_results": run.partial,
+        "resources": sampler.samples,
+    }
+
+    print(f"\n✅ {completed}/{args.requests} completed in {elapsed:.1f}s → {report['throughput_rps']:.2f} req/s")
+    lat = report["latency_ms"]
+    print(f"  end-to-end  p50={lat['p50']:.0f}ms  p95={lat['p95']:.0f}ms  p99={lat['p99']:.0f}ms")
+    for stage, p in report["stage_ms"].items():
+        print(f"  {stage:<11} p50={p['p50']:.0f}ms  p95={p['p95']:.0f}ms  p99={p['p99']:.0f}ms")
+    print(f"  answer tiers {dict(run.tiers)}")
+    if run.partial:
+        print(f"  {run.partial} answers left out a shard that missed the search deadline")
+    if sampler.samples:
+        print(f"  peak CPU {max(s['cpu_percent'] for s in sampler.samples):.0f}%  "
+              f"peak RSS {max(s['rss_mb'] for s in sampler.samples):.0f} MB")
+    if run.errors:
+        print(f"  errors: {dict(run.errors)}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from account_view import LOGIN_FAILURE_CODES
+
+# Per-party login sessions, failure streaks and sliding-window failure bursts, plus
+# per-channel hourly failure rates, computed over the login log sorted once by
+# (PARTY_ID, LAST_LOGIN_TS) with cumulative sums and binary searches instead of loops.
+#
+# Sliding windows: with one running count of failures over the sorted log, the failures
+# in (t - window, t] for a party are count[i] - count[j], where j is the first attempt of
+# that party inside the window. j comes from a single searchsorted over a composite
+# (party, seconds) key, so the whole log costs one sort and one binary search per row.
+#
+# Date-only logs (every LAST_LOGIN_TS at midnight, as in the real extract) cannot support
+# minute-level facts: callers check day_granular() and use DAY_BURST_WINDOW and daily
+# channel periods instead of the hourly defaults.
+
+# === CONFIG ===
+INVALID_PASSWORD_CODE = 3
+LOCKOUT_CODE = 4                          # "Locked due to Fraud"
+SESSION_GAP = pd.Timedelta(minutes=30)    # Longer gap between attempts starts a new session
+BURST_WINDOW = pd.Timedelta(hours=1)      # Sliding window for Invalid Password bursts
+DAY_BURST_WINDOW = pd.Timedelta(days=1)   # Same, for date-only logs: failures on the same day
+BURST_FAILURES = 3                        # Invalid Password attempts in the window that make a burst
+SPIKE_FACTOR = 3.0                        # Hourly rate this many times the channel's usual rate is a spike
+MIN_PERIOD_LOGINS = 20                    # Hours (or days) with fewer attempts are too noisy to call a spike
+
+
+def login_events(logins):
+    """Login attempts sorted by party and time, with failure flags."""
+    events = pd.DataFrame({
+        "PARTY_ID": logins["PARTY_ID"],
+        "LAST_LOGIN_TS": pd.to_datetime(logins["LAST_LOGIN_TS"], errors="coerce"),
+        "STATUS": logins["LOGIN_STATUS_CD_ID"],
+        "CHANNEL": logins["SRVCG_CHNL_CD"].fillna("Unknown"),
+    }).dropna(subset=["PARTY_ID", "LAST_LOGIN_TS"])
+    events = events.sort_values(["PARTY_ID", "LAST_LOGIN_TS"], kind="stable").reset_index(drop=True)
+    events["IS_FAILURE"] = events["STATUS"].isin(LOGIN_FAILURE_CODES)
+    events["INVALID_PASSWORD"] = events["STATUS"] == INVALID_PASSWORD_CODE
+    events["LOCKED"] = events["STATUS"] == LOCKOUT_CODE
+    return events
+
+
+def day_granular(timestamps):
+    """True when every timestamp is a bare date (midnight), so times of day are unknown."""
+    timestamps = timestamps.dropna()
+    return len(timestamps) > 0 and bool((timestamps == timestamps.dt.normalize()).all())
+
+
+def window_counts(events, flag, window):
+    """Per attempt, how many of the party's attempts in (t - window, t] have `flag` set."""
+    if events.empty:
+        return np.zeros(0, dtype="int64")
+    party = pd.factorize(events["PARTY_ID"], sort=False)[0].astype("int64")   # Increasing: rows are sorted by party
+    seconds = events["LAST_LOGIN_TS"].to_numpy().astype("datetime64[s]").astype("int64")
+    seconds = seconds - seconds.min()
+    span = int(window.total_seconds())
+    key = party * (seconds.max() + span + 1) + seconds
+    first = np.searchsorted(key, key - span, side="right")
+    running = np.concatenate([[0], np.cumsum(np.asarray(flag, dtype="int64"))])
+    return running[np.arange(1, len(key) + 1)] - running[first]
+
+
+def score_events(events, window=BURST_WINDOW):
+    """Add session ids, failure streaks and sliding-window Invalid Password bursts per attempt."""
+    party = events["PARTY_ID"]
+    new_party = party.ne(party.shift())
+    gap = events["LAST_LOGIN_TS"].diff()
+    new_session = new_party | (gap > SESSION_GAP)
+
+    # Streak of consecutive failures per party: a new run starts at every success
+    failure = events["IS_FAILURE"]
+    run = (~failure).groupby(party, sort=False).cumsum()
+    streak = failure.astype("int32").groupby([party, run], sort=False).cumsum()
+
+    window_failures = window_counts(events, events["INVALID_PASSWORD"], window)
+    in_burst = pd.Series(window_failures >= BURST_FAILURES, index=events.index)
+    burst_start = in_burst & ~(in_burst.shift(fill_value=False) & ~new_party)
+    return events.assign(
+        SESSION_ID=new_session.cumsum().to_numpy() - 1,
+        FAILURE_STREAK=streak.to_numpy(),
+        WINDOW_FAILURES=window_failures,
+        BURST_START=burst_start.to_numpy(),
+    )
+
+
+def party_summary(events):
+    """One row per party: attempts, sessions, longest failure streak, bursts and lockouts."""
+    summary = events.groupby("PARTY_ID", sort=False).agg(
+        LOGINS=("STATUS", "size"),
+        FAILURES=("IS_FAILURE", "sum"),
+        INVALID_PASSWORDS=("INVALID_PASSWORD", "sum"),
+        LOCKOUTS=("LOCKED", "sum"),
+        SESSIONS=("SESSION_ID", "nunique"),
+        LONGEST_FAILURE_STREAK=("FAILURE_STREAK", "max"),
+        MAX_WINDOW_FAILURES=("WINDOW_FAILURES", "max"),
+        BURSTS=("BURST_START", "sum"),
+        LAST_LOGIN_TS=("LAST_LOGIN_TS", "max"),
+    )
+    return summary.reset_index()
+
+
+def channel_hourly(events, freq="h"):
+    """Period × channel attempts, failures and lockouts, flagged where they spike above the channel's usual rate.
+
+    Periods are hours by default; pass freq="D" for date-only logs.
+    """
+    period = events["LAST_LOGIN_TS"].dt.floor(freq).rename("PERIOD")
+    hourly = events.groupby([period, "CHANNEL"], sort=True).agg(
+        LOGINS=("STATUS", "size"),
+        FAILURES=("IS_FAILURE", "sum"),
+        LOCKOUTS=("LOCKED", "sum"),
+    ).reset_index()
+    hourly["FAILURE_RATE"] = hourly["FAILURES"] / hourly["LOGINS"]
+
+    by_channel = hourly.groupby("CHANNEL", sort=False)
+    totals = by_channel[["LOGINS", "FAILURES", "LOCKOUTS"]].transform("sum")
+    hourly["USUAL_RATE"] = totals["FAILURES"] / totals["LOGINS"]
+    hourly["USUAL_LOCKOUTS"] = totals["LOCKOUTS"] / by_channel["PERIOD"].transform("size")
+    busy = hourly["LOGINS"] >= MIN_PERIOD_LOGINS
+    hourly["FAILURE_SPIKE"] = busy & (hourly["FAILURE_RATE"] >= SPIKE_FACTOR * hourly["USUAL_RATE"]) & (hourly["FAILURES"] > 0)
+    hourly["LOCKOUT_STORM"] = busy & (hourly["LOCKOUTS"] >= SPIKE_FACTOR * hourly["USUAL_LOCKOUTS"]) & (hourly["LOCKOUTS"] > 0)
+    return hourly
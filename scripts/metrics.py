@@ -0,0 +1,169 @@
+import bisect
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+METRICS_HOST_ENV = "HACKDASH_METRICS_HOST"   # Interface for /metrics; set 0.0.0.0 to expose it beyond this host
+METRICS_PORT_ENV = "HACKDASH_METRICS_PORT"   # Give each co-located dashboard its own port
+
+# === CONFIG ===
+METRICS_HOST = "127.0.0.1"   # The endpoint has no authentication, so local scrapes only by default
+METRICS_PORT = 9108          # Prometheus scrape port for /metrics
+
+# Latency buckets (ms) cover a ~5 ms encode up to a multi-second FLAN generation
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_registry = {}
+_registry_lock = Lock()
+_server = None
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def label_sets(self):
+        return [dict(key) for key in self.values]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and three adds under a per-metric lock."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}   # label key -> [bucket counts..., +Inf count, sum]
+        self.lock = Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            row = self.series.get(key)
+            if row is None:
+                row = self.series[key] = [0] * (len(self.buckets) + 2)
+            row[slot] += 1
+            row[-1] += value
+
+    def count(self, **labels):
+        row = self.series.get(_label_key(labels))
+        return sum(row[:-1]) if row else 0
+
+    def quantile(self, q, **labels):
+        """Bucket upper bound the q-th observation falls in (what histogram_quantile would report, unsmoothed)."""
+        row = self.series.get(_label_key(labels))
+        if not row:
+            return None
+        total = sum(row[:-1])
+        rank = q * total
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), row[:-1]):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def label_sets(self):
+        return [dict(key) for key in self.series]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [f"{b:g}" for b in self.buckets] + ["+Inf"]
+        with self.lock:
+            for key, row in sorted(self.series.items()):
+                cumulative = 0
+                for bound, n in zip(bounds, row[:-1]):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {row[-1]:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+def _register(metric):
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+def counter(name, help_text):
+    """Get or create a process-wide counter (re-imports under Streamlit get the same object)."""
+    return _register(Counter(name, help_text))
+
+
+def histogram(name, help_text, buckets=LATENCY_BUCKETS_MS):
+    return _register(Histogram(name, help_text, buckets))
+
+
+def render_prometheus():
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+
+def start_metrics_server(host=None, port=None):
+    """Serve /metrics from a daemon thread; only the first call in a process starts a server.
+
+    Returns None, and the process carries on without the endpoint, when the port is taken.
+    """
+    global _server
+    host = host or os.environ.get(METRICS_HOST_ENV, METRICS_HOST)
+    port = port or int(os.environ.get(METRICS_PORT_ENV, METRICS_PORT))
+    with _registry_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"⚠️ Metrics endpoint not started on {host}:{port} ({e}); set {METRICS_PORT_ENV} to another port")
+                return None
+            Thread(target=_server.serve_forever, daemon=True, name="metrics").start()
+            print(f"📈 Metrics endpoint on http://{host}:{port}/metrics")
+    return _server
@@ -0,0 +1,175 @@
+import os
+import pickle
+import tempfile
+from contextlib import contextmanager
+import faiss
+import numpy as np
+
+# Read-only, memory-mapped loading for the query side. Several dashboard/query workers
+# on one host then share a single page-cache copy of the index, the summary strings and
+# the model weights, and startup no longer deserializes any of them eagerly.
+#
+# Anything mapped here must be replaced with os.replace, never rewritten in place:
+# truncating a file another process has mapped kills that process with SIGBUS. Workers
+# that start together may all find the same file stale, so the query-side writers below
+# use per-process temp names and convert under a lock file next to the target.
+
+# === CONFIG ===
+MODEL_CACHE_DIR = "mmap_models"   # Under the faiss_index folder; one .pt state dict per model
+
+
+# === FAISS ===
+def read_index_mmap(path):
+    """Open a flat (or IDMap-wrapped flat) index with its vectors mapped instead of copied."""
+    return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC)
+
+
+def write_index_atomic(index, path):
+    tmp_path = path + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_replace(path, write):
+    """Write `path` through a temp file unique to this call, then swap it in."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on `path`.lock shared by every process on the host; released on exit."""
+    with open(path + ".lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after ~10 s; a long conversion just means waiting again
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# === STRING TABLE ===
+class StringTable:
+    """Read-only list of strings over a mapped UTF-8 blob and an offsets array.
+
+    Indexing decodes one entry on demand, so nothing is unpickled at startup and
+    every process shares the same pages.
+    """
+
+    def __init__(self, path):
+        self.offsets = np.load(path + ".offsets.npy", mmap_mode="r")
+        size = int(self.offsets[-1])
+        # np.memmap rejects zero-length files
+        self.blob = np.memmap(path + ".strings", dtype="uint8", mode="r") if size else np.empty(0, "uint8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def write_string_table(strings, path):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    # Blob first: a reader that sees new offsets always finds a blob at least that long
+    _write_replace(path + ".strings", lambda f: f.write(b"".join(encoded)))
+    _write_replace(path + ".offsets.npy", lambda f: np.save(f, offsets))
+
+
+def _stale(pickle_path):
+    offsets_path = pickle_path + ".offsets.npy"
+    return not os.path.exists(offsets_path) or os.path.getmtime(offsets_path) < os.path.getmtime(pickle_path)
+
+
+def load_string_table(pickle_path):
+    """Mapped view of a pickled list of strings, converted once whenever the pickle is newer.
+
+    Of several workers that find it stale at once, one converts and the others wait for it.
+    """
+    if _stale(pickle_path):
+        with _file_lock(pickle_path):
+            if _stale(pickle_path):
+                with open(pickle_path, "rb") as f:
+                    write_string_table(pickle.load(f), pickle_path)
+    return StringTable(pickle_path)
+
+
+# === MODEL WEIGHTS ===
+def _cache_path(cache_dir, model_name):
+    return os.path.join(cache_dir, model_name.replace("/", "--") + ".pt")
+
+
+def _save_state_dict(model, path):
+    import torch
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_replace(path, lambda f: torch.save(model.state_dict(), f))
+
+
+def _mapped_state_dict(path):
+    import torch
+    return torch.load(path, mmap=True, weights_only=True, map_location="cpu")
+
+
+def load_seq2seq_mmap(model_name, cache_dir):
+    """Seq2seq LM whose parameters point into a mapped state dict.
+
+    The first run downloads the model normally and writes the state dict; later runs
+    build the module on the meta device (no allocation) and assign the mapped tensors.
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForSeq2SeqLM, GenerationConfig
+
+    path = _cache_path(cache_dir, model_name)
+    if not os.path.exists(path):
+        _save_state_dict(AutoModelForSeq2SeqLM.from_pretrained(model_name), path)
+    with torch.device("meta"):
+        model = AutoModelForSeq2SeqLM.from_config(AutoConfig.from_pretrained(model_name))
+    model.load_state_dict(_mapped_state_dict(path), assign=True)
+    model.tie_weights()
+    model.generation_config = GenerationConfig.from_pretrained(model_name)
+    return model.eval()
+
+
+def mmap_sentence_transformer(embed_model, model_name, cache_dir):
+    """Swap a SentenceTransformer's transformer weights for mapped ones.
+
+    SentenceTransformer has no meta-device constructor, so the small encoder is still
+    built normally; its private copy of the weights is freed once the mapped ones are assigned.
+    """
+    auto_model = embed_model[0].auto_model
+    path = _cache_path(cache_dir, model_name)
+    if not os.path.exists(path):
+        _save_state_dict(auto_model, path)
+    auto_model.load_state_dict(_mapped_state_dict(path), assign=True)
+    return embed_model
@@ -1,58 +1,432 @@
 import os
 import pickle
 import faiss
+import time
+import uuid
 import numpy as np
+from dataclasses import dataclass, field
+from queue import Empty, SimpleQueue
+from threading import Lock, Thread
 from sentence_transformers import SentenceTransformer
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, TextIteratorStreamer, pipeline
+from lexical_index import load_lexical_index, reciprocal_rank_fusion
+from domain_router import load_domain_router, load_domains
+from sharded_index import SHARD_DEADLINE_MS
+from answer_tiers import ANSWER_BUDGET_MS, MODEL_TIERS, TierSelector, template_polish
+from daily_store import DAILY_FILE, load_daily
+from metrics import counter, histogram
+from mmap_store import (
+    MODEL_CACHE_DIR, load_seq2seq_mmap, load_string_table, mmap_sentence_transformer, read_index_mmap,
+)
+from table_io import base_dir
+from time_windows import window_answer
 
 # === CONFIG ===
 DEBUG = True
-USE_FLAN_CLEANING = True  # Toggle this to turn FLAN rephrasing on/off
+USE_FLAN_CLEANING = True  # Load flan-t5-base for the "full" answer tier
+USE_SMALL_FLAN = True  # Also load flan-t5-small for the cheaper "small" tier
+DEFAULT_TIER = "full"  # Best tier a request asks for; the selector drops lower under load
+USE_HYBRID_RETRIEVAL = True  # Fuse BM25 lexical hits with FAISS results
+CANDIDATE_POOL = 50  # Hits taken from each retriever before fusion
+USE_DOMAIN_ROUTING = True  # Search only the sub-index(es) of the predicted domain
+USE_MMAP = True  # Map index, summaries and model weights read-only so co-located workers share them
+USE_TIME_WINDOWS = True  # Answer "last 7 days" / "dormant for 18 months" questions from daily totals as of today
+STREAM_TOKEN_TIMEOUT_S = 30  # Longest wait for the next streamed token before giving up on the generation
 
 # === PATHS ===
-BASE_DIR = "F:/Projects/AIModel/demo"
+BASE_DIR = base_dir("F:/Projects/AIModel/demo")
 FAISS_INDEX_PATH = os.path.join(BASE_DIR, "faiss_index", "account_index.faiss")
 FAISS_META_PATH = os.path.join(BASE_DIR, "faiss_index", "account_metadata.pkl")
+LEXICAL_PATH = os.path.join(BASE_DIR, "faiss_index", "account_bm25.pkl")
+DOMAIN_PATH = os.path.join(BASE_DIR, "faiss_index", "account_domains.pkl")
+DAILY_PATH = os.path.join(BASE_DIR, "faiss_index", DAILY_FILE)
+MODEL_CACHE_PATH = os.path.join(BASE_DIR, "faiss_index", MODEL_CACHE_DIR)
 
 # === LOAD MODELS ===
 print("🔁 Loading SentenceTransformer...")
 embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+if USE_MMAP:
+    mmap_sentence_transformer(embed_model, "all-MiniLM-L6-v2", MODEL_CACHE_PATH)
 
+def load_flan(model_name):
+    if USE_MMAP:
+        return load_seq2seq_mmap(model_name, MODEL_CACHE_PATH)
+    return AutoModelForSeq2SeqLM.from_pretrained(model_name)
+
+flan_models = {}
 if USE_FLAN_CLEANING:
     print("✨ Loading FLAN-T5 for optional answer rephrasing...")
-    flan_model = AutoModelForSeq2SeqLM.from_pretrained("google/flan-t5-base")
-    flan_tokenizer = AutoTokenizer.from_pretrained("google/flan-t5-base")
+    flan_model = flan_models["full"] = load_flan(MODEL_TIERS["full"])
+    if USE_SMALL_FLAN:
+        flan_models["small"] = load_flan(MODEL_TIERS["small"])
+    # Every FLAN-T5 size uses the same SentencePiece vocabulary
+    flan_tokenizer = AutoTokenizer.from_pretrained(MODEL_TIERS["full"])
     flan_pipeline = pipeline("text2text-generation", model=flan_model, tokenizer=flan_tokenizer)
+tier_selector = TierSelector(flan_models)
 
 # === LOAD FAISS INDEX & METADATA ===
 print("📦 Loading FAISS index...")
-index = faiss.read_index(FAISS_INDEX_PATH)
-with open(FAISS_META_PATH, "rb") as f:
-    summaries = pickle.load(f)
+if USE_MMAP:
+    index = read_index_mmap(FAISS_INDEX_PATH)
+    summaries = load_string_table(FAISS_META_PATH)
+else:
+    index = faiss.read_index(FAISS_INDEX_PATH)
+    with open(FAISS_META_PATH, "rb") as f:
+        summaries = pickle.load(f)
+lexical_index = load_lexical_index(LEXICAL_PATH, summaries)
+domains = load_domains(DOMAIN_PATH, len(summaries))
+domain_router = load_domain_router(os.path.dirname(FAISS_INDEX_PATH)) if USE_DOMAIN_ROUTING else None
 
-def query_account_qa(user_query: str, top_k: int = 5):
-    embedding = embed_model.encode([user_query])
-    D, I = index.search(np.array(embedding), top_k)
+# Tokenizers are not safe to call from several threads at once; model forward passes are
+_embed_lock = Lock()
+_flan_tokenizer_lock = Lock()
+# A streamed answer decodes on its generate thread, outside any lock, so each one borrows
+# a tokenizer of its own; returned ones are reused by later streams
+_stream_tokenizers = SimpleQueue()
+
+def borrow_stream_tokenizer():
+    try:
+        return _stream_tokenizers.get_nowait()
+    except Empty:
+        return AutoTokenizer.from_pretrained(MODEL_TIERS["full"])
+
+# === METRICS ===
+STAGE_LATENCY = histogram("qa_stage_latency_ms", "Per-request latency of each answer stage in milliseconds")
+REQUESTS = counter("qa_requests_total", "Answered questions by domain of the top match")
+TOP1_DISTANCE = histogram("qa_top1_l2_distance", "L2 distance of the top match", (0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.5, 2.0))
+GENERATED_TOKENS = histogram("qa_generated_tokens", "Tokens generated per FLAN rephrase", (8, 16, 32, 64, 96, 128))
+
+# === STRUCTURED ANSWER API ===
+@dataclass
+class Match:
+    summary: str
+    match_score: float
+    domain: str
+    lexical_score: float = 0.0
+    fused_score: float = 0.0
+
+@dataclass
+class RequestContext:
+    """Per-request settings; nothing here is shared between concurrent requests."""
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    top_k: int = 5
+    rephrase: bool = True  # False serves the raw summary
+    tier: str = DEFAULT_TIER  # Best answer tier wanted (answer_tiers.TIERS)
+    budget_ms: float = ANSWER_BUDGET_MS  # Latency budget for the whole answer
+
+@dataclass
+class AnswerResult:
+    request_id: str
+    query: str
+    answer: str
+    matches: list
+    routed_domains: list = None
+    missed_shards: list = field(default_factory=list)  # Shards left out for missing the search deadline
+    timings_ms: dict = field(default_factory=dict)
+    tier: str = "raw"
+
+    @property
+    def domain(self):
+        return self.matches[0].domain if self.matches else None
+
+    @property
+    def partial(self):
+        return bool(self.missed_shards)
+
+def build_rephrase_prompt(summary: str) -> str:
+    return f"Rephrase clearly and professionally without changing the meaning: {summary}"
+
+def route_query(embedding):
+    """Domains the query should be searched in, or None for a global search."""
+    if domain_router is None:
+        return None
+    return domain_router.route(embedding[0])
+
+def dense_search(embedding, top_k, routed_domains=None, candidates=None, deadline_ms=SHARD_DEADLINE_MS):
+    """(D, I, missed shards); deadline_ms=None waits for every shard."""
+    if domain_router is not None:
+        if routed_domains:
+            D, I, missed = domain_router.search(embedding, top_k, routed_domains, candidates, deadline_ms)
+        else:
+            # Global searches fan out over every shard too, so latency tracks the largest shard
+            D, I, missed = domain_router.shards.search(embedding, top_k, candidates=candidates, deadline_ms=deadline_ms)
+        # A shard hot-reloaded after an append can hold ids this process has no metadata for yet
+        I[I >= len(summaries)] = -1
+        return D, I, missed
+    if candidates is None:
+        return (*index.search(embedding, top_k), [])
+    # Only score the summaries that survived the lexical pre-filter
+    selector = faiss.IDSelectorBatch(np.fromiter(candidates, dtype="int64"))
+    return (*index.search(embedding, min(top_k, len(candidates)), params=faiss.SearchParameters(sel=selector)), [])
+
+def lexical_scope(user_query, routed_domains):
+    """(dense pre-filter, lexical scope) for a query: anchor-token candidates, clipped to the routed domains."""
+    candidates = lexical_index.candidates(user_query)
+    if routed_domains:
+        scope = domain_router.ids_for(routed_domains)
+        candidates = (candidates & scope) if candidates else None
+        return candidates or None, candidates or scope
+    return candidates, candidates
+
+def fuse_hits(user_query, embedding_row, dense_hits, scope, top_k):
+    lexical_hits = dict(lexical_index.search(user_query, CANDIDATE_POOL, scope))
+    fused = reciprocal_rank_fusion(list(dense_hits), list(lexical_hits))[:top_k]
     results = []
-    for idx, dist in zip(I[0], D[0]):
+    for idx, fused_score in fused:
+        if idx in dense_hits:
+            dist = dense_hits[idx]
+        else:
+            dist = float(np.sum((index.reconstruct(idx) - embedding_row) ** 2))
         results.append({
-            "match_score": float(dist),
-            "summary": summaries[idx]
+            "match_score": dist,
+            "lexical_score": float(lexical_hits.get(idx, 0.0)),
+            "fused_score": float(fused_score),
+            "summary": summaries[idx],
+            "domain": domains[idx]
         })
-    top_result = results[0]["summary"]
-    if USE_FLAN_CLEANING:
-        prompt = f"Rephrase clearly and professionally without changing the meaning: {top_result}"
-        rephrased = flan_pipeline(prompt, max_length=128, do_sample=False)[0]["generated_text"]
-        results[0]["summary"] = rephrased.strip()
+    return results
+
+def embed_queries(queries):
+    with _embed_lock:
+        embeddings = embed_model.encode(list(queries), convert_to_numpy=True)
+    return np.asarray(embeddings).astype("float32")
+
+def retrieve_matches(user_query: str, top_k: int = 5, embedding=None, routed_domains=None, missed_shards=None):
+    """Top matches for one query; shards dropped for missing the deadline are appended to `missed_shards`."""
+    if embedding is None:
+        embedding = embed_queries([user_query])
+    if routed_domains is None:
+        routed_domains = route_query(embedding)
+    if not USE_HYBRID_RETRIEVAL:
+        D, I, missed = dense_search(embedding, top_k, routed_domains)
+        if missed_shards is not None:
+            missed_shards.extend(missed)
+        return [
+            {"match_score": float(dist), "summary": summaries[idx], "domain": domains[idx]}
+            for idx, dist in zip(I[0], D[0]) if idx >= 0
+        ]
+
+    # Exact tokens (month, year, channel code, account ID) narrow the candidates first
+    candidates, scope = lexical_scope(user_query, routed_domains)
+    D, I, missed = dense_search(embedding, CANDIDATE_POOL, routed_domains, candidates)
+    if missed_shards is not None:
+        missed_shards.extend(missed)
+    dense_hits = {int(idx): float(dist) for idx, dist in zip(I[0], D[0]) if idx >= 0}
+    return fuse_hits(user_query, embedding[0], dense_hits, scope, top_k)
+
+def retrieve_matches_batch(queries, embeddings, top_k: int = 5):
+    """Retrieve matches for many queries, returning what retrieve_matches would for each one.
+
+    Queries are grouped by routed domains and anchor-token candidate set, and each group
+    runs one multi-query search with that group's pre-filter, so month, year or ID
+    questions are scored inside their candidates exactly as on the dashboard.
+    Returns (results per query, routed domains per query).
+    """
+    embeddings = np.asarray(embeddings, dtype="float32")
+    routes = [route_query(embeddings[i:i + 1]) for i in range(len(queries))]
+    groups = {}
+    scopes = [None] * len(queries)
+    for row, routed in enumerate(routes):
+        candidates = None
+        if USE_HYBRID_RETRIEVAL:
+            candidates, scopes[row] = lexical_scope(queries[row], routed)
+        key = (tuple(routed) if routed else None, frozenset(candidates) if candidates is not None else None)
+        groups.setdefault(key, []).append(row)
+
+    pool = top_k if not USE_HYBRID_RETRIEVAL else CANDIDATE_POOL
+    all_results = [None] * len(queries)
+    for (routed_key, candidates), rows in groups.items():
+        routed_domains = list(routed_key) if routed_key else None
+        # No shard deadline: a batch would rather wait than drop a shard's hits
+        D, I, _ = dense_search(embeddings[rows], pool, routed_domains, set(candidates) if candidates is not None else None,
+                               deadline_ms=None)
+        for pos, row in enumerate(rows):
+            hits = {int(idx): float(dist) for idx, dist in zip(I[pos], D[pos]) if idx >= 0}
+            if not USE_HYBRID_RETRIEVAL:
+                all_results[row] = [
+                    {"match_score": dist, "summary": summaries[idx], "domain": domains[idx]}
+                    for idx, dist in hits.items()
+                ]
+                continue
+            all_results[row] = fuse_hits(queries[row], embeddings[row], hits, scopes[row], top_k)
+    return all_results, routes
+
+def window_override(user_query, top_domain, routed_domains):
+    """Live answer for a relative-period question, or None to keep the retrieved summary."""
+    if not USE_TIME_WINDOWS:
+        return None
+    window_domains = [top_domain] + [d for d in routed_domains or [] if d != top_domain]
+    return window_answer(user_query, window_domains, load_daily(DAILY_PATH))
+
+def rephrase_answer(summary: str, tier: str = "full") -> str:
+    prompt = build_rephrase_prompt(summary)
+    with _flan_tokenizer_lock:
+        inputs = flan_tokenizer(prompt, return_tensors="pt")
+    output_ids = flan_models[tier].generate(**inputs, max_length=128, do_sample=False)
+    GENERATED_TOKENS.observe(output_ids.shape[-1])
+    with _flan_tokenizer_lock:
+        text = flan_tokenizer.decode(output_ids[0], skip_special_tokens=True)
+    return text.strip()
+
+def retrieve_result(user_query: str, context: RequestContext) -> AnswerResult:
+    """Encode + search for one request; the answer is the raw top summary until rephrased."""
+    t0 = time.perf_counter()
+    embedding = embed_queries([user_query])
+    t1 = time.perf_counter()
+    routed_domains = route_query(embedding)
+    t2 = time.perf_counter()
+    missed_shards = []
+    raw_matches = retrieve_matches(user_query, context.top_k, embedding, routed_domains, missed_shards)
+    t3 = time.perf_counter()
+    matches = [
+        Match(
+            summary=m["summary"],
+            match_score=m["match_score"],
+            domain=m.get("domain", "unknown"),
+            lexical_score=m.get("lexical_score", 0.0),
+            fused_score=m.get("fused_score", 0.0),
+        )
+        for m in raw_matches
+    ]
+    t4 = time.perf_counter()
+    answer = matches[0].summary if matches else ""
+    if matches:
+        answer = window_override(user_query, matches[0].domain, routed_domains) or answer
+    t5 = time.perf_counter()
+    return AnswerResult(
+        request_id=context.request_id,
+        query=user_query,
+        answer=answer,
+        matches=matches,
+        routed_domains=routed_domains,
+        missed_shards=missed_shards,
+        timings_ms={
+            "encode": (t1 - t0) * 1000,
+            "route": (t2 - t1) * 1000,
+            "search": (t3 - t2) * 1000,
+            "lookup": (t4 - t3) * 1000,
+            "window": (t5 - t4) * 1000,
+        },
+    )
+
+def select_tier(result: AnswerResult, context: RequestContext, started: float) -> str:
+    """Tier for this answer given what is left of the request's budget after retrieval."""
+    if not (result.answer and context.rephrase):
+        return "raw"
+    remaining_ms = context.budget_ms - (time.perf_counter() - started) * 1000
+    return tier_selector.choose(context.tier, remaining_ms)
+
+def record_metrics(result: AnswerResult):
+    """Fold a finished request into the process metrics (a few dict updates per request)."""
+    for stage, ms in result.timings_ms.items():
+        STAGE_LATENCY.observe(ms, stage=stage)
+    REQUESTS.inc(domain=result.domain or "none")
+    if result.matches:
+        TOP1_DISTANCE.observe(result.matches[0].match_score)
+
+def answer_query(user_query: str, context: RequestContext = None) -> AnswerResult:
+    """Answer one question; the only process-wide state it touches is the shared metrics.
+
+    Safe to call from many threads (e.g. concurrent Streamlit sessions) at once: the
+    counters, histograms and tier estimates it updates are guarded by their own locks.
+    """
+    context = context or RequestContext()
+    started = time.perf_counter()
+    result = retrieve_result(user_query, context)
+    result.tier = select_tier(result, context, started)
+    t0 = time.perf_counter()
+    if result.tier == "template":
+        result.answer = template_polish(result.answer)
+    elif result.tier in flan_models:
+        with tier_selector.generating(result.tier):
+            result.answer = rephrase_answer(result.answer, result.tier)
+    if result.tier != "raw":
+        result.timings_ms["rephrase"] = (time.perf_counter() - t0) * 1000
+    record_metrics(result)
+    return result
+
+def query_account_qa(user_query: str, top_k: int = 5):
+    result = answer_query(user_query, RequestContext(top_k=top_k))
+    results = [vars(m).copy() for m in result.matches]
+    if results:
+        results[0]["summary"] = result.answer
     return {
         "original_query": user_query,
         "top_matches": results
     }
 
-# === DEBUG TEST QUERIES ===
-if DEBUG:
-    test_queries = [
-        # Account & General
+# === STREAMING ANSWERS ===
+def stream_account_qa(user_query: str, context: RequestContext = None):
+    """Yield the answer to `user_query` as a sequence of events.
+
+    The first event is {"type": "matches", ...} with the raw retrieved summaries,
+    emitted as soon as the FAISS search returns. When a model tier is selected,
+    {"type": "token", "text": ...} events follow as the decoder produces them.
+    The last event is {"type": "done", "result": AnswerResult} with the full answer.
+    """
+    context = context or RequestContext()
+    started = time.perf_counter()
+    result = retrieve_result(user_query, context)
+    yield {"type": "matches", "result": result}
+
+    result.tier = select_tier(result, context, started)
+    t0 = time.perf_counter()
+    if result.tier not in flan_models:
+        if result.tier == "template":
+            result.answer = template_polish(result.answer)
+            result.timings_ms["rephrase"] = (time.perf_counter() - t0) * 1000
+        record_metrics(result)
+        yield {"type": "done", "result": result}
+        return
+
+    prompt = build_rephrase_prompt(result.answer)
+    tokenizer = borrow_stream_tokenizer()
+    inputs = tokenizer(prompt, return_tensors="pt")
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                    timeout=STREAM_TOKEN_TIMEOUT_S)
+    generated = {}
+
+    def generate():
+        # The generation is in flight until this thread ends, even when the consumer has
+        # stopped reading (a token timeout or a Streamlit rerun closing this generator)
+        started = tier_selector.begin()
+        finished = False
+        try:
+            generated["ids"] = flan_models[result.tier].generate(**inputs, max_length=128, do_sample=False, streamer=streamer)
+            finished = True
+        except Exception as e:
+            # Re-raised on the consumer side; end() stops its loop instead of leaving it waiting
+            generated["error"] = e
+            streamer.end()
+        finally:
+            tier_selector.end(result.tier, started, finished)
+            _stream_tokenizers.put(tokenizer)
+
+    answer = ""
+    worker = Thread(target=generate, daemon=True)
+    worker.start()
+    try:
+        for text in streamer:
+            if not text:
+                continue
+            answer += text
+            yield {"type": "token", "text": text}
+    except Empty:
+        raise TimeoutError(f"No answer token from the {result.tier} model in {STREAM_TOKEN_TIMEOUT_S}s") from None
+    worker.join()
+    if "error" in generated:
+        raise generated["error"]
+    result.answer = answer.strip()
+    result.timings_ms["rephrase"] = (time.perf_counter() - t0) * 1000
+    if "ids" in generated:
+        GENERATED_TOKENS.observe(generated["ids"].shape[-1])
+    record_metrics(result)
+    yield {"type": "done", "result": result}
+
+# === TEST QUERIES (grouped by expected domain) ===
+TEST_QUERY_GROUPS = {
+    # Account & General
+    "account": [
         "How many accounts are active?",
         "How many users opened an account last year?",
         "What are the top reasons accounts are closed?",
@@ -63,8 +437,10 @@ if DEBUG:
         "When did most users last log in?",
         "What are the most common roles for parties on accounts?",
         "How many accounts were closed in 2024?",
-
-        # Customer-login insights
+        "How many accounts have been dormant for 18 months?",
+    ],
+    # Customer-login insights
+    "login": [
         "What is the overall login success rate?",
         "How many first-time logins occurred?",
         "How many users failed to login due to wrong password?",
@@ -74,8 +450,9 @@ if DEBUG:
         "Did login activity increase after March 2024?",
         "Are mobile logins more frequent than web?",
         "Was there any login failure recorded?",
-
-        # Payments + Statements + Account detail (cross-domain)
+    ],
+    # Payments + Statements + Account detail (cross-domain)
+    "payment": [
         "How many accounts were overdue last month?",
         "How much was the total overdue amount in June 2024?",
         "How many overdue accounts made a payment last month?",
@@ -93,8 +470,10 @@ if DEBUG:
         "How many accounts became active after payment in the last quarter?",
         "How often do customers pay late versus on time?",
         "Did failed payments increase compared to last month?",
-
-        # Transaction analytics
+        "How many payments failed in the last 7 days?",
+    ],
+    # Transaction analytics
+    "transaction": [
         "What is the total transaction amount for March 2025?",
         "Which transaction category is most common in 2024?",
         "How many transactions were completed via API in May 2025?",
@@ -106,7 +485,37 @@ if DEBUG:
         "Which transaction type had the most failures this year?",
         "Are WEB transactions increasing month over month?",
         "List all accounts with transactions above ₹10,000 in February 2025.",
-    ]
+    ],
+}
+
+# Domains that count as a correct route for each test group
+ROUTING_EXPECTATIONS = {
+    "account": {"account"},
+    "login": {"login"},
+    "payment": {"payment", "payment_statement"},
+    "transaction": {"transaction"},
+}
+test_queries = [q for group in TEST_QUERY_GROUPS.values() for q in group]
+
+def evaluate_routing():
+    """Routing accuracy per test group: a query is routed correctly when every domain
+    searched is one the group expects; global fallbacks are counted separately."""
+    report = {}
+    for group, queries in TEST_QUERY_GROUPS.items():
+        expected = ROUTING_EXPECTATIONS[group]
+        correct = fallback = 0
+        for query in queries:
+            embedding = embed_queries([query])
+            routed = route_query(embedding)
+            if routed is None:
+                fallback += 1
+            elif set(routed) <= expected:
+                correct += 1
+        report[group] = {"queries": len(queries), "correct": correct, "global_fallback": fallback}
+    return report
+
+# === DEBUG TEST QUERIES ===
+if __name__ == "__main__" and DEBUG:
 
     print("\n🔍 Running test queries across all domains:")
     for query in test_queries:
@@ -118,9 +527,15 @@ if DEBUG:
             print(f"\n🔹 Match {i+1} (Score: {r['match_score']:.2f}) [Domain: {domain}]:")
             print(r["summary"])
 
+    if domain_router is not None:
+        print("\n🧭 Domain routing accuracy on test queries:")
+        for group, stats in evaluate_routing().items():
+            print(f"  {group}: {stats['correct']}/{stats['queries']} routed correctly, "
+                  f"{stats['global_fallback']} fell back to global search")
+
 
 # === CLI MODE ===
-if not DEBUG:
+if __name__ == "__main__" and not DEBUG:
     while True:
         user_input = input("💬 Enter your query (or type 'exit'): ")
         if user_input.lower() in ["exit", "quit"]:
@@ -0,0 +1,198 @@
+import math
+import os
+import pickle
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+import faiss
+import numpy as np
+from metrics import counter
+from mmap_store import read_index_mmap, write_index_atomic
+
+# === CONFIG ===
+SHARD_DIR = "shards"
+MANIFEST_FILE = "manifest.pkl"
+MAX_SHARD_VECTORS = 50_000   # A domain larger than this is hash-split into several shards
+SEARCH_THREADS = 8           # FAISS releases the GIL, so shards really search in parallel
+SHARD_DEADLINE_MS = 250      # Shards still searching this long after they start are left out of the merged result
+RELOAD_CHECK_S = 5           # How often searches look for rebuilt shards on disk
+
+SHARD_TIMEOUTS = counter("qa_shard_timeouts_total", "Shard searches dropped for missing the deadline")
+
+_pool = ThreadPoolExecutor(max_workers=SEARCH_THREADS, thread_name_prefix="shard")
+
+
+# Each shard is an IndexIDMap2 over a flat L2 index holding global FAISS ids, so hits
+# from any shard map straight back into the shared metadata list. A domain's shards
+# are named "<domain>/<part>"; vector id i of a domain with P parts lives in part i % P.
+# The manifest lists every shard with a version, so readers reload only what changed.
+
+def _manifest_path(out_dir):
+    return os.path.join(out_dir, SHARD_DIR, MANIFEST_FILE)
+
+
+def read_manifest(out_dir):
+    path = _manifest_path(out_dir)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# === BUILD ===
+def write_domain_shards(out_dir, domain, vectors, ids):
+    """Replace every shard of one domain; other domains' shard files are not touched."""
+    domain_dir = os.path.join(out_dir, SHARD_DIR, domain)
+    os.makedirs(domain_dir, exist_ok=True)
+    parts = max(1, math.ceil(len(ids) / MAX_SHARD_VECTORS))
+    version = time.time_ns()
+    entries = {}
+    for part in range(parts):
+        mask = ids % parts == part
+        shard = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+        shard.add_with_ids(vectors[mask], ids[mask])
+        file_name = os.path.join(domain, f"{part}.faiss")
+        write_index_atomic(shard, os.path.join(out_dir, SHARD_DIR, file_name))
+        entries[f"{domain}/{part}"] = {"domain": domain, "file": file_name, "ntotal": int(mask.sum()), "version": version}
+
+    for stale in os.listdir(domain_dir):
+        if stale.endswith(".faiss") and os.path.join(domain, stale) not in {e["file"] for e in entries.values()}:
+            os.remove(os.path.join(domain_dir, stale))
+    return entries
+
+
+def write_shards(out_dir, vectors_by_domain, domains_to_write=None):
+    """Write shards for the given domains ({domain: (vectors, ids)}) and update the manifest atomically.
+
+    Domains not in `domains_to_write` keep their existing shards unless they have none yet.
+    """
+    manifest = read_manifest(out_dir)
+    existing = {entry["domain"] for entry in manifest.values()}
+    targets = set(vectors_by_domain) if domains_to_write is None else set(domains_to_write)
+    targets |= set(vectors_by_domain) - existing
+    manifest = {name: entry for name, entry in manifest.items()
+                if entry["domain"] not in targets and entry["domain"] in vectors_by_domain}
+    for dropped in existing - set(vectors_by_domain):
+        shutil.rmtree(os.path.join(out_dir, SHARD_DIR, dropped), ignore_errors=True)
+    for domain in sorted(targets & set(vectors_by_domain)):
+        vectors, ids = vectors_by_domain[domain]
+        manifest.update(write_domain_shards(out_dir, domain, vectors, ids))
+
+    path = _manifest_path(out_dir)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+# === QUERY TIME ===
+def merge_top_k(results, n_queries, top_k):
+    """Global top-k over per-shard (D, I) results, padded with (inf, -1) like a FAISS search."""
+    if not results:
+        return (np.full((n_queries, top_k), np.inf, dtype="float32"),
+                np.full((n_queries, top_k), -1, dtype="int64"))
+    D = np.hstack([d for d, _ in results])
+    I = np.hstack([i for _, i in results])
+    D = np.where(I >= 0, D, np.inf)
+    if D.shape[1] < top_k:
+        pad = top_k - D.shape[1]
+        D = np.hstack([D, np.full((n_queries, pad), np.inf, dtype="float32")])
+        I = np.hstack([I, np.full((n_queries, pad), -1, dtype="int64")])
+    order = np.argsort(D, axis=1, kind="stable")[:, :top_k]
+    return np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+
+
+class ShardedIndex:
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.shards = {}      # name -> (entry, faiss index); replaced wholesale on reload
+        self.lock = Lock()
+        self.manifest_mtime = None
+        self.last_check = 0.0
+        self.reload()
+
+    def reload(self):
+        """Load shards whose manifest version changed; unchanged shards keep their loaded index."""
+        path = _manifest_path(self.out_dir)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        with self.lock:
+            if mtime == self.manifest_mtime:
+                return False
+            manifest = read_manifest(self.out_dir)
+            shards = {}
+            for name, entry in manifest.items():
+                current = self.shards.get(name)
+                if current is not None and current[0]["version"] == entry["version"]:
+                    shards[name] = current
+                else:
+                    shards[name] = (entry, read_index_mmap(os.path.join(self.out_dir, SHARD_DIR, entry["file"])))
+            self.shards = shards
+            self.manifest_mtime = mtime
+        return True
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now - self.last_check >= RELOAD_CHECK_S:
+            self.last_check = now
+            self.reload()
+
+    @property
+    def domains(self):
+        return sorted({entry["domain"] for entry, _ in self.shards.values()})
+
+    def search(self, embeddings, top_k, domains=None, candidates=None, deadline_ms=SHARD_DEADLINE_MS):
+        """Fan the search out over the shards of `domains` (all when None) and merge the hits.
+
+        Returns (D, I, missed), `missed` naming the shards left out for searching longer
+        than `deadline_ms`. Each shard's clock starts when its search does, so time queued
+        behind other requests does not count; None waits for every shard (batch callers).
+        If no shard makes the deadline, the late ones are waited for rather than
+        returning nothing.
+        """
+        self.maybe_reload()
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        shards = [(name, index) for name, (entry, index) in self.shards.items()
+                  if index.ntotal and (domains is None or entry["domain"] in domains)]
+        params = None
+        if candidates is not None:
+            # One selector shared by every shard; FAISS only reads it
+            selector = faiss.IDSelectorBatch(np.fromiter(candidates, dtype="int64"))
+            params = faiss.SearchParameters(sel=selector)
+
+        started = {}
+
+        def search_shard(name, index):
+            started[name] = time.monotonic()
+            return index.search(embeddings, min(top_k, index.ntotal), params=params)
+
+        futures = {_pool.submit(search_shard, name, index): name for name, index in shards}
+        if deadline_ms is None:
+            done, late = wait(futures)[0], set()
+        else:
+            done, late, pending = set(), set(), set(futures)
+            while pending:
+                now = time.monotonic()
+                expiry = {f: started[futures[f]] + deadline_ms / 1000 for f in pending if futures[f] in started}
+                expired = {f for f, t in expiry.items() if t <= now and not f.done()}
+                late |= expired
+                pending -= expired
+                if not pending:
+                    break
+                # Shards still queued have no deadline yet; look again once one might have started
+                timeout = min(expiry.values(), default=now + deadline_ms / 1000) - now
+                finished, pending = wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+                done |= finished
+            if not done and late:
+                done, late = wait(late)[0], set()
+        for future in late:
+            SHARD_TIMEOUTS.inc(shard=futures[future])
+        results = [future.result() for future in done]
+        return (*merge_top_k(results, len(embeddings), top_k), sorted(futures[f] for f in late))
+
+
+def load_sharded_index(out_dir):
+    """Sharded view of the index in `out_dir`; None when no shards have been written."""
+    if not os.path.exists(_manifest_path(out_dir)):
+        return None
+    return ShardedIndex(out_dir)
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+import time
+import pandas as pd
+
+# Shared by the builders so the same scripts can run against another data tree
+# (e.g. a generated scale-test dataset) and against CSV/Parquet copies of the xlsx inputs.
+
+BASE_DIR_ENV = "HACKDASH_BASE_DIR"     # Overrides the hard-coded project folder
+STAGE_LOG_ENV = "HACKDASH_STAGE_LOG"   # JSONL file that receives per-stage build timings
+
+READERS = {
+    ".parquet": pd.read_parquet,
+    ".csv": pd.read_csv,
+    ".xlsx": pd.read_excel,
+}
+
+
+def base_dir(default):
+    return os.environ.get(BASE_DIR_ENV, default)
+
+
+def resolve_table(path):
+    """`path`, or the file with the same stem in another supported format; None if neither exists."""
+    stem, ext = os.path.splitext(path)
+    for candidate in [path] + [stem + other for other in READERS if other != ext]:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def read_table(path, **kwargs):
+    """Read `path`, or a file with the same stem in another supported format if it is missing."""
+    resolved = resolve_table(path)
+    if resolved is None:
+        raise FileNotFoundError(f"Neither {path} nor a {'/'.join(READERS)} copy of it exists")
+    return READERS[os.path.splitext(resolved)[1]](resolved, **kwargs)
+
+
+_last_lap = time.perf_counter()
+
+
+def lap(stage):
+    """Log the time since the previous lap (or import) as `stage`; a no-op unless the stage log is set."""
+    global _last_lap
+    now = time.perf_counter()
+    log_path = os.environ.get(STAGE_LOG_ENV)
+    if log_path:
+        record = {"script": os.path.basename(sys.argv[0]), "stage": stage, "seconds": now - _last_lap}
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    _last_lap = now
@@ -0,0 +1,138 @@
+import re
+import string
+from dataclasses import dataclass
+import pandas as pd
+from daily_store import from_day, last_day, to_day, window_total
+
+# Relative periods in a question ("last 7 days", "last quarter", "dormant for 18 months")
+# resolved against today's date and answered from the builders' daily prefix sums.
+
+# === CONFIG ===
+DORMANT_MONTHS = 24   # No login for this long makes an account dormant when the question gives no span
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+SPAN_RE = re.compile(
+    r"\b(?:last|past|previous|over|for|in|within)\s+(?:the\s+)?(?:last\s+|past\s+)?"
+    r"(\d+|" + "|".join(NUMBER_WORDS) + r")\s+(day|week|month|quarter|year)s?\b",
+    re.IGNORECASE,
+)
+CALENDAR_RE = re.compile(r"\b(this|last|previous|past)\s+(week|month|quarter|year)\b", re.IGNORECASE)
+DAY_RE = re.compile(r"\b(today|yesterday)\b", re.IGNORECASE)
+
+# Questions asking for a ranking, comparison or a statement-level measure are left to
+# the retrieved summaries; the daily totals only answer "how many / how much"
+SKIP_RE = re.compile(
+    r"\b(which|who|average|compare\w*|increase\w*|decrease\w*|trend|percent\w*|became|example|"
+    r"overdue|due|delinquen\w*|minimum)\b", re.IGNORECASE,
+)
+
+PERIOD_FREQ = {"week": "W-SUN", "month": "M", "quarter": "Q", "year": "Y"}
+UNIT_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+
+# Per domain, the first spec whose keywords all appear in the question wins (as in
+# chart_engine). The template's fields name the daily metrics it needs, plus the window
+# fields label/Label/span/start/end. "between" totals the window; "before" totals
+# everything ahead of it, e.g. accounts whose last login is older than the span.
+WINDOW_SPECS = {
+    "account": [
+        (("dormant",), "before", "{last_login:,.0f} accounts have had no login for over {span} (last login before {start}); these are dormant (inactive, unused) accounts."),
+        (("inactive",), "before", "{last_login:,.0f} accounts have had no login for over {span} (last login before {start}); these are dormant (inactive, unused) accounts."),
+        (("clos",), "between", "{Label}, {closed:,.0f} accounts were closed."),
+        (("open",), "between", "{Label}, {opened:,.0f} new accounts were opened."),
+    ],
+    "login": [
+        (("login", "fail"), "between", "{Label}, {login_failures:,.0f} of {logins:,.0f} logins failed."),
+        (("login",), "between", "{Label}, {logins:,.0f} logins were recorded and {login_failures:,.0f} of them failed."),
+    ],
+    "payment": [
+        (("payment",), "between", "{Label}, {payments:,.0f} payments (₹{payment_amount:,.2f}) were processed; {payment_failures:,.0f} failed."),
+    ],
+    "transaction": [
+        (("transaction",), "between", "{Label}, there were {transactions:,.0f} transactions totalling ₹{transaction_amount:,.2f}."),
+    ],
+}
+
+
+@dataclass(frozen=True)
+class Window:
+    start: int    # First day, inclusive (days since 1970-01-01)
+    end: int      # Last day, exclusive
+    label: str    # "in the last 7 days"
+    span: str     # "7 days"
+
+
+def _fmt(day):
+    return from_day(day).strftime("%d %b %Y")
+
+
+def _rolling(today, n, unit):
+    end = today + 1
+    if unit in UNIT_MONTHS:
+        start = to_day(from_day(end) - pd.DateOffset(months=n * UNIT_MONTHS[unit]))
+    else:
+        start = end - n * (7 if unit == "week" else 1)
+    span = f"{n} {unit}s" if n != 1 else f"a {unit}"
+    return Window(start, end, f"in the last {span if n != 1 else unit}", span)
+
+
+def parse_window(text, today=None):
+    """The relative period a question asks about, or None if it names none."""
+    today = to_day(pd.Timestamp.today() if today is None else today)
+    m = DAY_RE.search(text)
+    if m:
+        day = today if m.group(1).lower() == "today" else today - 1
+        return Window(day, day + 1, m.group(1).lower(), "a day")
+    m = SPAN_RE.search(text)
+    if m:
+        n = NUMBER_WORDS.get(m.group(1).lower()) or int(m.group(1))
+        return _rolling(today, n, m.group(2).lower())
+    m = CALENDAR_RE.search(text)
+    if m:
+        which, unit = m.group(1).lower(), m.group(2).lower()
+        if which == "past":
+            return _rolling(today, 1, unit)
+        period = pd.Period(from_day(today), freq=PERIOD_FREQ[unit])
+        if which == "this":
+            return Window(to_day(period.start_time), today + 1, f"this {unit} so far", f"a {unit}")
+        period -= 1
+        return Window(to_day(period.start_time), to_day(period.end_time) + 1, f"last {unit}", f"a {unit}")
+    return None
+
+
+def _fields(template):
+    return [name for _, name, _, _ in string.Formatter().parse(template) if name]
+
+
+def window_answer(question, domains, daily, today=None):
+    """Answer sentence for a relative-period question in one of `domains`, else None."""
+    if SKIP_RE.search(question):
+        return None
+    text = question.lower()
+    today = to_day(pd.Timestamp.today() if today is None else today)
+    window = parse_window(question, from_day(today))
+    for domain in domains:
+        metrics = daily.get(domain, {})
+        for keywords, kind, template in WINDOW_SPECS.get(domain, []):
+            if not all(k in text for k in keywords):
+                continue
+            if window is None and kind != "before":
+                continue
+            names = [f for f in _fields(template) if f not in ("label", "Label", "span", "start", "end")]
+            if not all(name in metrics for name in names):
+                continue
+            w = window or _rolling(today, DORMANT_MONTHS, "month")
+            if kind == "before":
+                values = {name: window_total(metrics[name], None, w.start) for name in names}
+            else:
+                values = {name: window_total(metrics[name], w.start, w.end) for name in names}
+            label = f"{w.label} ({_fmt(w.start)} to {_fmt(w.end - 1)})"
+            answer = template.format(label=label, Label=label[0].upper() + label[1:], span=w.span,
+                                     start=_fmt(w.start), end=_fmt(w.end - 1), **values)
+            data_end = max(last_day(metrics[name]) for name in names)
+            if kind == "between" and data_end < w.end - 1:
+                answer += f" Data is available up to {_fmt(data_end)}."
+            return answer
+    return None
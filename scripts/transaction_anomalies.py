@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# Per-account anomaly scoring for card transactions, computed with grouped cumulative
+# sums and one sorted-key search instead of per-row loops.
+#
+# Each transaction is compared with the same account's own history:
+#   - amount: z-score of log(amount) against the account's earlier transactions
+#   - frequency: transactions in the trailing 7 days vs. the account's usual weekly rate
+#   - new state: first purchase in a merchant state for an account with some history
+
+# === CONFIG ===
+MIN_HISTORY = 5            # Earlier transactions needed before an account has a baseline
+MIN_LOG_STD = 0.25         # Floor on the baseline spread so a few near-identical amounts don't explode z
+AMOUNT_Z_THRESHOLD = 3.0   # |z| of log amount that counts as unusual
+SPIKE_WINDOW_DAYS = 7
+SPIKE_MIN_COUNT = 4        # A burst needs at least this many transactions in the window...
+SPIKE_RATIO = 3.0          # ...and this many times the account's usual weekly rate
+MIN_BASELINE_DAYS = 30     # Floor on the span used for the weekly rate of young accounts
+
+
+SCORE_COLUMNS = ["amount_z", "txns_in_window", "spike_ratio", "amount_flag", "spike_flag", "new_state_flag", "score"]
+FLAG_COLUMNS = ["amount_flag", "spike_flag", "new_state_flag"]
+COUNT_COLUMNS = ["txns_in_window"]
+
+
+def _align(scored, index):
+    # Rows dropped as invalid come back as NaN; their flags must stay boolean (False) and
+    # their counts integers (nullable), or the summaries would read "5.0 transactions"
+    scored = scored.reindex(index)
+    scored[FLAG_COLUMNS] = scored[FLAG_COLUMNS].fillna(False).astype(bool)
+    scored[COUNT_COLUMNS] = scored[COUNT_COLUMNS].astype("Int32")
+    return scored
+
+
+def _id_text(ids):
+    """Ids as text, without the ".0" a float column (ids read next to blanks) would add."""
+    if pd.api.types.is_float_dtype(ids) and (ids.dropna() % 1 == 0).all():
+        return ids.astype("Int64").astype(str)
+    return ids.astype(str)
+
+
+def score_transactions(df, account_col, date_col="TRAN_DATE", amount_col="TRAN_AMT", state_col="MRCHNT_STATE_CD"):
+    """Score every transaction; returns a frame aligned to df.index with one column per signal."""
+    frame = pd.DataFrame({
+        "account": df[account_col].to_numpy(),
+        "day": pd.to_datetime(df[date_col], errors="coerce").dt.normalize(),
+        "log_amt": np.log1p(pd.to_numeric(df[amount_col], errors="coerce").clip(lower=0).to_numpy()),
+        "state": df[state_col].to_numpy() if state_col in df.columns else None,
+    }, index=df.index)
+    valid = frame["account"].notna() & frame["day"].notna() & frame["log_amt"].notna()
+    frame = frame[valid].sort_values(["account", "day"], kind="stable")
+    if frame.empty:
+        return _align(pd.DataFrame(columns=SCORE_COLUMNS), df.index)
+    group = frame.groupby("account", sort=False)
+
+    # Amount: mean/std of the account's earlier transactions from running sums
+    prior = group.cumcount().to_numpy()
+    x = frame["log_amt"].to_numpy()
+    s1 = group["log_amt"].cumsum().to_numpy() - x
+    s2 = (frame["log_amt"] ** 2).groupby(frame["account"], sort=False).cumsum().to_numpy() - x ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s1 / prior
+        var = (s2 - s1 * mean) / (prior - 1)
+        amount_z = (x - mean) / np.maximum(np.sqrt(np.maximum(var, 0.0)), MIN_LOG_STD)
+    amount_z = np.where(prior >= MIN_HISTORY, amount_z, 0.0)
+
+    # Frequency: (account, day) packed into one sortable int64 so a single searchsorted
+    # counts each row's trailing window without crossing into the next account
+    account_code = group.ngroup().to_numpy().astype("int64")
+    day_num = frame["day"].to_numpy().astype("datetime64[D]").astype("int64")
+    day_num -= day_num.min()
+    key = account_code * (1 << 32) + day_num
+    in_window = np.searchsorted(key, key, side="right") - np.searchsorted(key, key - (SPIKE_WINDOW_DAYS - 1), side="left")
+    days = pd.Series(day_num, index=frame.index).groupby(account_code)
+    span = np.maximum(days.transform("max").to_numpy() - days.transform("min").to_numpy() + 1, MIN_BASELINE_DAYS)
+    weekly_rate = days.transform("size").to_numpy() / span * SPIKE_WINDOW_DAYS
+    spike_ratio = in_window / weekly_rate
+
+    # Merchant state seen for the first time on this account
+    if frame["state"].notna().any():
+        new_state = (~frame.duplicated(["account", "state"])).to_numpy() & (prior >= MIN_HISTORY)
+    else:
+        new_state = np.zeros(len(frame), dtype=bool)
+
+    amount_flag = np.abs(amount_z) >= AMOUNT_Z_THRESHOLD
+    spike_flag = (in_window >= SPIKE_MIN_COUNT) & (spike_ratio >= SPIKE_RATIO)
+    score = np.maximum.reduce([
+        np.abs(amount_z) / AMOUNT_Z_THRESHOLD,
+        np.where(in_window >= SPIKE_MIN_COUNT, spike_ratio / SPIKE_RATIO, 0.0),
+        new_state * 1.0,
+    ])
+    scored = pd.DataFrame({
+        "amount_z": amount_z.astype("float32"),
+        "txns_in_window": in_window.astype("int32"),
+        "spike_ratio": spike_ratio.astype("float32"),
+        "amount_flag": amount_flag,
+        "spike_flag": spike_flag,
+        "new_state_flag": new_state,
+        "score": score.astype("float32"),
+    }, index=frame.index)
+    return _align(scored, df.index)
+
+
+def anomaly_table(df, scored, account_col, date_col="TRAN_DATE", amount_col="TRAN_AMT"):
+    """Compact table of flagged transactions only, highest score first."""
+    flagged = scored["amount_flag"] | scored["spike_flag"] | scored["new_state_flag"]
+    keep = [c for c in ("MRCHNT_DBA_NM", "MRCHNT_CITY_NM", "MRCHNT_STATE_CD") if c in df.columns]
+    table = pd.concat([
+        df.loc[flagged, [account_col, date_col, amount_col] + keep].rename(columns={account_col: "ACCNT_ID"}),
+        scored.loc[flagged],
+    ], axis=1)
+    for col in keep:
+        table[col] = table[col].astype("category")
+    return table.sort_values("score", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def anomaly_summaries(table, limit):
+    """Indexed sentences for the top `limit` anomalies, formatted column-wise."""
+    top = table.head(limit)
+    if top.empty:
+        return []
+    reasons = pd.Series("", index=top.index)
+    reasons = reasons.where(~top["amount_flag"], reasons + "amount " + top["amount_z"].map("{:+.1f}".format) + "σ from the account's usual spend; ")
+    reasons = reasons.where(~top["spike_flag"], reasons + top["txns_in_window"].astype(str) + " transactions within 7 days ("
+                            + top["spike_ratio"].map("{:.1f}".format) + "× the usual rate); ")
+    if "MRCHNT_STATE_CD" in top.columns:
+        reasons = reasons.where(~top["new_state_flag"], reasons + "first purchase in state " + top["MRCHNT_STATE_CD"].astype(str) + "; ")
+    merchant = (" at " + top["MRCHNT_DBA_NM"].astype(str)) if "MRCHNT_DBA_NM" in top.columns else ""
+    text = (
+        "Unusual transaction for account " + _id_text(top["ACCNT_ID"]) + ": ₹"
+        + top["TRAN_AMT"].map("{:,.2f}".format) + merchant + " on "
+        + pd.to_datetime(top["TRAN_DATE"]).dt.strftime("%d-%b-%Y") + " — " + reasons.str.rstrip("; ") + "."
+    )
+    return text.tolist()
@@ -0,0 +1,94 @@
+import os
+import pickle
+import pandas as pd
+import faiss
+from encoding_pool import encode_summaries
+from lexical_index import build_lexical_index
+from domain_router import build_domain_router, load_domains, save_domains
+from mmap_store import write_index_atomic
+from table_io import base_dir, lap
+from account_view import read_view
+
+# === Paths ===
+BASE_PATH = base_dir("F:/Projects/AIModel/demo")
+INDEX_PATH = os.path.join(BASE_PATH, "faiss_index", "account_index.faiss")
+META_PATH = os.path.join(BASE_PATH, "faiss_index", "account_metadata.pkl")
+LEXICAL_PATH = os.path.join(BASE_PATH, "faiss_index", "account_bm25.pkl")
+DOMAIN_PATH = os.path.join(BASE_PATH, "faiss_index", "account_domains.pkl")
+
+# === CONFIG ===
+MAX_PROFILE_SUMMARIES = 50   # Per-account profiles for the highest-spending accounts...
+MAX_RISK_SUMMARIES = 25      # ...and for the accounts with the most failed payments
+
+# === Load the per-account rollups (one row per ACCNT_ID, every domain already joined) ===
+accounts = read_view(BASE_PATH, "accounts")
+accounts[["PAYMENT_AMT", "TXN_AMT"]] = accounts[["PAYMENT_AMT", "TXN_AMT"]].fillna(0.0)
+lap("load")
+
+active = accounts["ACCNT_STATUS_DESC"] == "Valid Operating Account"
+logged_in = accounts["LOGIN_COUNT"] > 0
+paid = accounts["PAYMENT_COUNT"] > 0
+transacted = accounts["TXN_COUNT"] > 0
+failed_payments = accounts["PAYMENT_FAILURES"] > 0
+failed_logins = accounts["LOGIN_FAILURES"] > 0
+fraud = accounts["TXN_FRAUD_COUNT"] > 0
+
+# === Cross-Domain Summaries ===
+summaries = [
+    f"Of {active.sum():,} active accounts, {(active & logged_in & paid & transacted).sum():,} had logins, payments and card "
+    f"transactions on record; {(active & transacted & ~paid).sum():,} transacted without making a payment, and "
+    f"{(active & ~logged_in & ~paid & ~transacted).sum():,} had no login, payment or transaction at all (cross-domain activity).",
+
+    f"{failed_payments.sum():,} accounts had failed payments; {(failed_payments & failed_logins).sum():,} of them also had failed "
+    f"logins and {(failed_payments & fraud).sum():,} had fraud-flagged transactions (accounts at risk across domains).",
+]
+if "TOT_PAST_DUE_AMT" in accounts.columns:
+    past_due = accounts["TOT_PAST_DUE_AMT"] > 0
+    overdue = accounts[past_due]
+    top_category = overdue["TOP_TXN_CATEGORY"].mode()
+    summaries.append(
+        f"{past_due.sum():,} accounts are past due (₹{overdue['TOT_PAST_DUE_AMT'].sum():,.2f} overdue in total); "
+        f"{(past_due & transacted).sum():,} of them still made {overdue['TXN_COUNT'].sum():,} card transactions worth "
+        f"₹{overdue['TXN_AMT'].sum():,.2f}"
+        + (f", most often in '{top_category.iloc[0]}'." if len(top_category) else ".")
+    )
+
+# === Per-Account Profiles ===
+profiled = accounts[transacted].nlargest(MAX_PROFILE_SUMMARIES, "TXN_AMT")
+risky = accounts[failed_payments].nlargest(MAX_RISK_SUMMARIES, ["PAYMENT_FAILURES", "LOGIN_FAILURES"])
+profiled = pd.concat([profiled, risky[~risky["ACCNT_ID"].isin(profiled["ACCNT_ID"])]])
+for row in profiled.itertuples():
+    s = (
+        f"Account {row.ACCNT_ID} ({row.ACCNT_STATUS_DESC}): {row.LOGIN_COUNT} logins ({row.LOGIN_FAILURES} failed), "
+        f"{row.PAYMENT_COUNT} payments totaling ₹{row.PAYMENT_AMT:,.2f} ({row.PAYMENT_FAILURES} failed), "
+        f"{row.TXN_COUNT} card transactions totaling ₹{row.TXN_AMT:,.2f} ({row.TXN_FRAUD_COUNT} fraud-flagged"
+        + (f", mostly '{row.TOP_TXN_CATEGORY}'" if isinstance(row.TOP_TXN_CATEGORY, str) else "") + ")"
+    )
+    if row.STMT_COUNT and pd.notna(row.LAST_BAL_CURR_AMT):
+        s += f"; last statement balance ₹{row.LAST_BAL_CURR_AMT:,.2f}, minimum due ₹{row.LAST_PAYMT_MIN_STMT_AMT:,.2f}"
+    summaries.append(s + ".")
+lap("summaries")
+
+# === Load Existing Index ===
+with open(META_PATH, "rb") as f:
+    metadata = pickle.load(f)
+domains = load_domains(DOMAIN_PATH, len(metadata))
+index = faiss.read_index(INDEX_PATH)
+
+# === Embed and Add ===
+embeddings = encode_summaries(summaries)
+lap("embed")
+index.add(embeddings)
+metadata.extend(summaries)
+domains.extend(["account"] * len(summaries))
+
+# === Save Back ===
+write_index_atomic(index, INDEX_PATH)
+with open(META_PATH, "wb") as f:
+    pickle.dump(metadata, f)
+build_lexical_index(metadata, LEXICAL_PATH)
+save_domains(domains, DOMAIN_PATH)
+build_domain_router(index, domains, os.path.dirname(INDEX_PATH), rebuild_domains=["account"])
+lap("index")
+
+print(f"✅ Updated unified FAISS index with {len(summaries)} cross-domain ACCOUNT summaries.")
@@ -1,20 +1,35 @@
 import os
-import pandas as pd
 import pickle
-from sentence_transformers import SentenceTransformer
+from encoding_pool import encode_summaries
+from lexical_index import build_lexical_index
+from domain_router import build_domain_router, load_domains, save_domains
+from mmap_store import write_index_atomic
+from table_io import base_dir, lap
+from account_view import read_view
+from aggregate_store import distribution_table, monthly_table, publish_aggregates
+from daily_store import DAILY_FILE, daily_metric, publish_daily
+from login_sessions import (BURST_FAILURES, BURST_WINDOW, DAY_BURST_WINDOW, channel_hourly, day_granular,
+                            login_events, party_summary, score_events)
 import faiss
-from collections import defaultdict
 from datetime import datetime
 
 # === Paths ===
-BASE_PATH = "F:/Projects/AIModel/demo"
-LOGIN_CSV = os.path.join(BASE_PATH, "data", "Main_Tables", "customer-login", "customer_login.csv")
+BASE_PATH = base_dir("F:/Projects/AIModel/demo")
 INDEX_PATH = os.path.join(BASE_PATH, "faiss_index", "account_index.faiss")
 META_PATH = os.path.join(BASE_PATH, "faiss_index", "account_metadata.pkl")
+LEXICAL_PATH = os.path.join(BASE_PATH, "faiss_index", "account_bm25.pkl")
+DOMAIN_PATH = os.path.join(BASE_PATH, "faiss_index", "account_domains.pkl")
+AGGREGATE_PATH = os.path.join(BASE_PATH, "faiss_index", "aggregates.pkl")
+DAILY_PATH = os.path.join(BASE_PATH, "faiss_index", DAILY_FILE)
+LOGIN_ANALYTICS_PATH = os.path.join(BASE_PATH, "faiss_index", "login_analytics.pkl")
 
-# === Load Data ===
-df = pd.read_csv(LOGIN_CSV)
-df["LAST_LOGIN_TS"] = pd.to_datetime(df["LAST_LOGIN_TS"], errors="coerce")
+# === CONFIG ===
+MAX_PARTY_SUMMARIES = 25   # Per-user summaries for the longest failure streaks
+MAX_SPIKE_SUMMARIES = 50   # Per-hour (or per-day) summaries for channel failure spikes and lockout storms
+
+# === Load Data (LAST_LOGIN_TS already parsed in the account view) ===
+df = read_view(BASE_PATH, "logins")
+lap("load")
 df = df.dropna(subset=["LAST_LOGIN_TS"])
 
 # === Status Code Mapping ===
@@ -33,6 +48,7 @@ df["YEAR"] = df["LAST_LOGIN_TS"].dt.year
 df["MONTH_NAME"] = df["LAST_LOGIN_TS"].dt.strftime('%B')
 df["YEAR_MONTH"] = df["LAST_LOGIN_TS"].dt.strftime('%B %Y')
 df["IS_FAILURE"] = df["LOGIN_STATUS_CD_ID"].isin([3, 4])
+df["STATUS_DESC"] = df["LOGIN_STATUS_CD_ID"].map(status_map).fillna("Status " + df["LOGIN_STATUS_CD_ID"].astype(str))
 
 total_logins = len(df)
 successful_logins = len(df[~df["IS_FAILURE"]])
@@ -44,14 +60,32 @@ success_rate = (successful_logins / total_logins) * 100
 channel_summary = df["SRVCG_CHNL_CD"].value_counts().to_dict()
 
 # === Monthly Login Status ===
-monthly_status_breakdown = defaultdict(lambda: defaultdict(int))
-for _, row in df.iterrows():
-    ym = row["YEAR_MONTH"]
-    status = status_map.get(row["LOGIN_STATUS_CD_ID"], f"Status {row['LOGIN_STATUS_CD_ID']}")
-    monthly_status_breakdown[ym][status] += 1
+monthly_status_breakdown = df.groupby(["YEAR_MONTH", "STATUS_DESC"]).size()
+
+# === Sessions, Failure Streaks and Bursts ===
+# Date-only timestamps: bursts and spikes are counted per day, and sessions (which need
+# times of day to split) are not summarised
+by_day = day_granular(df["LAST_LOGIN_TS"])
+events = score_events(login_events(df), DAY_BURST_WINDOW if by_day else BURST_WINDOW)
+parties = party_summary(events)
+hourly = channel_hourly(events, "D" if by_day else "h")
+with open(LOGIN_ANALYTICS_PATH + ".tmp", "wb") as f:
+    pickle.dump({"parties": parties, "hourly": hourly}, f)
+os.replace(LOGIN_ANALYTICS_PATH + ".tmp", LOGIN_ANALYTICS_PATH)
+lap("sessions")
 
-# === SentenceTransformer ===
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# === Chart Aggregates ===
+publish_aggregates(AGGREGATE_PATH, "login", {
+    "monthly_status": monthly_table(df, "LAST_LOGIN_TS", "STATUS_DESC"),
+    "monthly_channel": monthly_table(df, "LAST_LOGIN_TS", "SRVCG_CHNL_CD"),
+    "channel_distribution": distribution_table(df["SRVCG_CHNL_CD"]),
+    "monthly_bursts": monthly_table(events[events["BURST_START"]], "LAST_LOGIN_TS", "CHANNEL"),
+    "monthly_channel_failure_rate": (monthly_table(events, "LAST_LOGIN_TS", "CHANNEL", "IS_FAILURE", "mean") * 100).round(2),
+})
+publish_daily(DAILY_PATH, "login", {
+    "logins": daily_metric(df["LAST_LOGIN_TS"]),
+    "login_failures": daily_metric(df["LAST_LOGIN_TS"], df["IS_FAILURE"]),
+})
 
 # === Prepare Summaries ===
 summaries = []
@@ -61,23 +95,65 @@ summaries.append(f"{len(df.groupby('PARTY_ID')):,} unique users logged in during
 chan_summary = ", ".join([f"{k}: {v}" for k, v in channel_summary.items()])
 summaries.append(f"Login channel distribution — {chan_summary}.")
 
-for month, statuses in sorted(monthly_status_breakdown.items()):
-    status_text = ", ".join([f"{k}: {v}" for k, v in sorted(statuses.items())])
+for month, statuses in monthly_status_breakdown.groupby(level="YEAR_MONTH"):
+    status_text = ", ".join([f"{k}: {v}" for (_, k), v in statuses.items()])
     summaries.append(f"In {month}, login status distribution — {status_text}.")
 
+window_text = "the same day" if by_day else f"{BURST_WINDOW.total_seconds() / 60:.0f} minutes"
+period_text = "day" if by_day else "hour"
+if not by_day:
+    summaries.append(f"{events['SESSION_ID'].nunique():,} login sessions were recorded across {len(parties):,} users, "
+                     f"{parties['LOGINS'].sum() / max(len(parties), 1):.1f} attempts per user on average.")
+bursts = events[events["BURST_START"]]
+for month, g in bursts.groupby(bursts["LAST_LOGIN_TS"].dt.to_period("M")):
+    channels = ", ".join(f"{k}: {v}" for k, v in g["CHANNEL"].value_counts().items())
+    summaries.append(
+        f"In {month.strftime('%B %Y')}, {len(g):,} bursts of {BURST_FAILURES}+ Invalid Password (wrong password) failures within "
+        f"{window_text} were detected for {g['PARTY_ID'].nunique():,} users — by channel {channels}."
+    )
+for row in parties.nlargest(MAX_PARTY_SUMMARIES, ["LONGEST_FAILURE_STREAK", "FAILURES"]).itertuples():
+    summaries.append(
+        f"User {row.PARTY_ID} had {row.LONGEST_FAILURE_STREAK} failed logins in a row and {row.FAILURES} of "
+        f"{row.LOGINS} attempts failed ({row.INVALID_PASSWORDS} Invalid Password, {row.LOCKOUTS} locked); "
+        f"most Invalid Password attempts within {window_text}: {row.MAX_WINDOW_FAILURES}."
+    )
+spikes = hourly[hourly["FAILURE_SPIKE"]].nlargest(MAX_SPIKE_SUMMARIES, "FAILURES")
+for row in spikes.itertuples():
+    when = f"{row.PERIOD:%d %b %Y}" if by_day else f"{row.PERIOD:%d %b %Y at %H:%M}"
+    summaries.append(
+        f"On {when}, {row.CHANNEL} login failures spiked to {row.FAILURE_RATE:.0%} "
+        f"({row.FAILURES} of {row.LOGINS} attempts) against a usual {row.USUAL_RATE:.0%} for that channel."
+    )
+storms = hourly[hourly["LOCKOUT_STORM"]].nlargest(MAX_SPIKE_SUMMARIES, "LOCKOUTS")
+for row in storms.itertuples():
+    when = f"{row.PERIOD:%d %b %Y}" if by_day else f"{row.PERIOD:%d %b %Y at %H:%M}"
+    summaries.append(
+        f"Lockout storm on {when}: {row.LOCKOUTS} {row.CHANNEL} logins were locked due to fraud, "
+        f"against a usual {row.USUAL_LOCKOUTS:.1f} per {period_text}."
+    )
+
+lap("summaries")
+
 # === Load Existing Index ===
 with open(META_PATH, "rb") as f:
     metadata = pickle.load(f)
+domains = load_domains(DOMAIN_PATH, len(metadata))
 index = faiss.read_index(INDEX_PATH)
 
 # === Embed and Add ===
-embeddings = model.encode(summaries)
+embeddings = encode_summaries(summaries)
+lap("embed")
 index.add(embeddings)
 metadata.extend(summaries)
+domains.extend(["login"] * len(summaries))
 
 # === Save Back ===
-faiss.write_index(index, INDEX_PATH)
+write_index_atomic(index, INDEX_PATH)
 with open(META_PATH, "wb") as f:
     pickle.dump(metadata, f)
+build_lexical_index(metadata, LEXICAL_PATH)
+save_domains(domains, DOMAIN_PATH)
+build_domain_router(index, domains, os.path.dirname(INDEX_PATH), rebuild_domains=["login"])
+lap("index")
 
 print("✅ Updated unified FAISS index with enhanced customer-login summaries.")
@@ -0,0 +1,59 @@
+import os
+import pickle
+import faiss
+from encoding_pool import encode_summaries
+from lexical_index import build_lexical_index
+from domain_router import build_domain_router, load_domains, save_domains
+from mmap_store import write_index_atomic
+from table_io import base_dir, lap
+from aggregate_store import load_aggregates, publish_aggregates
+from forecasting import forecast_next, forecast_summary, monthly_series
+
+# === Paths ===
+BASE_PATH = base_dir("F:/Projects/AIModel/demo")
+INDEX_PATH = os.path.join(BASE_PATH, "faiss_index", "account_index.faiss")
+META_PATH = os.path.join(BASE_PATH, "faiss_index", "account_metadata.pkl")
+LEXICAL_PATH = os.path.join(BASE_PATH, "faiss_index", "account_bm25.pkl")
+DOMAIN_PATH = os.path.join(BASE_PATH, "faiss_index", "account_domains.pkl")
+AGGREGATE_PATH = os.path.join(BASE_PATH, "faiss_index", "aggregates.pkl")
+
+# === Load the monthly tables the other builders published ===
+tables = {d: t for d, t in load_aggregates(AGGREGATE_PATH)["tables"].items() if d != "forecast"}
+labels, months, Y = monthly_series(tables)
+lap("load")
+
+# === Fit every series at once ===
+forecasts = forecast_next(labels, months, Y)
+print(f"📈 Forecast {len(forecasts):,} of {len(labels):,} monthly series")
+publish_aggregates(AGGREGATE_PATH, "forecast", {"next_month": forecasts.drop(columns="integral")})
+lap("model")
+
+summaries = [forecast_summary(row) for _, row in forecasts.iterrows()]
+lap("summaries")
+if not summaries:
+    print("ℹ️ No monthly series has enough history to forecast yet.")
+    raise SystemExit(0)
+
+# === Load Existing Index ===
+with open(META_PATH, "rb") as f:
+    metadata = pickle.load(f)
+domains = load_domains(DOMAIN_PATH, len(metadata))
+index = faiss.read_index(INDEX_PATH)
+
+# === Embed and Add ===
+embeddings = encode_summaries(summaries)
+lap("embed")
+index.add(embeddings)
+metadata.extend(summaries)
+domains.extend(["forecast"] * len(summaries))
+
+# === Save Back ===
+write_index_atomic(index, INDEX_PATH)
+with open(META_PATH, "wb") as f:
+    pickle.dump(metadata, f)
+build_lexical_index(metadata, LEXICAL_PATH)
+save_domains(domains, DOMAIN_PATH)
+build_domain_router(index, domains, os.path.dirname(INDEX_PATH), rebuild_domains=["forecast"])
+lap("index")
+
+print("✅ Updated unified FAISS index with next-month forecasts.")
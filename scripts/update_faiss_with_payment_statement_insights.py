@@ -3,38 +3,43 @@ import pandas as pd
 import faiss
 import pickle
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from encoding_pool import encode_summaries
+from lexical_index import build_lexical_index
+from domain_router import build_domain_router, load_domains, save_domains
+from mmap_store import write_index_atomic
+from table_io import base_dir, lap
+from account_view import read_view
+from aggregate_store import publish_aggregates
+from delinquency import (MIN_CYCLES, STATE_LABELS, STATES, UNDERPAY_SHARE, account_states, score_cycles,
+                         statement_cycles, transition_counts)
 from datetime import datetime
 
 # === Paths ===
-BASE_PATH = "F:/Projects/AIModel/demo"
-PAYMENT_CSV = os.path.join(BASE_PATH, "data", "Main_Tables", "payment", "Internal-payment", "payment_movement_5000_full_records.xlsx")
-STATEMENT_XLSX = os.path.join(BASE_PATH, "data", "Main_Tables", "payment", "stmt_dtl_updated_consistent_dates.xlsx")
-ACCT_XLSX = os.path.join(BASE_PATH, "data", "Main_Tables", "payment", "accnt_dtl_mapped_from_stmt_fixed.xlsx")
+BASE_PATH = base_dir("F:/Projects/AIModel/demo")
 INDEX_PATH = os.path.join(BASE_PATH, "faiss_index", "account_index.faiss")
 META_PATH = os.path.join(BASE_PATH, "faiss_index", "account_metadata.pkl")
+LEXICAL_PATH = os.path.join(BASE_PATH, "faiss_index", "account_bm25.pkl")
+DOMAIN_PATH = os.path.join(BASE_PATH, "faiss_index", "account_domains.pkl")
+AGGREGATE_PATH = os.path.join(BASE_PATH, "faiss_index", "aggregates.pkl")
+DELINQUENCY_PATH = os.path.join(BASE_PATH, "faiss_index", "delinquency.pkl")
 
-def month_name_format(date):
-    try:
-        dt = pd.to_datetime(date, dayfirst=True)
-        return dt.strftime("%B %Y")
-    except Exception:
-        return "Unknown"
+# === CONFIG ===
+MAX_EXAMPLE_ACCOUNTS = 10     # Account IDs named in a "recovered" summary
+MAX_UNDERPAYER_SUMMARIES = 50  # Per-account summaries for the most regular underpayers
 
-# 1. Load data
-payments = pd.read_excel(PAYMENT_CSV)
-statements = pd.read_excel(STATEMENT_XLSX)
-accts = pd.read_excel(ACCT_XLSX)
+# 1. Load data (from the account view; statement dates already parsed)
+payments = read_view(BASE_PATH, "payments")
+statements = read_view(BASE_PATH, "statements")
+accts = read_view(BASE_PATH, "accnt_dtl")
+lap("load")
 
 # 2. Standardize and merge keys
 payments["CIFDB_ACCT_ID"] = payments["ACCNT_ID"]
 # statements and accts already have CIFDB_ACCT_ID
-statements["STMT_MONTH"] = statements["STMT_CLOS_DT"].apply(month_name_format)
-payments["MONTH"] = payments["TRANS_TS"].apply(month_name_format)
+statements["STMT_MONTH"] = statements["STMT_CLOS_DT"].dt.strftime("%B %Y").fillna("Unknown")
 
 # 3. Merge for cross-domain analysis
 # payments + statements (join on account + closest previous statement by date)
-statements["STMT_CLOS_DT"] = pd.to_datetime(statements["STMT_CLOS_DT"], errors="coerce")
 payments["TRANS_TS"] = pd.to_datetime(payments["TRANS_TS"], errors="coerce")
 merged = pd.merge(payments, statements, on="CIFDB_ACCT_ID", suffixes=('', '_STMT'))
 
@@ -46,6 +51,7 @@ merged = merged.groupby(["ACCNT_ID", "TRANS_TS"]).tail(1)
 
 # Now join with account detail (accnt_dtl_mapped_from_stmt_fixed.xlsx)
 merged = pd.merge(merged, accts, on="CIFDB_ACCT_ID", suffixes=('', '_ACCT'))
+lap("merge")
 
 summaries = []
 # --- 1. Overdue insights ---
@@ -90,7 +96,75 @@ for month, g in failed_to_pay.groupby("STMT_MONTH"):
         f"In {month}, {len(g['ACCNT_ID'].unique())} accounts were charged off after failing to pay their minimum due."
     )
 
-# --- 7. Example phrases / synonyms for search variety ---
+# --- 7. Cycle-over-cycle delinquency states (one pass over every account's statements) ---
+cycles = score_cycles(statement_cycles(statements, payments, accts))
+transitions = transition_counts(cycles)
+account_summary = account_states(cycles)
+lap("states")
+
+recovered = cycles[cycles["STATE"] == "recovered"]
+for quarter, g in recovered.groupby(recovered["STMT_CLOS_DT"].dt.to_period("Q")):
+    recovered_accts = g["ACCNT_ID"].unique()
+    examples = ", ".join(map(str, recovered_accts[:MAX_EXAMPLE_ACCOUNTS]))
+    summaries.append(
+        f"In {quarter.strftime('Q%q %Y')}, {len(recovered_accts)} accounts recovered from overdue "
+        f"(paid the minimum due on time after missing it), for example accounts {examples}."
+    )
+
+missed_in_year = cycles["MISSED"].groupby([cycles["STMT_CLOS_DT"].dt.year.rename("year"), cycles["ACCNT_ID"]]).any()
+for year, missed in missed_in_year.groupby(level="year"):
+    summaries.append(f"In {year}, {(~missed).sum()} of {len(missed)} accounts paid on time every statement cycle.")
+
+underpayers = account_summary[account_summary["REGULAR_UNDERPAYER"]].sort_values(
+    ["UNDERPAY_SHARE", "UNDERPAID_CYCLES"], ascending=False)
+summaries.append(
+    f"{len(underpayers)} accounts regularly pay less than the minimum due "
+    f"(in at least {UNDERPAY_SHARE:.0%} of their statement cycles, over {MIN_CYCLES} or more cycles)."
+)
+for row in underpayers.head(MAX_UNDERPAYER_SUMMARIES).itertuples():
+    summaries.append(
+        f"Account {row.ACCNT_ID} paid less than the minimum due in {row.UNDERPAID_CYCLES} of {row.CYCLES} statement cycles."
+    )
+
+for month, counts in transitions.iterrows():
+    moves = counts[counts > 0].sort_values(ascending=False)
+    moves = "; ".join(f"{n} from {label.replace(' → ', ' to ')}" for label, n in moves.items())
+    summaries.append(f"In {month.strftime('%B %Y')}, accounts changed delinquency state: {moves}.")
+
+# Persisted for lookups by account; the aggregates below feed the charts
+with open(DELINQUENCY_PATH + ".tmp", "wb") as f:
+    pickle.dump({
+        "cycles": cycles[["ACCNT_ID", "STMT_CLOS_DT", "MIN_DUE", "PAID", "PAID_ON_TIME",
+                          "MISSED_STREAK", "ON_TIME_STREAK", "STATE"]],
+        "accounts": account_summary,
+        "transitions": transitions,
+    }, f)
+os.replace(DELINQUENCY_PATH + ".tmp", DELINQUENCY_PATH)
+
+# --- Chart Aggregates ---
+stmt_period = merged["STMT_CLOS_DT"].dt.to_period("M").rename("month")
+is_overdue = merged["TOT_PAST_DUE_AMT"] > 0
+monthly_overdue = pd.DataFrame({
+    "Overdue accounts": merged["ACCNT_ID"].where(is_overdue).groupby(stmt_period).nunique(),
+    "Paid overdue in full": merged["ACCNT_ID"].where(is_overdue & (merged["AMT"] >= merged["TOT_PAST_DUE_AMT"])).groupby(stmt_period).nunique(),
+    "No overdue": merged["ACCNT_ID"].where(~is_overdue).groupby(stmt_period).nunique(),
+}).fillna(0).sort_index()
+covered = merged["AMT"] >= merged["PAYMT_MIN_STMT_AMT"]
+monthly_min_due = pd.DataFrame({
+    "Covered minimum due": covered.groupby(stmt_period).sum(),
+    "Missed minimum due": (~covered).groupby(stmt_period).sum(),
+}).sort_index()
+cycle_period = cycles["STMT_CLOS_DT"].dt.to_period("M").rename("month")
+monthly_states = cycles.groupby([cycle_period, "STATE"], observed=False).size().unstack(fill_value=0).sort_index()
+monthly_states.columns = [STATE_LABELS[s].capitalize() for s in STATES]
+publish_aggregates(AGGREGATE_PATH, "payment_statement", {
+    "monthly_overdue": monthly_overdue,
+    "monthly_min_due": monthly_min_due,
+    "monthly_states": monthly_states,
+    "monthly_transitions": transitions,
+})
+
+# --- 8. Example phrases / synonyms for search variety ---
 for i, row in merged.sample(min(25, len(merged)), random_state=42).iterrows():
     s = (
         f"On {row['TRANS_TS'].strftime('%d %b %Y')}, account {row['ACCNT_ID']} paid ₹{row['AMT']:.2f} "
@@ -108,19 +182,27 @@ for i, row in merged.sample(min(25, len(merged)), random_state=42).iterrows():
         f"Account {row['ACCNT_ID']} paid on {row['TRANS_TS'].strftime('%d-%m-%Y')}. Was overdue: {row.get('TOT_PAST_DUE_AMT', 0) > 0}, Paid at least min due: {row['AMT'] >= row['PAYMT_MIN_STMT_AMT']}."
     )
 
+lap("summaries")
+
 # === FAISS Append ===
-model = SentenceTransformer("all-MiniLM-L6-v2")
-embeddings = model.encode(summaries, show_progress_bar=True)
+embeddings = encode_summaries(summaries)
+lap("embed")
 
 index = faiss.read_index(INDEX_PATH)
 with open(META_PATH, "rb") as f:
     metadata = pickle.load(f)
+domains = load_domains(DOMAIN_PATH, len(metadata))
 
 index.add(np.array(embeddings).astype("float32"))
 metadata.extend(summaries)
+domains.extend(["payment_statement"] * len(summaries))
 
-faiss.write_index(index, INDEX_PATH)
+write_index_atomic(index, INDEX_PATH)
 with open(META_PATH, "wb") as f:
     pickle.dump(metadata, f)
+build_lexical_index(metadata, LEXICAL_PATH)
+save_domains(domains, DOMAIN_PATH)
+build_domain_router(index, domains, os.path.dirname(INDEX_PATH), rebuild_domains=["payment_statement"])
+lap("index")
 
 print(f"✅ FAISS index updated with {len(summaries)} payment+statement+account insights.")
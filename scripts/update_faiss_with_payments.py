@@ -2,45 +2,28 @@ import os
 import pandas as pd
 import faiss
 import pickle
-from sentence_transformers import SentenceTransformer
+from encoding_pool import encode_summaries
+from lexical_index import build_lexical_index
+from domain_router import build_domain_router, load_domains, save_domains
+from mmap_store import write_index_atomic
+from table_io import base_dir, lap
+from account_view import read_view
 import numpy as np
 from datetime import datetime
 
 # === Paths ===
-BASE_PATH = "F:/Projects/AIModel/demo"
-PAYMENT_CSV = os.path.join(BASE_PATH, "data", "Main_Tables", "payment", "Internal-payment", "payment_movement_5000_full_records.xlsx")
-STATUS_CD = os.path.join(BASE_PATH, "data", "Supporting_Tables", "payment", "Internal-payment", "money_mvmnt_status_cd.xlsx")
-STATUS_REASON = os.path.join(BASE_PATH, "data", "Supporting_Tables", "payment", "Internal-payment", "money_mvmnt_status_reason_full.csv")
-SUBSC_OPTN = os.path.join(BASE_PATH, "data", "Supporting_Tables", "payment", "Internal-payment", "money_mvmnt_subsc_optn_cd.xlsx")
-TYPE_CD = os.path.join(BASE_PATH, "data", "Supporting_Tables", "payment", "Internal-payment", "money_mvmnt_type.xlsx")
+BASE_PATH = base_dir("F:/Projects/AIModel/demo")
 INDEX_PATH = os.path.join(BASE_PATH, "faiss_index", "account_index.faiss")
 META_PATH = os.path.join(BASE_PATH, "faiss_index", "account_metadata.pkl")
+LEXICAL_PATH = os.path.join(BASE_PATH, "faiss_index", "account_bm25.pkl")
+DOMAIN_PATH = os.path.join(BASE_PATH, "faiss_index", "account_domains.pkl")
 
-def month_name_format(date):
-    try:
-        dt = pd.to_datetime(date, dayfirst=True)
-        return dt.strftime("%B %Y")
-    except Exception:
-        return "Unknown"
-
-def load_mapping(df, key_col, val_col):
-    df = df[[key_col, val_col]].dropna()
-    return dict(zip(df[key_col], df[val_col]))
-
-# Load mapping files
-status_map = load_mapping(pd.read_excel(STATUS_CD), "MONEY_MVMNT_STATUS_CD_ID", "MONEY_MVMNT_STATUS_DESC")
-reason_map = load_mapping(pd.read_csv(STATUS_REASON), "MNY_MVMNT_STATUS_REASON_CD_ID", "MNY_MVMNT_STATUS_REASON_DESC")
-subsc_map = load_mapping(pd.read_excel(SUBSC_OPTN), "MONEY_MVMNT_SUBSC_OPTN_CD_ID", "MONEY_MVMNT_SUBSC_OPTN_DESC")
-type_map = load_mapping(pd.read_excel(TYPE_CD), "MONEY_MVMNT_TYPE_ID", "MONEY_MVMNT_TYPE_DESC")
-
-# Load and map payments data
-df = pd.read_excel(PAYMENT_CSV)
+# === Load Payment Data (codes already decoded in the account view) ===
+df = read_view(BASE_PATH, "payments")
 df = df[df["AMT"].notna()]
-df["STATUS_DESC"] = df["MONEY_MVMNT_STATUS_CD_ID"].map(status_map)
-df["REASON_DESC"] = df["MNY_MVMNT_STATUS_REASON_CD_ID"].map(reason_map)
-df["SUBSC_OPTN_DESC"] = df["MONEY_MVMNT_SUBSC_OPTN_CD_ID"].map(subsc_map)
-df["TYPE_DESC"] = df["MVMNT_TYPE_CD_ID"].map(type_map)
-df["MONTH"] = df["TRANS_TS"].apply(month_name_format)
+df["MONTH"] = df["DATE"].dt.strftime("%B %Y").fillna("Unknown")
+
+lap("load")
 
 summaries = []
 
@@ -84,19 +67,27 @@ for i, row in df.sample(min(25, len(df))).iterrows():
         + (f" failed due to '{row['REASON_DESC']}'." if pd.notna(row['REASON_DESC']) and "fail" in str(row['STATUS_DESC']).lower() else "")
     )
 
+lap("summaries")
+
 # Append to FAISS
-model = SentenceTransformer("all-MiniLM-L6-v2")
-embeddings = model.encode(summaries, show_progress_bar=True)
+embeddings = encode_summaries(summaries)
+lap("embed")
 
 index = faiss.read_index(INDEX_PATH)
 with open(META_PATH, "rb") as f:
     metadata = pickle.load(f)
+domains = load_domains(DOMAIN_PATH, len(metadata))
 
 index.add(np.array(embeddings).astype("float32"))
 metadata.extend(summaries)
+domains.extend(["payment"] * len(summaries))
 
-faiss.write_index(index, INDEX_PATH)
+write_index_atomic(index, INDEX_PATH)
 with open(META_PATH, "wb") as f:
     pickle.dump(metadata, f)
+build_lexical_index(metadata, LEXICAL_PATH)
+save_domains(domains, DOMAIN_PATH)
+build_domain_router(index, domains, os.path.dirname(INDEX_PATH), rebuild_domains=["payment"])
+lap("index")
 
 print(f"✅ FAISS index updated with {len(summaries)} detailed payment summaries.")
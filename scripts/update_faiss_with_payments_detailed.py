@@ -2,58 +2,37 @@ import os
 import pandas as pd
 import faiss
 import pickle
-from sentence_transformers import SentenceTransformer
+from encoding_pool import encode_summaries
+from lexical_index import build_lexical_index
+from domain_router import build_domain_router, load_domains, save_domains
+from mmap_store import write_index_atomic
+from table_io import base_dir, lap
+from account_view import read_view
+from aggregate_store import monthly_table, publish_aggregates
+from daily_store import DAILY_FILE, daily_metric, publish_daily
 from datetime import datetime, timedelta
 import numpy as np
 from collections import defaultdict
 
 # === Paths ===
-BASE_PATH = "F:/Projects/AIModel/demo"
-PAYMENT_CSV = os.path.join(BASE_PATH, "data", "Main_Tables", "payment", "Internal-payment", "payment_movement_5000_full_records.xlsx")
-STATUS_CD = os.path.join(BASE_PATH, "data", "Supporting_Tables", "payment", "Internal-payment", "money_mvmnt_status_cd.xlsx")
-STATUS_REASON = os.path.join(BASE_PATH, "data", "Supporting_Tables", "payment", "Internal-payment", "money_mvmnt_status_reason_full.csv")
-SUBSC_OPTN = os.path.join(BASE_PATH, "data", "Supporting_Tables", "payment", "Internal-payment", "money_mvmnt_subsc_optn_cd.xlsx")
-TYPE_CD = os.path.join(BASE_PATH, "data", "Supporting_Tables", "payment", "Internal-payment", "money_mvmnt_type.xlsx")
+BASE_PATH = base_dir("F:/Projects/AIModel/demo")
 INDEX_PATH = os.path.join(BASE_PATH, "faiss_index", "account_index.faiss")
 META_PATH = os.path.join(BASE_PATH, "faiss_index", "account_metadata.pkl")
+LEXICAL_PATH = os.path.join(BASE_PATH, "faiss_index", "account_bm25.pkl")
+DOMAIN_PATH = os.path.join(BASE_PATH, "faiss_index", "account_domains.pkl")
+AGGREGATE_PATH = os.path.join(BASE_PATH, "faiss_index", "aggregates.pkl")
+DAILY_PATH = os.path.join(BASE_PATH, "faiss_index", DAILY_FILE)
 
-def month_name_format(date):
-    try:
-        dt = pd.to_datetime(date, dayfirst=True)
-        return dt.strftime("%B %Y")
-    except Exception:
-        return "Unknown"
-
-def week_of_year(date):
-    try:
-        dt = pd.to_datetime(date, dayfirst=True)
-        return f"Week {dt.isocalendar()[1]} of {dt.year}"
-    except Exception:
-        return "Unknown"
-
-def load_mapping(df, key_col, val_col):
-    df = df[[key_col, val_col]].dropna()
-    return dict(zip(df[key_col], df[val_col]))
-
-# === Load Mapping Tables ===
-status_map = load_mapping(pd.read_excel(STATUS_CD), "MONEY_MVMNT_STATUS_CD_ID", "MONEY_MVMNT_STATUS_DESC")
-reason_map = load_mapping(pd.read_csv(STATUS_REASON), "MNY_MVMNT_STATUS_REASON_CD_ID", "MNY_MVMNT_STATUS_REASON_DESC")
-subsc_map = load_mapping(pd.read_excel(SUBSC_OPTN), "MONEY_MVMNT_SUBSC_OPTN_CD_ID", "MONEY_MVMNT_SUBSC_OPTN_DESC")
-type_map = load_mapping(pd.read_excel(TYPE_CD), "MONEY_MVMNT_TYPE_ID", "MONEY_MVMNT_TYPE_DESC")
-
-# === Load Payment Data ===
-df = pd.read_excel(PAYMENT_CSV)
+# === Load Payment Data (codes already decoded in the account view) ===
+df = read_view(BASE_PATH, "payments")
 df = df[df["AMT"].notna()]
-df["STATUS_DESC"] = df["MONEY_MVMNT_STATUS_CD_ID"].map(status_map)
-df["REASON_DESC"] = df["MNY_MVMNT_STATUS_REASON_CD_ID"].map(reason_map)
-df["SUBSC_OPTN_DESC"] = df["MONEY_MVMNT_SUBSC_OPTN_CD_ID"].map(subsc_map)
-df["TYPE_DESC"] = df["MVMNT_TYPE_CD_ID"].map(type_map)
-df["MONTH"] = df["TRANS_TS"].apply(month_name_format)
-df["WEEK"] = df["TRANS_TS"].apply(week_of_year)
-df["DATE"] = pd.to_datetime(df["TRANS_TS"], dayfirst=True, errors="coerce")
+df["MONTH"] = df["DATE"].dt.strftime("%B %Y").fillna("Unknown")
+df["WEEK"] = ("Week " + df["DATE"].dt.isocalendar().week.astype(str) + " of " + df["DATE"].dt.year.astype("Int64").astype(str)).where(df["DATE"].notna(), "Unknown")
+
+lap("load")
 
 summaries = []
-today = df["DATE"].max()
+latest = df["DATE"].max()
 
 # --- 1. Monthly Totals, Failures, Successes (with synonym/variant phrasing)
 for month, g in df.groupby("MONTH"):
@@ -89,10 +68,11 @@ if (df["DATE"].max() - df["DATE"].min()).days > 31:
         summaries.append(f"In {week}, {len(g)} payments were processed totaling ₹{g['AMT'].sum():,.2f}.")
         fails = g[g["STATUS_DESC"].str.contains("fail|unsuccess|decline", case=False, na=False)]
         summaries.append(f"{len(fails)} failed (declined) in {week}.")
-    # Last-7-days
-    last7 = df[df["DATE"] >= (today - timedelta(days=7))]
+    # Final week of data, dated explicitly; "last 7 days" questions are resolved at
+    # query time from the daily arrays instead of against this build's date
+    last7 = df[df["DATE"] >= (latest - timedelta(days=7))]
     if not last7.empty:
-        summaries.append(f"In the last 7 days, {len(last7)} payments (₹{last7['AMT'].sum():,.2f}) processed; {len(last7[last7['STATUS_DESC'].str.contains('fail|unsuccess|decline', case=False, na=False)])} failed.")
+        summaries.append(f"In the week to {latest:%d %b %Y}, {len(last7)} payments (₹{last7['AMT'].sum():,.2f}) processed; {len(last7[last7['STATUS_DESC'].str.contains('fail|unsuccess|decline', case=False, na=False)])} failed.")
 
 # --- 4. Breakdown by Party/Account
 for (month, accnt), g in df.groupby(["MONTH", "ACCNT_ID"]):
@@ -122,6 +102,22 @@ for month, g in failures.groupby("MONTH"):
         summaries.append(f"{count} payments failed due to '{reason}' in {month}.")
         summaries.append(f"Failure reason '{reason}' was a leading cause in {month} ({count} failed).")
 
+# --- Chart Aggregates
+publish_aggregates(AGGREGATE_PATH, "payment", {
+    "monthly_status": monthly_table(df, "DATE", "STATUS_DESC"),
+    "monthly_channel": monthly_table(df, "DATE", "MONEY_MVMNT_CHNL_TYPE_CD_ID"),
+    "monthly_type": monthly_table(df, "DATE", "TYPE_DESC"),
+    "monthly_subscription": monthly_table(df, "DATE", "SUBSC_OPTN_DESC"),
+    "monthly_amount": monthly_table(df, "DATE", value_col="AMT", agg="sum"),
+    "monthly_failure_reasons": monthly_table(failures, "DATE", "REASON_DESC"),
+})
+failed = df["STATUS_DESC"].str.contains("fail|unsuccess|decline", case=False, na=False)
+publish_daily(DAILY_PATH, "payment", {
+    "payments": daily_metric(df["DATE"]),
+    "payment_amount": daily_metric(df["DATE"], df["AMT"]),
+    "payment_failures": daily_metric(df["DATE"], failed),
+})
+
 # --- 7. Enriched Example Summaries
 for i, row in df.sample(min(30, len(df)), random_state=42).iterrows():
     s = (
@@ -137,19 +133,27 @@ for i, row in df.sample(min(30, len(df)), random_state=42).iterrows():
     )
     summaries.append(s2)
 
+lap("summaries")
+
 # === FAISS Append ===
-model = SentenceTransformer("all-MiniLM-L6-v2")
-embeddings = model.encode(summaries, show_progress_bar=True)
+embeddings = encode_summaries(summaries)
+lap("embed")
 
 index = faiss.read_index(INDEX_PATH)
 with open(META_PATH, "rb") as f:
     metadata = pickle.load(f)
+domains = load_domains(DOMAIN_PATH, len(metadata))
 
 index.add(np.array(embeddings).astype("float32"))
 metadata.extend(summaries)
+domains.extend(["payment"] * len(summaries))
 
-faiss.write_index(index, INDEX_PATH)
+write_index_atomic(index, INDEX_PATH)
 with open(META_PATH, "wb") as f:
     pickle.dump(metadata, f)
+build_lexical_index(metadata, LEXICAL_PATH)
+save_domains(domains, DOMAIN_PATH)
+build_domain_router(index, domains, os.path.dirname(INDEX_PATH), rebuild_domains=["payment"])
+lap("index")
 
 print(f"✅ FAISS index updated with {len(summaries)} DETAILED and ENRICHED payment summaries.")
@@ -1,53 +1,49 @@
 import os
-import pandas as pd
 import numpy as np
 from tqdm import tqdm
 import faiss
 import pickle
-from sentence_transformers import SentenceTransformer
+from encoding_pool import encode_summaries
+from lexical_index import build_lexical_index
+from domain_router import build_domain_router, load_domains, save_domains
+from mmap_store import write_index_atomic
+from table_io import base_dir, lap
+from account_view import read_view
+from aggregate_store import monthly_table, publish_aggregates
+from daily_store import DAILY_FILE, daily_metric, publish_daily
+from transaction_anomalies import anomaly_summaries, anomaly_table, score_transactions
 from datetime import datetime
 
 # === PATHS ===
-BASE_PATH = "F:/Projects/AIModel/demo"
-TRANSACTIONS_FILE = os.path.join(BASE_PATH, "data", "Main_Tables", "transaction", "transactions_updated_dates.xlsx")
-TRAN_CAT_FILE = os.path.join(BASE_PATH, "data", "Supporting_Tables", "transaction", "tran_cat_cd.csv")
-TRAN_CD_FILE = os.path.join(BASE_PATH, "data", "Supporting_Tables", "transaction", "Tran_cd.csv")
-
+BASE_PATH = base_dir("F:/Projects/AIModel/demo")
 INDEX_PATH = os.path.join(BASE_PATH, "faiss_index", "account_index.faiss")
 META_PATH = os.path.join(BASE_PATH, "faiss_index", "account_metadata.pkl")
+LEXICAL_PATH = os.path.join(BASE_PATH, "faiss_index", "account_bm25.pkl")
+DOMAIN_PATH = os.path.join(BASE_PATH, "faiss_index", "account_domains.pkl")
+AGGREGATE_PATH = os.path.join(BASE_PATH, "faiss_index", "aggregates.pkl")
+DAILY_PATH = os.path.join(BASE_PATH, "faiss_index", DAILY_FILE)
+ANOMALY_PATH = os.path.join(BASE_PATH, "faiss_index", "transaction_anomalies.pkl")
 
-# === LOAD DATA ===
-df = pd.read_excel(TRANSACTIONS_FILE)
-df_tran_cat = pd.read_csv(TRAN_CAT_FILE)
-df_tran_cd = pd.read_csv(TRAN_CD_FILE)
-
-# === COLUMN MAPS ===
-cat_map = dict(zip(df_tran_cat['TRAN_CAT_CD'], df_tran_cat['Description']))
-code_map = dict(zip(df_tran_cd['TRAN_CD'], df_tran_cd['Description']))
+# === CONFIG ===
+MAX_ANOMALY_SUMMARIES = 200  # Highest-scoring anomalies that get their own indexed summary
 
-df['TRAN_CAT_DESC'] = df['TRAN_CAT_CD'].map(cat_map)
-df['TRAN_TYPE_DESC'] = df['TRAN_CD'].map(code_map)
+# === LOAD DATA (TRAN_CAT_DESC / TRAN_TYPE_DESC and TRAN_DATE come decoded from the account view) ===
+df = read_view(BASE_PATH, "transactions")
 
 # === DATE HANDLING ===
-def safe_parse_date(val):
-    try:
-        return pd.to_datetime(val)
-    except Exception:
-        return pd.NaT
-
-df['TRAN_DATE'] = df['TRAN_DATE'].apply(safe_parse_date)
 df['Month'] = df['TRAN_DATE'].dt.month
 df['Year'] = df['TRAN_DATE'].dt.year
 df['Month_Name'] = df['TRAN_DATE'].dt.strftime('%B')
-
-# === MODEL ===
-model = SentenceTransformer("all-MiniLM-L6-v2")
+lap("load")
 
 # === LOAD EXISTING FAISS INDEX ===
 with open(META_PATH, "rb") as f:
     metadata = pickle.load(f)
+domains = load_domains(DOMAIN_PATH, len(metadata))
 index = faiss.read_index(INDEX_PATH)
 
+lap("model")
+
 # === SUMMARY GENERATION ===
 summaries = []
 
@@ -116,35 +112,81 @@ if 'MERCHANT_STATE' in df.columns:
     for state, cnt in state_counts.items():
         summaries.append(f"Top merchant state: {state} ({cnt} transactions).")
 
-# 6. Large transactions/anomalies
+# 6. Large transactions
+account_col = next((c for c in ("ACCNT_ID", "ACCOUNT_ID", "CIFDB_ACCNT_ID") if c in df.columns), None)
 if 'TRAN_AMT' in df.columns:
     high_value = df[df['TRAN_AMT'] > df['TRAN_AMT'].quantile(0.99)]
-    for _, row in high_value.iterrows():
-        amt = row['TRAN_AMT']
-        date = row['TRAN_DATE']
-        acct = row['ACCOUNT_ID'] if 'ACCOUNT_ID' in row else 'Unknown'
+    accounts = high_value[account_col].astype(str) if account_col else 'Unknown'
+    summaries.extend(
+        "High-value transaction: ₹" + high_value['TRAN_AMT'].map("{:,.2f}".format)
+        + " on " + high_value['TRAN_DATE'].dt.strftime('%d-%b-%Y').fillna('Unknown')
+        + " (Account: " + accounts + ")"
+    )
+
+# 7. Per-account anomalies (amount z-score, 7-day bursts, new merchant state)
+monthly_anomalies = None
+if account_col and 'TRAN_AMT' in df.columns:
+    scored = score_transactions(df, account_col)
+    anomalies = anomaly_table(df, scored, account_col)
+    anomalies.to_pickle(ANOMALY_PATH)
+    lap("anomalies")
+    print(f"🚩 {len(anomalies):,} of {len(df):,} transactions flagged as unusual for their account")
+
+    month = anomalies['TRAN_DATE'].dt.to_period('M').rename('month')
+    monthly_anomalies = anomalies[['amount_flag', 'spike_flag', 'new_state_flag']].groupby(month).sum().rename(columns={
+        'amount_flag': 'Unusual amount', 'spike_flag': 'Frequency spike', 'new_state_flag': 'New merchant state',
+    })
+    summaries.append(
+        f"{len(anomalies):,} transactions were unusual for their account: {int(anomalies['amount_flag'].sum()):,} by amount, "
+        f"{int(anomalies['spike_flag'].sum()):,} in frequency spikes and {int(anomalies['new_state_flag'].sum()):,} in a new merchant state."
+    )
+    for period, row in monthly_anomalies.iterrows():
         summaries.append(
-            f"High-value transaction: ₹{amt:,.2f} on {date.strftime('%d-%b-%Y') if pd.notna(date) else 'Unknown'}"
-            f" (Account: {acct})"
+            f"In {period.strftime('%B %Y')}, {int(row.sum()):,} anomaly flags were raised on transactions "
+            f"({int(row['Unusual amount'])} unusual amounts, {int(row['Frequency spike'])} frequency spikes, "
+            f"{int(row['New merchant state'])} new merchant states)."
         )
-
-# 7. Example breakdowns for search coverage
+    summaries.extend(anomaly_summaries(anomalies, MAX_ANOMALY_SUMMARIES))
+
+# === CHART AGGREGATES ===
+publish_aggregates(AGGREGATE_PATH, "transaction", {
+    "monthly_volume": monthly_table(df, "TRAN_DATE"),
+    "monthly_amount": monthly_table(df, "TRAN_DATE", value_col="TRAN_AMT", agg="sum"),
+    "monthly_category": monthly_table(df, "TRAN_DATE", "TRAN_CAT_DESC"),
+    "monthly_type": monthly_table(df, "TRAN_DATE", "TRAN_TYPE_DESC"),
+    **({"monthly_anomalies": monthly_anomalies} if monthly_anomalies is not None else {}),
+})
+publish_daily(DAILY_PATH, "transaction", {
+    "transactions": daily_metric(df["TRAN_DATE"]),
+    "transaction_amount": daily_metric(df["TRAN_DATE"], df["TRAN_AMT"]),
+})
+
+# 8. Example breakdowns for search coverage
 summaries.append("What percent of transactions were fraud-flagged this year?")
 summaries.append("Give a monthly breakdown of transaction value for 2024.")
 summaries.append("Who are the top merchant cities and categories for transactions?")
 summaries.append("How many online card transactions were made in March 2024?")
 summaries.append("Show me high-value transactions above the 99th percentile.")
+summaries.append("Which transactions were unusual for the account that made them?")
+
+lap("summaries")
 
 # === ENCODING AND APPEND TO INDEX ===
-embeddings = model.encode(summaries, show_progress_bar=True, batch_size=32, normalize_embeddings=True)
+embeddings = encode_summaries(summaries, normalize=True)
+lap("embed")
 embeddings = np.array(embeddings).astype('float32')
 
 index.add(embeddings)
 metadata.extend(summaries)
+domains.extend(["transaction"] * len(summaries))
 
 # Save back
-faiss.write_index(index, INDEX_PATH)
+write_index_atomic(index, INDEX_PATH)
 with open(META_PATH, "wb") as f:
     pickle.dump(metadata, f)
+build_lexical_index(metadata, LEXICAL_PATH)
+save_domains(domains, DOMAIN_PATH)
+build_domain_router(index, domains, os.path.dirname(INDEX_PATH), rebuild_domains=["transaction"])
+lap("index")
 
 print(f"✅ FAISS index updated with {len(summaries)} TRANSACTION summaries.")
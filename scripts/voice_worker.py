@@ -0,0 +1,106 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+# === CONFIG ===
+STT_MODEL_SIZE = "base.en"     # faster-whisper model, runs offline on CPU once downloaded
+STT_COMPUTE_TYPE = "int8"      # Quantized CPU inference
+STT_CPU_THREADS = 4
+TRANSCRIBE_TIMEOUT_S = 30      # A clip taking longer than this (from when the worker starts it) is abandoned
+MAX_CLIP_S = 60                # Longer clips are rejected before decoding, so one job cannot hold the worker for long
+MAX_PARALLEL_JOBS = 1          # Transcriptions run one at a time per process
+SAMPLE_RATE = 16000            # What the model expects; clips are resampled to it
+
+_model = None
+_model_lock = Lock()
+_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_JOBS, thread_name_prefix="stt")
+
+
+class TranscriptionCancelled(Exception):
+    pass
+
+
+class ClipTooLong(Exception):
+    pass
+
+
+def get_model():
+    """Load the speech-to-text model once per process, on first use."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            from faster_whisper import WhisperModel
+            _model = WhisperModel(
+                STT_MODEL_SIZE, device="cpu", compute_type=STT_COMPUTE_TYPE, cpu_threads=STT_CPU_THREADS
+            )
+    return _model
+
+
+def transcribe(audio_bytes, cancel_event, deadline):
+    from faster_whisper import decode_audio
+    audio = decode_audio(io.BytesIO(audio_bytes), sampling_rate=SAMPLE_RATE)
+    # The model cannot be interrupted mid-segment, so the clip length bounds how long a
+    # cancelled or timed-out job keeps the worker
+    if len(audio) > MAX_CLIP_S * SAMPLE_RATE:
+        raise ClipTooLong(f"Clip is {len(audio) / SAMPLE_RATE:.0f}s; the limit is {MAX_CLIP_S}s")
+    model = get_model()
+    # Segments are decoded lazily, so cancellation and the deadline are checked between them
+    segments, _ = model.transcribe(audio, beam_size=1, vad_filter=True)
+    parts = []
+    for segment in segments:
+        if cancel_event.is_set():
+            raise TranscriptionCancelled()
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Transcription took longer than {TRANSCRIBE_TIMEOUT_S}s")
+        parts.append(segment.text.strip())
+    return " ".join(p for p in parts if p)
+
+
+class TranscriptionJob:
+    """Handle for one background transcription; kept in the Streamlit session and polled."""
+
+    def __init__(self, audio_bytes, timeout_s=TRANSCRIBE_TIMEOUT_S):
+        self.cancel_event = Event()
+        self.timeout_s = timeout_s
+        self.started = None   # Set when the worker picks the job up; time spent queued does not count
+        self.future = _executor.submit(self._run, audio_bytes)
+
+    def _run(self, audio_bytes):
+        self.started = time.monotonic()
+        return transcribe(audio_bytes, self.cancel_event, self.started + self.timeout_s)
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.future.cancel()
+
+    @property
+    def status(self):
+        if self.future.cancelled() or self.cancel_event.is_set():
+            return "cancelled"
+        if not self.future.done():
+            if self.started is None:
+                return "queued"
+            return "timeout" if self.elapsed > self.timeout_s else "running"
+        error = self.future.exception()
+        if error is None:
+            return "done"
+        if isinstance(error, TimeoutError):
+            return "timeout"
+        if isinstance(error, TranscriptionCancelled):
+            return "cancelled"
+        if isinstance(error, ClipTooLong):
+            return "too_long"
+        return "failed"
+
+    @property
+    def text(self):
+        return self.future.result() if self.status == "done" else ""
+
+    @property
+    def error(self):
+        return self.future.exception() if self.future.done() and not self.future.cancelled() else None
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started if self.started is not None else 0.0